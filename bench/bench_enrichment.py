@@ -0,0 +1,214 @@
+"""
+Prueba de carga de GoogleBooksEnricher contra el servidor local de Google Books
+
+Genera una landing de Goodreads a partir del catálogo sintético (mezcla de
+libros con ISBN-13, solo ISBN-10, solo título/autor y libros inexistentes) y
+ejecuta el enriquecimiento para cada combinación de parámetros. Para cada
+ejecución informa de:
+    - peticiones HTTP y peticiones/segundo
+    - latencia p50/p99 de las peticiones (ms)
+    - libros enriquecidos y libros/minuto
+    - 429 recibidos
+    - bytes por respuesta y µs de parseo JSON por respuesta
+
+Uso:
+    python bench/bench_enrichment.py --books 2000 --concurrency 1 8 32 --batch-size 1 20
+    python bench/bench_enrichment.py --max-rps 50 --latency-dist exponential --latency-ms 120
+    python bench/bench_enrichment.py --lookup-cache --repeat 2      # 2º run desde la caché
+    python bench/bench_enrichment.py --hedge-delay 0.1 --output docs/bench_enrichment.json
+    python bench/bench_enrichment.py --payload-kb 4 --json-decoder json orjson --full-response
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'src'))
+sys.path.insert(0, str(BENCH_DIR))
+
+from googlebooks_server import add_server_arguments, server_from_args  # noqa: E402
+from enrich_googlebooks import VOLUME_FIELDS, GoogleBooksEnricher  # noqa: E402
+from utils_cache import LookupCache  # noqa: E402
+
+
+def make_goodreads_books(catalog, n_books, isbn13_share=0.6, isbn10_share=0.15,
+                         title_share=0.2, seed=0):
+    """
+    Landing sintética de Goodreads con n_books libros del catálogo
+    El resto hasta 1 (1 - shares) son libros que no existen en el catálogo
+    """
+    rng = random.Random(seed)
+    books = []
+    for i in range(n_books):
+        volume = catalog.volumes[rng.randrange(catalog.size)]
+        book = {'title': volume['title'], 'author': volume['authors'][0],
+                'url': f"https://www.goodreads.com/book/show/{i}"}
+        kind = rng.random()
+        if kind < isbn13_share:
+            book['isbn13'] = volume['isbn13']
+        elif kind < isbn13_share + isbn10_share:
+            book['isbn10'] = volume['isbn10']
+        elif kind >= isbn13_share + isbn10_share + title_share:
+            book['title'] = f"Libro inexistente {i}"
+            book['isbn13'] = f"979{i:010d}"
+        books.append(book)
+    return books
+
+
+class LatencyRecorder:
+    """Hook de respuesta de requests que guarda la latencia de cada petición"""
+
+    def __init__(self):
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def __call__(self, response, *args, **kwargs):
+        with self._lock:
+            self.samples.append(response.elapsed.total_seconds() * 1000)
+        return response
+
+    def percentile(self, p):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 1)
+
+
+def run_enrichment(server, input_path, concurrency, batch_size, hedge_delay=None,
+                   quota_per_minute=600000, lookup_cache=None, json_decoder=None, fields=VOLUME_FIELDS):
+    """Una ejecución del enriquecedor contra el servidor; devuelve sus métricas"""
+    server.reset_stats()
+    with contextlib.redirect_stdout(io.StringIO()):
+        enricher = GoogleBooksEnricher(api_key='bench', concurrency=concurrency, batch_size=batch_size,
+                                       hedge_delay=hedge_delay, quota_per_minute=quota_per_minute,
+                                       requests_per_second=quota_per_minute / 60,
+                                       lookup_cache=lookup_cache, json_decoder=json_decoder,
+                                       fields=fields)
+        enricher.base_url = server.volumes_url
+        recorder = LatencyRecorder()
+        enricher.http.session.hooks['response'].append(recorder)
+
+        start = time.perf_counter()
+        enricher.enrich_from_json(input_path)
+        elapsed = time.perf_counter() - start
+    enricher.close()
+
+    requests_made = len(recorder.samples)
+    metrics = enricher.run_metrics
+    return {
+        'concurrency': concurrency,
+        'batch_size': batch_size,
+        'hedge_delay': hedge_delay,
+        'lookup_cache': lookup_cache is not None,
+        'json_decoder': metrics['json_decode']['decoder'],
+        'fields': fields is not None,
+        'elapsed_seconds': round(elapsed, 2),
+        'requests': requests_made,
+        'requests_per_sec': round(requests_made / elapsed, 1) if elapsed else None,
+        'latency_p50_ms': recorder.percentile(50),
+        'latency_p99_ms': recorder.percentile(99),
+        'latency_mean_ms': round(statistics.fmean(recorder.samples), 1) if recorder.samples else None,
+        'books': metrics['books_total'],
+        'books_enriched': metrics['books_enriched'],
+        'books_per_minute': round(metrics['books_total'] / elapsed * 60, 1) if elapsed else None,
+        'throttled_429': server.stats['throttled'],
+        'bytes_received': server.stats['bytes_sent'],
+        'bytes_per_response': metrics['json_decode']['bytes_per_response'],
+        'parse_us_per_response': metrics['json_decode']['parse_us_per_response'],
+        'tier_wins': metrics['tier_wins']
+    }
+
+
+def print_report(results):
+    header = (f"{'conc':>5}{'batch':>6}{'hedge':>7}{'cache':>6}{'seg':>8}{'peticiones':>11}"
+              f"{'pet/s':>8}{'p50 ms':>8}{'p99 ms':>8}{'enriq.':>8}{'libros/min':>11}{'429':>6}"
+              f"{'json':>8}{'fields':>7}{'B/resp':>9}{'µs/resp':>9}")
+    print('\n' + header)
+    print('-' * len(header))
+    for r in results:
+        hedge = '-' if r['hedge_delay'] is None else f"{r['hedge_delay']:g}"
+        print(f"{r['concurrency']:>5}{r['batch_size']:>6}{hedge:>7}{'sí' if r['lookup_cache'] else 'no':>6}"
+              f"{r['elapsed_seconds']:>8.2f}{r['requests']:>11}{r['requests_per_sec'] or 0:>8.1f}"
+              f"{r['latency_p50_ms'] or 0:>8.1f}{r['latency_p99_ms'] or 0:>8.1f}"
+              f"{r['books_enriched']:>8}{r['books_per_minute'] or 0:>11.0f}{r['throttled_429']:>6}"
+              f"{r['json_decoder']:>8}{'sí' if r['fields'] else 'no':>7}"
+              f"{r['bytes_per_response']:>9.0f}{r['parse_us_per_response']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del enriquecimiento con Google Books")
+    add_server_arguments(parser)
+    parser.add_argument('--books', type=int, default=1000, help="Libros en la landing sintética")
+    parser.add_argument('--isbn13-share', type=float, default=0.6)
+    parser.add_argument('--isbn10-share', type=float, default=0.15)
+    parser.add_argument('--title-share', type=float, default=0.2,
+                        help="Libros sin ISBN (el resto hasta 1 no existe en el catálogo)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8])
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[20])
+    parser.add_argument('--hedge-delay', type=float, nargs='+', default=[None])
+    parser.add_argument('--quota', type=float, default=600000,
+                        help="Cuota del enriquecedor en peticiones/minuto")
+    parser.add_argument('--lookup-cache', action='store_true',
+                        help="Usar una caché de búsquedas SQLite (temporal) compartida entre runs")
+    parser.add_argument('--json-decoder', nargs='+', default=[None], choices=['json', 'orjson'],
+                        help="Decodificadores JSON a comparar (default: orjson si está instalado)")
+    parser.add_argument('--full-response', action='store_true',
+                        help="Compara también sin el parámetro fields (recurso completo)")
+    parser.add_argument('--repeat', type=int, default=1, help="Ejecuciones por combinación")
+    parser.add_argument('--output', help="Guardar resultados en JSON")
+    args = parser.parse_args(argv)
+
+    server = server_from_args(args)
+    books = make_goodreads_books(server.catalog, args.books, args.isbn13_share,
+                                 args.isbn10_share, args.title_share, seed=args.seed)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, server:
+        input_path = Path(tmp) / 'goodreads_books.json'
+        with open(input_path, 'w', encoding='utf-8') as f:
+            json.dump({'metadata': {'source': 'bench'}, 'books': books}, f, ensure_ascii=False)
+
+        print(f"Servidor: {server.volumes_url} ({args.catalog_size} volúmenes, latencia "
+              f"{args.latency_dist} {args.latency_ms} ms, 429 aleatorios {args.error_rate:.0%}, "
+              f"max_rps {args.max_rps or '∞'})")
+        print(f"Landing sintética: {len(books)} libros")
+
+        field_options = [VOLUME_FIELDS, None] if args.full_response else [VOLUME_FIELDS]
+        for run, (concurrency, batch_size, hedge_delay, json_decoder, fields) in enumerate(
+                itertools.product(args.concurrency, args.batch_size, args.hedge_delay,
+                                  args.json_decoder, field_options)):
+            lookup_cache = None
+            if args.lookup_cache:
+                lookup_cache = LookupCache(Path(tmp) / f"lookups_{run}.sqlite")
+            for _ in range(args.repeat):
+                result = run_enrichment(server, input_path, concurrency, batch_size, hedge_delay,
+                                        quota_per_minute=args.quota, lookup_cache=lookup_cache,
+                                        json_decoder=json_decoder, fields=fields)
+                results.append(result)
+                print(f"  · conc={concurrency} batch={batch_size} hedge={hedge_delay} "
+                      f"json={result['json_decoder']} fields={'sí' if fields else 'no'}: "
+                      f"{result['books_per_minute']:.0f} libros/min")
+            if lookup_cache is not None:
+                lookup_cache.close()
+
+    print_report(results)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Benchmark de extracción de ISBNs en textos grandes
+
+Compara la implementación anterior de extract_isbn (patrones recompilados en
+cada llamada, findall completo) con IsbnScanner sobre textos sintéticos de
+página de varios MB, con el ISBN al principio, en medio, al final o ausente:
+    - extract_isbn anterior (str)
+    - IsbnScanner.scan sobre str y sobre bytes
+    - scan_many sobre muchos documentos pequeños
+y comprueba si cada implementación devuelve el ISBN insertado en el texto
+(la anterior une números vecinos separados por espacios: falla con
+'ISBN 9781449361327 2013' y da falsos positivos con '1958 1978').
+
+Uso:
+    python bench/bench_isbn.py
+    python bench/bench_isbn.py --text-mb 8 --iterations 5 --documents 20000
+    python bench/bench_isbn.py --output docs/bench_isbn.json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'src'))
+
+from utils_isbn import (IsbnScanner, clean_isbn, extract_isbn_many,  # noqa: E402
+                        isbn10_to_isbn13, validate_isbn10, validate_isbn13)
+
+_WORDS = ('the', 'book', 'reviews', 'rating', 'pages', 'edition', 'published', 'data', 'science',
+          'readers', 'author', 'kindle', 'paperback', 'hardcover', 'community', 'shelves', 'genre')
+
+
+def legacy_extract_isbn(text):
+    """extract_isbn antes del escáner (referencia del benchmark)"""
+    if not text:
+        return None, None
+
+    import re
+
+    isbn13_pattern = r'(?:ISBN[-:]?\s*(?:13)?:?\s*)?(?:978|979)[-\s]?\d{1,5}[-\s]?\d{1,7}[-\s]?\d{1,7}[-\s]?\d{1}'
+    isbn13_matches = re.findall(isbn13_pattern, str(text))
+
+    for match in isbn13_matches:
+        cleaned = clean_isbn(match)
+        if validate_isbn13(cleaned):
+            return cleaned, None
+
+    isbn10_pattern = r'(?:ISBN[-:]?\s*(?:10)?:?\s*)?\d{1,5}[-\s]?\d{1,7}[-\s]?\d{1,7}[-\s]?[\dX]'
+    isbn10_matches = re.findall(isbn10_pattern, str(text))
+
+    for match in isbn10_matches:
+        cleaned = clean_isbn(match)
+        if len(cleaned) == 10 and validate_isbn10(cleaned):
+            isbn13 = isbn10_to_isbn13(cleaned)
+            return isbn13, cleaned
+
+    return None, None
+
+
+def _random_isbn10(rng):
+    body = ''.join(rng.choice('0123456789') for _ in range(9))
+    check = (11 - sum(int(d) * (10 - i) for i, d in enumerate(body)) % 11) % 11
+    return body + ('X' if check == 10 else str(check))
+
+
+def make_page_text(size_bytes, isbn=None, position=None, seed=0):
+    """
+    Texto de página sintético: palabras, recuentos ('12,345 ratings'),
+    años, precios y números largos que no son ISBNs válidos
+    """
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < size_bytes:
+        kind = rng.random()
+        if kind < 0.75:
+            token = rng.choice(_WORDS)
+        elif kind < 0.85:
+            token = f"{rng.randrange(1, 999):,}{rng.randrange(1000):03d} ratings"
+        elif kind < 0.93:
+            token = str(rng.randrange(1900, 2030))
+        elif kind < 0.98:
+            token = f"${rng.randrange(5, 90)}.{rng.randrange(100):02d}"
+        else:
+            token = str(rng.randrange(10 ** 11, 10 ** 12))  # 12 dígitos: no es candidato
+        parts.append(token)
+        size += len(token) + 1
+    if isbn is not None:
+        index = {'start': 10, 'middle': len(parts) // 2, 'end': len(parts) - 10}[position]
+        parts.insert(index, f"ISBN {isbn}")
+    return ' '.join(parts)
+
+
+def _time(fn, iterations):
+    samples = []
+    result = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def _expected(isbn):
+    """Resultado correcto de extract_isbn para el ISBN insertado"""
+    if isbn is None:
+        return None, None
+    if len(isbn) == 13:
+        return isbn, None
+    return isbn10_to_isbn13(isbn), isbn
+
+
+def bench_large_texts(text_mb, iterations, seed=0):
+    """MB/s de cada implementación sobre un texto grande por escenario"""
+    rng = random.Random(seed)
+    scanner = IsbnScanner()
+    size = int(text_mb * 1024 * 1024)
+    scenarios = [
+        ('isbn13_inicio', None, 'start'),
+        ('isbn13_medio', None, 'middle'),
+        ('isbn13_final', None, 'end'),
+        ('isbn10_medio', _random_isbn10(rng), 'middle'),
+        ('sin_isbn', None, None),
+    ]
+    results = []
+    for name, isbn, position in scenarios:
+        if name.startswith('isbn13'):
+            isbn = isbn10_to_isbn13(_random_isbn10(rng))
+        text = make_page_text(size, isbn, position, seed=seed)
+        data = text.encode('utf-8')
+
+        legacy_s, legacy = _time(lambda: legacy_extract_isbn(text), iterations)
+        scan_s, scanned = _time(lambda: scanner.scan(text), iterations)
+        bytes_s, scanned_bytes = _time(lambda: scanner.scan(data), iterations)
+        mb = len(data) / 1024 / 1024
+        results.append({
+            'escenario': name,
+            'mb': round(mb, 2),
+            'legacy_ms': round(legacy_s * 1000, 2),
+            'scanner_str_ms': round(scan_s * 1000, 2),
+            'scanner_bytes_ms': round(bytes_s * 1000, 2),
+            'legacy_mb_s': round(mb / legacy_s, 1),
+            'scanner_mb_s': round(mb / scan_s, 1),
+            'speedup': round(legacy_s / scan_s, 1),
+            'esperado': list(_expected(isbn)),
+            'legacy_ok': legacy == _expected(isbn),
+            'scanner_ok': scanned == scanned_bytes == _expected(isbn)
+        })
+    return results
+
+
+def bench_batch(documents, iterations, seed=0):
+    """Muchos documentos pequeños: extract_isbn anterior en bucle vs scan_many"""
+    rng = random.Random(seed)
+    texts, expected = [], []
+    for i in range(documents):
+        isbn = None
+        if i % 3 == 0:
+            isbn = isbn10_to_isbn13(_random_isbn10(rng))
+        elif i % 3 == 1:
+            isbn = _random_isbn10(rng)
+        texts.append(make_page_text(2048, isbn, 'middle' if isbn else None, seed=i))
+        expected.append(_expected(isbn))
+
+    legacy_s, legacy = _time(lambda: [legacy_extract_isbn(t) for t in texts], iterations)
+    batch_s, batch = _time(lambda: extract_isbn_many(texts), iterations)
+    return {
+        'documentos': documents,
+        'legacy_ms': round(legacy_s * 1000, 2),
+        'scan_many_ms': round(batch_s * 1000, 2),
+        'legacy_docs_s': round(documents / legacy_s),
+        'scan_many_docs_s': round(documents / batch_s),
+        'speedup': round(legacy_s / batch_s, 1),
+        'legacy_correctos': sum(a == b for a, b in zip(legacy, expected)),
+        'scan_many_correctos': sum(a == b for a, b in zip(batch, expected))
+    }
+
+
+def print_report(large, batch):
+    header = (f"{'escenario':<16}{'MB':>6}{'anterior ms':>13}{'str ms':>10}{'bytes ms':>10}"
+              f"{'MB/s ant.':>11}{'MB/s nuevo':>12}{'x':>7}{'ok ant.':>9}{'ok nuevo':>10}")
+    print('\n' + header)
+    print('-' * len(header))
+    for r in large:
+        print(f"{r['escenario']:<16}{r['mb']:>6.1f}{r['legacy_ms']:>13.2f}{r['scanner_str_ms']:>10.2f}"
+              f"{r['scanner_bytes_ms']:>10.2f}{r['legacy_mb_s']:>11.1f}{r['scanner_mb_s']:>12.1f}"
+              f"{r['speedup']:>7.1f}{'sí' if r['legacy_ok'] else 'no':>9}{'sí' if r['scanner_ok'] else 'no':>10}")
+
+    print(f"\nLote de {batch['documentos']} documentos de 2 KB: "
+          f"{batch['legacy_docs_s']} docs/s antes, {batch['scan_many_docs_s']} docs/s con scan_many "
+          f"(x{batch['speedup']})")
+    print(f"ISBN insertado encontrado: {batch['legacy_correctos']}/{batch['documentos']} antes, "
+          f"{batch['scan_many_correctos']}/{batch['documentos']} con el escáner")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de extracción de ISBNs")
+    parser.add_argument('--text-mb', type=float, default=4, help="Tamaño de cada texto grande")
+    parser.add_argument('--iterations', type=int, default=3, help="Repeticiones por medición")
+    parser.add_argument('--documents', type=int, default=5000, help="Documentos del lote")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Guardar resultados en JSON")
+    args = parser.parse_args(argv)
+
+    large = bench_large_texts(args.text_mb, args.iterations, seed=args.seed)
+    batch = bench_batch(args.documents, args.iterations, seed=args.seed)
+    print_report(large, batch)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'textos_grandes': large, 'lote': batch},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
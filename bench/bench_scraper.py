@@ -0,0 +1,224 @@
+"""
+Benchmark offline del scraper de Goodreads
+
+1. Validación: cada fixture debe resolverse por la ruta y con los campos
+   esperados en manifest.json (detecta selectores rotos)
+2. Parseo: tiempo por página de cada ruta de extracción (json_ld,
+   next_data, lxml, bs4), de extract() y de parse_search_results()
+3. Crawl: search_books() completo contra el servidor local de fixtures,
+   en páginas/segundo
+
+Uso:
+    python bench/bench_scraper.py
+    python bench/bench_scraper.py --iterations 200 --pad-kb 300
+    python bench/bench_scraper.py --crawl-pages 20 --concurrency 8 --latency 0.05 --error-rate 0.05
+    python bench/bench_scraper.py --output docs/bench_scraper.json
+
+Sale con código 1 si alguna fixture no coincide con el manifest.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'src'))
+sys.path.insert(0, str(BENCH_DIR))
+
+from goodreads_server import FIXTURES_DIR, FixtureServer, load_manifest  # noqa: E402
+from scrape_goodreads import GoodreadsScraper  # noqa: E402
+from utils_extract import GoodreadsPageExtractor  # noqa: E402
+
+
+def _pad(content, pad_kb):
+    """Infla la página con marcado irrelevante para simular páginas pesadas"""
+    if not pad_kb:
+        return content
+    filler = b'<div class="SocialSignalsSection"><span>lorem ipsum</span></div>\n'
+    padding = filler * (pad_kb * 1024 // len(filler) + 1)
+    return content.replace(b'</body>', padding + b'</body>', 1)
+
+
+def _time_call(fn, iterations):
+    """Mediana de ms por llamada"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+#─────────────────────────────────────────────────────────────────────────────
+# 1. Validación contra el manifest
+#─────────────────────────────────────────────────────────────────────────────
+
+def validate_fixtures(manifest, fixtures_dir=FIXTURES_DIR):
+    """Devuelve la lista de discrepancias (vacía si todo coincide)"""
+    extractor = GoodreadsPageExtractor()
+    errors = []
+
+    for name, expected in manifest['book_pages'].items():
+        content = (fixtures_dir / name).read_bytes()
+        fields, path = extractor.extract(content, expected['url'])
+        if path != expected['path']:
+            errors.append(f"{name}: ruta {path} (esperada {expected['path']})")
+        for field, value in expected['fields'].items():
+            if fields.get(field) != value:
+                errors.append(f"{name}: {field}={fields.get(field)!r} (esperado {value!r})")
+
+    for name, expected in manifest['search_pages'].items():
+        hrefs = GoodreadsScraper.parse_search_results((fixtures_dir / name).read_bytes())
+        if hrefs != expected['book_urls']:
+            errors.append(f"{name}: {len(hrefs)} enlaces (esperados {len(expected['book_urls'])})")
+
+    return errors
+
+
+#─────────────────────────────────────────────────────────────────────────────
+# 2. Tiempo de parseo por ruta de extracción
+#─────────────────────────────────────────────────────────────────────────────
+
+def bench_parsing(manifest, iterations=50, pad_kb=0, fixtures_dir=FIXTURES_DIR):
+    """
+    ms/página de cada ruta por fixture (None si la ruta no aplica a la página)
+    y páginas/segundo de extract()
+    """
+    extractor = GoodreadsPageExtractor()
+    results = {'book_pages': {}, 'search_pages': {}}
+
+    for name, expected in manifest['book_pages'].items():
+        content = _pad((fixtures_dir / name).read_bytes(), pad_kb)
+        text = content.decode('utf-8')
+        url = expected['url']
+
+        paths = {
+            'json_ld': lambda: extractor._from_json_ld(text, url),
+            'next_data': lambda: extractor._from_next_data(text, url),
+            'lxml': lambda: extractor._from_lxml(text, url),
+            'bs4': lambda: extractor._from_bs4(content)
+        }
+        row = {'bytes': len(content), 'resolved_by': expected['path'], 'ms_per_page': {}}
+        for path, fn in paths.items():
+            fields = fn()
+            row['ms_per_page'][path] = (round(_time_call(fn, iterations), 3)
+                                        if fields and fields.get('title') or path == 'bs4' else None)
+
+        extract_ms = _time_call(lambda: extractor.extract(content, url), iterations)
+        row['ms_per_page']['extract'] = round(extract_ms, 3)
+        row['pages_per_sec'] = round(1000 / extract_ms, 1) if extract_ms else None
+        results['book_pages'][name] = row
+
+    for name in manifest['search_pages']:
+        content = _pad((fixtures_dir / name).read_bytes(), pad_kb)
+        ms = _time_call(lambda: GoodreadsScraper.parse_search_results(content), iterations)
+        results['search_pages'][name] = {'bytes': len(content), 'ms_per_page': round(ms, 3)}
+
+    return results
+
+
+#─────────────────────────────────────────────────────────────────────────────
+# 3. Crawl completo contra el servidor local
+#─────────────────────────────────────────────────────────────────────────────
+
+def bench_crawl(search_pages=2, concurrency=4, latency=0.0, jitter=0.0, error_rate=0.0,
+                requests_per_second=1000.0, seed=0):
+    """Ejecuta search_books() contra FixtureServer y mide páginas/segundo"""
+    with FixtureServer(latency=latency, jitter=jitter, error_rate=error_rate, retry_after=0,
+                       search_pages=search_pages, seed=seed) as server:
+        scraper = GoodreadsScraper(concurrency=concurrency, requests_per_second=requests_per_second)
+        scraper.base_url = server.base_url
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            scraper.search_books('data science', max_books=10 ** 6)
+        elapsed = time.perf_counter() - start
+        scraper.http.close()
+
+        pages = server.stats['search'] + server.stats['book']
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'books': scraper.books_scraped,
+            'pages_fetched': pages,
+            'pages_per_sec': round(pages / elapsed, 1) if elapsed else None,
+            'server': dict(server.stats),
+            'extraction_paths': scraper.metadata['extraction_paths'],
+            'throttle_events': scraper.rate_limiter.stats()['throttle_events']
+        }
+
+
+#─────────────────────────────────────────────────────────────────────────────
+# Informe
+#─────────────────────────────────────────────────────────────────────────────
+
+def print_report(parsing, crawl):
+    paths = ('json_ld', 'next_data', 'lxml', 'bs4', 'extract')
+    print(f"\n{'fixture':<34}{'KB':>6}  " + ''.join(f"{p:>10}" for p in paths) + f"{'pág/s':>9}")
+    print('-' * 105)
+    for name, row in parsing['book_pages'].items():
+        cells = ''.join(f"{row['ms_per_page'][p]:>10.3f}" if row['ms_per_page'][p] is not None
+                        else f"{'-':>10}" for p in paths)
+        print(f"{name:<34}{row['bytes'] / 1024:>6.1f}  {cells}{row['pages_per_sec']:>9.1f}")
+    print("(ms/página, mediana; '-' = la ruta no resuelve esa página)")
+
+    print(f"\n{'búsqueda':<34}{'KB':>6}  {'ms/página':>10}")
+    print('-' * 52)
+    for name, row in parsing['search_pages'].items():
+        print(f"{name:<34}{row['bytes'] / 1024:>6.1f}  {row['ms_per_page']:>10.3f}")
+
+    if crawl:
+        print(f"\nCrawl: {crawl['books']} libros, {crawl['pages_fetched']} páginas en "
+              f"{crawl['elapsed_seconds']}s → {crawl['pages_per_sec']} páginas/s")
+        print(f"  Servidor: {crawl['server']}")
+        print(f"  Rutas de extracción: {crawl['extraction_paths']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline del scraper de Goodreads")
+    parser.add_argument('--iterations', type=int, default=50, help="Repeticiones por medición")
+    parser.add_argument('--pad-kb', type=int, default=0, help="KB de marcado extra por página")
+    parser.add_argument('--crawl-pages', type=int, default=4,
+                        help="Páginas de resultados del crawl (0 = sin crawl)")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--output', help="Guardar resultados en JSON")
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest()
+
+    errors = validate_fixtures(manifest)
+    if errors:
+        print("❌ Las fixtures no coinciden con el manifest:")
+        for error in errors:
+            print(f"   - {error}")
+    else:
+        print(f"✓ {len(manifest['book_pages'])} páginas de libro y "
+              f"{len(manifest['search_pages'])} de búsqueda coinciden con el manifest")
+
+    parsing = bench_parsing(manifest, iterations=args.iterations, pad_kb=args.pad_kb)
+    crawl = None
+    if args.crawl_pages:
+        crawl = bench_crawl(search_pages=args.crawl_pages, concurrency=args.concurrency,
+                            latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    print_report(parsing, crawl)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'validation_errors': errors, 'parsing': parsing, 'crawl': crawl,
+                       'iterations': args.iterations, 'pad_kb': args.pad_kb},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
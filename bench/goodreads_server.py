@@ -0,0 +1,203 @@
+"""
+Servidor HTTP local que imita Goodreads a partir del corpus de fixtures
+
+Sirve las páginas de bench/fixtures/goodreads para medir el scraper sin
+tocar goodreads.com:
+    /search?q=...&page=N    páginas de resultados (vacía tras search_pages)
+    /book/show/<id>-<slug>  página de libro según manifest.json
+
+La latencia (latency + jitter) y la tasa de errores (503/429 con
+Retry-After) son configurables.
+
+Uso:
+    python bench/goodreads_server.py --port 8765 --latency 0.05 --error-rate 0.1
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures' / 'goodreads'
+BOOK_ID_RE = re.compile(r'/book/show/(\d+)')
+HREF_ID_RE = re.compile(rb'(/book/show/)(\d+)')
+
+# Los ids de las fixtures tienen como mucho 8 dígitos; a partir de la página 3
+# se antepone el número de página para generar libros nuevos
+ID_BASE = 10 ** 8
+
+
+def load_manifest(fixtures_dir=FIXTURES_DIR):
+    with open(Path(fixtures_dir) / 'manifest.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class FixtureServer:
+    """
+    Servidor de fixtures en un hilo de fondo (usable como context manager)
+
+    PARÁMETROS:
+        port (int): Puerto (0 = cualquiera libre)
+        latency (float): Segundos de espera por respuesta
+        jitter (float): Segundos extra aleatorios (uniforme entre 0 y jitter)
+        error_rate (float): Probabilidad de responder 503/429 en vez de la página
+        retry_after (float): Valor de la cabecera Retry-After en los errores
+        search_pages (int): Páginas de resultados con libros; a partir de la
+            tercera se reutilizan las de las fixtures con ids nuevos
+        seed (int): Semilla para latencias y errores reproducibles
+    """
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, error_rate=0.0, retry_after=1,
+                 search_pages=2, seed=0, fixtures_dir=FIXTURES_DIR):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.search_pages = search_pages
+        self.fixtures_dir = Path(fixtures_dir)
+
+        manifest = load_manifest(self.fixtures_dir)
+        self.pages = {name: (self.fixtures_dir / name).read_bytes()
+                      for section in ('book_pages', 'search_pages') for name in manifest[section]}
+        self.book_by_id = {int(BOOK_ID_RE.search(entry['url']).group(1)): name
+                           for name, entry in manifest['book_pages'].items()}
+        self.search_templates = sorted(n for n, e in manifest['search_pages'].items() if e['book_urls'])
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'search': 0, 'book': 0, 'errors': 0, 'not_found': 0}
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Resolución de rutas
+    #─────────────────────────────────────────────────────────────────────────
+
+    def search_page(self, page):
+        """HTML de la página de resultados `page` (sin libros tras search_pages)"""
+        if page < 1 or page > self.search_pages:
+            return self.pages['search_empty.html']
+
+        template = self.search_templates[(page - 1) % len(self.search_templates)]
+        body = self.pages[template]
+        if page <= len(self.search_templates):
+            return body
+
+        # Páginas sintéticas: mismos libros con ids desplazados
+        return HREF_ID_RE.sub(lambda m: m.group(1) + str(page * ID_BASE + int(m.group(2))).encode(), body)
+
+    def book_page(self, book_id):
+        """HTML de la página de libro (None si el id no está en el corpus)"""
+        name = self.book_by_id.get(book_id % ID_BASE)
+        return self.pages[name] if name else None
+
+    def _next_delay_and_error(self):
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            error = self._random.choice((503, 429)) if self._random.random() < self.error_rate else None
+        return delay, error
+
+    def _record(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, como el sitio real
+
+            def do_GET(self):
+                server._record('requests')
+                delay, error = server._next_delay_and_error()
+                if delay:
+                    time.sleep(delay)
+                if error:
+                    server._record('errors')
+                    return self._send(error, b'', {'Retry-After': str(server.retry_after)})
+
+                parts = urlsplit(self.path)
+                if parts.path == '/search':
+                    server._record('search')
+                    page = int(parse_qs(parts.query).get('page', ['1'])[0])
+                    return self._send(200, server.search_page(page))
+
+                book_id = BOOK_ID_RE.match(parts.path)
+                body = server.book_page(int(book_id.group(1))) if book_id else None
+                if body is None:
+                    server._record('not_found')
+                    return self._send(404, b'Not Found')
+                server._record('book')
+                return self._send(200, body)
+
+            def _send(self, status, body, headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Sin log por petición: ensucia la salida del benchmark
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local de fixtures de Goodreads")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Segundos de latencia por respuesta")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Latencia extra aleatoria (segundos)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Proporción de respuestas 503/429")
+    parser.add_argument('--retry-after', type=float, default=1, help="Cabecera Retry-After de los errores")
+    parser.add_argument('--search-pages', type=int, default=2, help="Páginas de resultados con libros")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = FixtureServer(port=args.port, latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, retry_after=args.retry_after,
+                           search_pages=args.search_pages, seed=args.seed)
+    print(f"Sirviendo fixtures de Goodreads en {server.base_url} (Ctrl+C para parar)")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"Peticiones atendidas: {server.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,412 @@
+"""
+Servidor HTTP local que imita el endpoint /books/v1/volumes de Google Books
+
+Responde queries isbn:, intitle: e inauthor: (combinadas con + y con OR,
+como las que genera GoogleBooksEnricher) a partir de un catálogo sintético
+y determinista. Son configurables:
+    - la distribución de latencia (fixed, uniform, exponential, lognormal)
+    - la inyección de 429: aleatoria (error_rate) o por exceso de tasa (max_rps)
+    - el tamaño de cada volumen (payload_kb, relleno en la descripción)
+También respeta el parámetro `fields` (respuesta parcial), como la API real.
+
+Uso:
+    python bench/googlebooks_server.py --port 8766 --catalog-size 50000 \
+        --latency-dist lognormal --latency-ms 80 --max-rps 20
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+VOLUMES_PATH = '/books/v1/volumes'
+TERM_RE = re.compile(r'(isbn|intitle|inauthor):(.*?)(?=\s*\+?\s*(?:isbn|intitle|inauthor):|$)')
+WORD_RE = re.compile(r'\w+')
+FIELDS_TOKEN_RE = re.compile(r'[^,()/\s]+|[,()/]')
+
+_TITLE_WORDS = ('data', 'science', 'python', 'learning', 'machine', 'statistics', 'deep',
+                'analysis', 'practical', 'introduction', 'models', 'thinking', 'business',
+                'algorithms', 'visualization', 'networks', 'inference', 'applied', 'modern',
+                'engineering', 'patterns', 'probability', 'bayesian', 'systems', 'design')
+_FIRST_NAMES = ('Ana', 'Luis', 'Marta', 'Jorge', 'Lucía', 'Pablo', 'Elena', 'Carlos', 'Sara',
+                'Diego', 'Laura', 'Hugo', 'Irene', 'Raúl', 'Nuria', 'Iván')
+_LAST_NAMES = ('García', 'Fernández', 'López', 'Martín', 'Sánchez', 'Pérez', 'Gómez', 'Ruiz',
+               'Díaz', 'Moreno', 'Álvarez', 'Romero', 'Navarro', 'Torres', 'Domínguez', 'Vega')
+_PUBLISHERS = ("O'Reilly Media", 'Manning', 'Packt Publishing', 'No Starch Press', 'Wiley', 'Springer')
+_LANGUAGES = ('en', 'en', 'en', 'es', 'fr', 'de')
+
+
+def _isbn13_check_digit(first12):
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def _isbn10_check_digit(first9):
+    total = sum(int(d) * (10 - i) for i, d in enumerate(first9))
+    check = (11 - total % 11) % 11
+    return 'X' if check == 10 else str(check)
+
+
+class SyntheticCatalog:
+    """
+    Catálogo sintético determinista: el volumen i tiene siempre los mismos
+    ISBNs, título y autores para una misma semilla
+
+    Los ISBNs son válidos (978 + 9 dígitos + control) y el ISBN-10 es el
+    equivalente del ISBN-13, como en el catálogo real.
+    """
+
+    def __init__(self, size=10000, seed=0, payload_kb=0):
+        self.size = size
+        self.payload = 'x' * (payload_kb * 1024)
+        rng = random.Random(seed)
+
+        self.volumes = []
+        self.by_isbn = {}
+        self.by_title_word = {}
+        self.by_author_word = {}
+
+        for i in range(size):
+            core = f"{i:09d}"
+            isbn10 = core + _isbn10_check_digit(core)
+            isbn13 = '978' + core + _isbn13_check_digit('978' + core)
+            title = ' '.join(rng.sample(_TITLE_WORDS, rng.randint(2, 4))).title() + f" {i}"
+            authors = [f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+                       for _ in range(rng.choice((1, 1, 1, 2)))]
+            volume = {
+                'id': f"syn{i:08d}",
+                'title': title,
+                'authors': authors,
+                'publisher': rng.choice(_PUBLISHERS),
+                'publishedDate': f"{rng.randint(1995, 2025)}-{rng.randint(1, 12):02d}",
+                'language': rng.choice(_LANGUAGES),
+                'categories': [rng.choice(('Computers', 'Mathematics', 'Business & Economics'))],
+                'isbn13': isbn13,
+                'isbn10': isbn10,
+                'price': round(rng.uniform(9, 79), 2) if rng.random() < 0.6 else None
+            }
+            self.volumes.append(volume)
+            self.by_isbn[isbn13] = i
+            self.by_isbn[isbn10] = i
+            for word in set(WORD_RE.findall(title.lower())):
+                self.by_title_word.setdefault(word, []).append(i)
+            for word in set(WORD_RE.findall(' '.join(authors).lower())):
+                self.by_author_word.setdefault(word, []).append(i)
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Búsqueda
+    #─────────────────────────────────────────────────────────────────────────
+
+    def search(self, q):
+        """Índices de los volúmenes que cumplen la query (OR de cláusulas con +)"""
+        matches = []
+        seen = set()
+        for clause in q.split(' OR '):
+            for idx in self._search_clause(clause.strip()):
+                if idx not in seen:
+                    seen.add(idx)
+                    matches.append(idx)
+        return matches
+
+    def _search_clause(self, clause):
+        result = None
+        for field, value in TERM_RE.findall(clause):
+            value = value.strip().strip('+').strip()
+            if field == 'isbn':
+                idx = self.by_isbn.get(value.replace('-', '').upper())
+                ids = {idx} if idx is not None else set()
+            else:
+                index = self.by_title_word if field == 'intitle' else self.by_author_word
+                ids = None
+                for word in WORD_RE.findall(value.lower()):
+                    word_ids = set(index.get(word, ()))
+                    ids = word_ids if ids is None else ids & word_ids
+                ids = ids or set()
+            result = ids if result is None else result & ids
+        return sorted(result or ())
+
+    def to_item(self, idx):
+        """Volumen en el formato de la API (volumeInfo + saleInfo)"""
+        v = self.volumes[idx]
+        sale_info = {'country': 'ES', 'saleability': 'NOT_FOR_SALE'}
+        if v['price'] is not None:
+            sale_info = {'country': 'ES', 'saleability': 'FOR_SALE',
+                         'retailPrice': {'amount': v['price'], 'currencyCode': 'EUR'}}
+        return {
+            'kind': 'books#volume',
+            'id': v['id'],
+            'volumeInfo': {
+                'title': v['title'],
+                'authors': v['authors'],
+                'publisher': v['publisher'],
+                'publishedDate': v['publishedDate'],
+                'description': self.payload,
+                'industryIdentifiers': [
+                    {'type': 'ISBN_13', 'identifier': v['isbn13']},
+                    {'type': 'ISBN_10', 'identifier': v['isbn10']}
+                ],
+                'categories': v['categories'],
+                'language': v['language']
+            },
+            'saleInfo': sale_info
+        }
+
+
+class LatencyModel:
+    """Latencia por respuesta en segundos según una distribución"""
+
+    DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+
+    def __init__(self, dist='fixed', latency_ms=0.0, sigma=0.5, seed=0):
+        if dist not in self.DISTRIBUTIONS:
+            raise ValueError(f"Distribución desconocida: {dist}")
+        self.dist = dist
+        self.latency = latency_ms / 1000
+        self.sigma = sigma
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        if not self.latency:
+            return 0.0
+        with self._lock:
+            if self.dist == 'fixed':
+                return self.latency
+            if self.dist == 'uniform':
+                return self._random.uniform(0, 2 * self.latency)       # media = latency
+            if self.dist == 'exponential':
+                return self._random.expovariate(1 / self.latency)      # media = latency
+            return self._random.lognormvariate(math.log(self.latency), self.sigma)  # mediana = latency
+
+
+def parse_fields(spec):
+    """
+    Árbol de un selector de respuesta parcial: 'a,b(c,d),e/f' →
+    {'a': {}, 'b': {'c': {}, 'd': {}}, 'e': {'f': {}}} ({} = campo completo)
+    """
+    tokens = FIELDS_TOKEN_RE.findall(spec)
+    pos = 0
+
+    def parse_list():
+        nonlocal pos
+        tree = {}
+        while pos < len(tokens) and tokens[pos] != ')':
+            if tokens[pos] == ',':
+                pos += 1
+                continue
+            node = tree
+            path = [tokens[pos]]
+            pos += 1
+            while pos + 1 < len(tokens) and tokens[pos] == '/':
+                path.append(tokens[pos + 1])
+                pos += 2
+            for name in path[:-1]:
+                node = node.setdefault(name, {})
+            children = {}
+            if pos < len(tokens) and tokens[pos] == '(':
+                pos += 1
+                children = parse_list()
+                pos += 1  # ')'
+            node.setdefault(path[-1], {}).update(children)
+        return tree
+
+    return parse_list()
+
+
+def project_fields(value, tree):
+    """Aplica el árbol de parse_fields a un documento JSON"""
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [project_fields(v, tree) for v in value]
+    if isinstance(value, dict):
+        return {key: project_fields(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
+
+
+class GoogleBooksServer:
+    """
+    Servidor del endpoint de volúmenes en un hilo de fondo (usable como context manager)
+
+    PARÁMETROS:
+        catalog (SyntheticCatalog): Catálogo a servir
+        latency (LatencyModel): Latencia por respuesta
+        error_rate (float): Probabilidad de responder 429 aleatoriamente
+        max_rps (float): Tasa máxima aceptada; por encima se responde 429
+        retry_after (float): Valor de la cabecera Retry-After de los 429
+    """
+
+    def __init__(self, catalog, port=0, latency=None, error_rate=0.0, max_rps=None,
+                 retry_after=1, seed=0):
+        self.catalog = catalog
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(max_rps or 0)
+        self._last_refill = time.monotonic()
+        self.stats = {'requests': 0, 'ok': 0, 'throttled': 0, 'items_returned': 0, 'bytes_sent': 0}
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    @property
+    def volumes_url(self):
+        return self.base_url + VOLUMES_PATH
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def reset_stats(self):
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Respuestas
+    #─────────────────────────────────────────────────────────────────────────
+
+    def _throttled(self):
+        """True si la petición debe recibir un 429 (aleatorio o por exceso de tasa)"""
+        with self._lock:
+            self.stats['requests'] += 1
+            if self.error_rate and self._random.random() < self.error_rate:
+                return True
+            if self.max_rps:
+                now = time.monotonic()
+                self._tokens = min(self.max_rps, self._tokens + (now - self._last_refill) * self.max_rps)
+                self._last_refill = now
+                if self._tokens < 1:
+                    return True
+                self._tokens -= 1
+            return False
+
+    def volumes(self, params):
+        """Cuerpo JSON de /volumes para los parámetros dados"""
+        q = params.get('q', [''])[0]
+        max_results = min(40, int(params.get('maxResults', ['10'])[0]))
+        start_index = int(params.get('startIndex', ['0'])[0])
+
+        matches = self.catalog.search(q)
+        page = matches[start_index:start_index + max_results]
+        body = {'kind': 'books#volumes', 'totalItems': len(matches)}
+        if page:
+            body['items'] = [self.catalog.to_item(idx) for idx in page]
+        if params.get('fields'):
+            body = project_fields(body, parse_fields(params['fields'][0]))
+        return body, len(page)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                delay = server.latency.sample()
+                if delay:
+                    time.sleep(delay)
+
+                parts = urlsplit(self.path)
+                if parts.path != VOLUMES_PATH:
+                    return self._send(404, {'error': {'code': 404, 'message': 'Not Found'}})
+
+                if server._throttled():
+                    with server._lock:
+                        server.stats['throttled'] += 1
+                    return self._send(429, {'error': {'code': 429, 'message': 'Rate Limit Exceeded'}},
+                                      {'Retry-After': str(server.retry_after)})
+
+                body, items = server.volumes(parse_qs(parts.query))
+                sent = self._send(200, body)
+                with server._lock:
+                    server.stats['ok'] += 1
+                    server.stats['items_returned'] += items
+                    server.stats['bytes_sent'] += sent
+
+            def _send(self, status, payload, headers=None):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                return len(body)
+
+            def log_message(self, format, *args):
+                pass  # Sin log por petición: ensucia la salida del benchmark
+
+        return Handler
+
+
+def add_server_arguments(parser):
+    """Opciones del servidor, compartidas con bench_enrichment.py"""
+    parser.add_argument('--catalog-size', type=int, default=10000)
+    parser.add_argument('--payload-kb', type=int, default=0, help="KB de relleno por volumen")
+    parser.add_argument('--latency-dist', choices=LatencyModel.DISTRIBUTIONS, default='lognormal')
+    parser.add_argument('--latency-ms', type=float, default=50.0,
+                        help="Media (mediana en lognormal) de la latencia en ms")
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help="Sigma de la lognormal")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Proporción de 429 aleatorios")
+    parser.add_argument('--max-rps', type=float, help="Tasa máxima antes de responder 429")
+    parser.add_argument('--retry-after', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def server_from_args(args, port=0):
+    catalog = SyntheticCatalog(size=args.catalog_size, seed=args.seed, payload_kb=args.payload_kb)
+    latency = LatencyModel(args.latency_dist, args.latency_ms, args.latency_sigma, seed=args.seed)
+    return GoogleBooksServer(catalog, port=port, latency=latency, error_rate=args.error_rate,
+                             max_rps=args.max_rps, retry_after=args.retry_after, seed=args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local del endpoint de volúmenes de Google Books")
+    parser.add_argument('--port', type=int, default=8766)
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = server_from_args(args, port=args.port)
+    print(f"Sirviendo {args.catalog_size} volúmenes en {server.volumes_url} (Ctrl+C para parar)")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"Peticiones atendidas: {server.stats}")
+
+
+if __name__ == '__main__':
+    main()
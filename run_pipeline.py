@@ -22,6 +22,10 @@ def print_banner(text):
 def main():
     """Ejecuta el pipeline completo"""
     
+    # --offline: servir todas las peticiones HTTP desde la caché en disco
+    if '--offline' in sys.argv[1:]:
+        os.environ['HTTP_CACHE_REPLAY_ONLY'] = '1'
+    
     print_banner("BOOKS PIPELINE - EJECUCIÓN COMPLETA")
     print(f"Inicio: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     
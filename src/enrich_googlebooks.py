@@ -4,116 +4,707 @@ Busca cada libro del JSON en Google Books y guarda información adicional en CSV
 """
 
 import requests
-import json
-import time
+import argparse
 import csv
+import itertools
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
 from dotenv import load_dotenv
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from utils_http import HostRateLimiter, HttpClient
+from utils_isbn import clean_isbn
+from utils_quality import save_quality_metrics
+from utils_cache import LookupCache, ResponseCache
+from utils_catalog import CatalogIndex
+from utils_jsonl import (append_manifest_entries, book_fingerprint, checkpoint_path_for,
+                         get_json_decoder, iter_books, load_checkpoint, load_manifest,
+                         manifest_log_path_for, manifest_path_for, read_books,
+                         resolve_goodreads_landing, write_json_atomic, write_manifest)
+
+
+# Máximo de resultados por petición que admite la API de Google Books
+MAX_RESULTS_PER_QUERY = 40
+
+# Cuota por defecto (peticiones/minuto). Con API key el límite es por
+# proyecto y mucho mayor que el anónimo, compartido por IP. Se puede
+# ajustar con GOOGLE_BOOKS_QUOTA_PER_MINUTE
+DEFAULT_QUOTA_PER_MINUTE = {'keyed': 600, 'keyless': 60}
+
+# Columnas del CSV de salida
+CSV_FIELDNAMES = [
+    'gb_id', 'title', 'subtitle', 'authors', 'publisher',
+    'pub_date', 'language', 'categories', 'isbn13', 'isbn10',
+    'price_amount', 'price_currency'
+]
+
+# Esquema de la landing en Parquet: ISBNs como texto (sin pasar por float),
+# precio como float y las columnas con pocos valores distintos como diccionario
+PARQUET_SCHEMA = pa.schema([
+    ('gb_id', pa.string()),
+    ('title', pa.string()),
+    ('subtitle', pa.string()),
+    ('authors', pa.string()),
+    ('publisher', pa.string()),
+    ('pub_date', pa.string()),
+    ('language', pa.dictionary(pa.int32(), pa.string())),
+    ('categories', pa.string()),
+    ('isbn13', pa.string()),
+    ('isbn10', pa.string()),
+    ('price_amount', pa.float64()),
+    ('price_currency', pa.dictionary(pa.int32(), pa.string()))
+])
+
+# Respuesta parcial (parámetro `fields`): solo los campos que usan
+# _extract_book_info y la asignación por ISBN de la búsqueda por lotes
+VOLUME_FIELDS = (
+    'totalItems,items(id,'
+    'volumeInfo(title,subtitle,authors,publisher,publishedDate,language,categories,industryIdentifiers),'
+    'saleInfo(saleability,retailPrice))'
+)
+
+# Niveles de la cascada de búsqueda, en orden de prioridad
+LOOKUP_TIERS = ('isbn13', 'isbn10', 'title_author', 'title')
 
 
 class GoogleBooksEnricher:
     """Enriquece datos de libros usando la API de Google Books"""
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, http_client=None, cache=None,
+                 requests_per_second=2.0, max_requests_per_second=None, batch_size=20,
+                 lookup_cache=None, concurrency=None, quota_per_minute=None, hedge_delay=None,
+                 catalog_index=None, json_decoder=None, fields=VOLUME_FIELDS,
+                 manifest_path=None):
+        """
+        batch_size: ISBNs por query 'isbn:A OR isbn:B ...' (1 = una petición por libro).
+        Se deja margen respecto a MAX_RESULTS_PER_QUERY porque un ISBN puede
+        devolver varias ediciones
+        lookup_cache: LookupCache con los resultados (y los "sin resultado")
+        de runs anteriores
+        concurrency: búsquedas simultáneas (default: GOOGLE_BOOKS_CONCURRENCY u 8)
+        quota_per_minute: cuota de la API; fija el techo de la cubeta de tokens
+        (default: GOOGLE_BOOKS_QUOTA_PER_MINUTE o DEFAULT_QUOTA_PER_MINUTE
+        según haya API key o no)
+        max_requests_per_second: techo explícito (tiene prioridad sobre la cuota)
+        hedge_delay: segundos tras los que se lanza en paralelo el siguiente
+        nivel de la cascada si el anterior no ha respondido (0 = todos a la
+        vez; None = secuencial, default: GOOGLE_BOOKS_HEDGE_DELAY)
+        catalog_index: CatalogIndex local (volcado masivo) que se consulta por
+        ISBN antes que la caché y la API; sus aciertos no hacen peticiones
+        json_decoder: 'orjson', 'json' o una función loads (default: JSON_DECODER
+        o orjson si está instalado)
+        fields: respuesta parcial de la API (None = recurso completo)
+        manifest_path: manifiesto de huellas de los libros ya enriquecidos y sus
+        registros; los libros sin cambios se reutilizan sin buscarlos
+        """
         load_dotenv()
         self.api_key = api_key or os.getenv('GOOGLE_BOOKS_API_KEY')
         self.base_url = "https://www.googleapis.com/books/v1/volumes"
+        self.fields = fields
+        self.json_decoder, self._json_loads = get_json_decoder(json_decoder)
+        
+        # Concurrencia y cuota
+        self.concurrency = max(1, int(concurrency or os.getenv('GOOGLE_BOOKS_CONCURRENCY', 8)))
+        self.quota_per_minute = float(
+            quota_per_minute
+            or os.getenv('GOOGLE_BOOKS_QUOTA_PER_MINUTE')
+            or DEFAULT_QUOTA_PER_MINUTE['keyed' if self.api_key else 'keyless']
+        )
+        max_rps = max_requests_per_second or self.quota_per_minute / 60
+        
+        # Búsqueda especulativa de los niveles de respaldo: cada búsqueda puede
+        # tener varias peticiones en vuelo, así que el pool y el límite de
+        # peticiones simultáneas crecen en proporción (la tasa sigue limitada
+        # por la cubeta de tokens)
+        hedge_delay = hedge_delay if hedge_delay is not None else os.getenv('GOOGLE_BOOKS_HEDGE_DELAY')
+        self.hedge_delay = float(hedge_delay) if hedge_delay not in (None, '') else None
+        max_in_flight = self.concurrency
+        self._hedge_executor = None
+        if self.hedge_delay is not None:
+            max_in_flight = self.concurrency * len(LOOKUP_TIERS)
+            self._hedge_executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        
+        # Control de tasa adaptativo (AIMD): arranca a requests_per_second,
+        # sube mientras la API responde bien (hasta la cuota) y baja ante
+        # 429/5xx (Retry-After). Todas las búsquedas concurrentes comparten
+        # la misma cubeta de tokens
+        if http_client is not None and http_client.rate_limiter is not None:
+            self.rate_limiter = http_client.rate_limiter
+        else:
+            self.rate_limiter = HostRateLimiter(
+                requests_per_second=min(requests_per_second, max_rps),
+                max_in_flight=max_in_flight,
+                adaptive=True,
+                max_rps=max_rps
+            )
+        self._owns_http = http_client is None
+        self.http = http_client or HttpClient(
+            pool_size=max_in_flight,
+            rate_limiter=self.rate_limiter,
+            cache=cache
+        )
+        self.lookup_cache = lookup_cache
+        self.catalog_index = catalog_index
+        self.manifest_path = Path(manifest_path) if manifest_path else None
+        self.manifest = load_manifest(self.manifest_path) if self.manifest_path else None
+        self.manifest_updates = {}   # Entradas nuevas aún sin guardar en el manifiesto
+        self.incremental_stats = {'reused': 0, 'fetched': 0}
+        self.batch_size = max(1, min(int(batch_size), MAX_RESULTS_PER_QUERY))
+        self.batch_stats = {'batch_requests': 0, 'batched_books': 0, 'resolved_in_batch': 0}
+        self._stats_lock = threading.Lock()
+        self.tier_wins = {tier: 0 for tier in LOOKUP_TIERS + ('none',)}
+        self.hedge_stats = {'speculative_requests': 0, 'cancelled': 0, 'discarded': 0}
+        self.decode_stats = {'responses': 0, 'bytes': 0, 'parse_seconds': 0.0}
+        self.run_metrics = {}
         self.books_enriched = []
         
         if self.api_key:
             print("✓ Usando API Key de Google Books (mejor límite de requests)")
         else:
             print("⚠ No se encontró API Key - usando límite gratuito reducido")
+        print(f"  - Cuota: {self.quota_per_minute:.0f} peticiones/min, "
+              f"{self.concurrency} búsquedas simultáneas")
+    
+    def close(self):
+        """
+        Libera el pool de la búsqueda especulativa (sin esperar a los niveles
+        en vuelo y cancelando los que aún no han empezado) y la sesión HTTP
+        si la creó el enriquecedor
+        """
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+            self._hedge_executor = None
+        if self._owns_http:
+            self.http.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
     
     def enrich_from_json(self, json_path):
         """
-        Lee el JSON de Goodreads y enriquece cada libro
+        Lee el JSON (o JSONL) de Goodreads y enriquece cada libro
         """
         print(f"Leyendo datos de: {json_path}")
         
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        books = data.get('books', [])
+        books, _ = read_books(json_path)
         print(f"Se encontraron {len(books)} libros para enriquecer")
+        start = time.perf_counter()
         
-        for idx, book in enumerate(books, 1):
+        results = self._enrich_books(books)
+        elapsed = time.perf_counter() - start
+        if self.manifest is not None:
+            self.manifest.update(self.manifest_updates)
+            self.manifest_updates = {}
+            write_manifest(self.manifest_path, self.manifest)
+        
+        # Resultados en el orden de entrada
+        for idx, (book, (enriched, source)) in enumerate(zip(books, results), 1):
             print(f"\n[{idx}/{len(books)}] Procesando: {book.get('title', 'Sin título')}")
             
-            enriched = self._search_google_books(book)
+            if source == 'manifest':
+                print(f"  ✓ Sin cambios: reutilizado del manifiesto")
+            elif source == 'catalog':
+                print(f"  ✓ Resuelto desde el catálogo local")
+            elif source == 'cache':
+                print(f"  ✓ Resuelto desde la caché de búsquedas")
+            elif source == 'batch':
+                print(f"  ✓ Resuelto en la búsqueda por lotes de ISBN")
             
             if enriched:
                 self.books_enriched.append(enriched)
                 print(f"  ✓ Libro enriquecido exitosamente")
             else:
                 print(f"  ⚠ No se encontró información en Google Books")
+        
+        self._finish_run(len(books), len(self.books_enriched), elapsed)
+    
+    def enrich_streaming(self, input_path, output_csv, chunk_size=500, resume=False):
+        """
+        Enriquecimiento en streaming: lee la landing de Goodreads libro a libro
+        (array JSON o JSONL), la procesa en bloques de chunk_size y añade al CSV
+        las filas de cada bloque en cuanto termina
+        
+        Tras cada bloque hace fsync del CSV y guarda un checkpoint atómico
+        (<csv>.checkpoint.json) con los libros procesados y el tamaño del CSV.
+        Con resume=True se descarta lo escrito después del último checkpoint y
+        se continúa saltando los libros ya procesados. La memoria no depende
+        del tamaño del catálogo (self.books_enriched no se llena)
+        
+        Con manifiesto, las entradas nuevas de cada bloque se añaden a su
+        registro append-only antes del checkpoint, en lugar de acumularse en
+        memoria hasta el final del run
+        """
+        output_csv = Path(output_csv)
+        checkpoint_path = checkpoint_path_for(output_csv)
+        checkpoint = load_checkpoint(checkpoint_path) if resume else None
+        
+        skip, rows_written = 0, 0
+        if checkpoint and checkpoint.get('input') == str(input_path) and output_csv.exists():
+            skip = checkpoint['books_processed']
+            rows_written = checkpoint['rows_written']
+            # Filas escritas después del checkpoint: se volverán a generar
+            with open(output_csv, 'rb+') as f:
+                f.truncate(checkpoint['csv_bytes'])
+            print(f"Reanudando desde el checkpoint: {skip} libros ya procesados, "
+                  f"{rows_written} filas en {output_csv}")
+        elif resume:
+            print("⚠ No hay checkpoint compatible: se empieza desde el principio")
+        
+        print(f"Leyendo datos en streaming de: {input_path}")
+        output_csv.parent.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        processed = skip
+        
+        with open(output_csv, 'a' if skip else 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
+            if not skip:
+                writer.writeheader()
             
-            # Pausa para respetar límites de API
-            time.sleep(0.5)
+            books = itertools.islice(iter_books(input_path), skip, None)
+            while True:
+                chunk = list(itertools.islice(books, chunk_size))
+                if not chunk:
+                    break
+                
+                rows = [enriched for enriched, _ in self._enrich_books(chunk) if enriched]
+                writer.writerows(rows)
+                f.flush()
+                os.fsync(f.fileno())
+                if self.manifest is not None:
+                    append_manifest_entries(self.manifest_path, self.manifest_updates)
+                    self.manifest_updates = {}
+                
+                processed += len(chunk)
+                rows_written += len(rows)
+                write_json_atomic(checkpoint_path, {
+                    'input': str(input_path),
+                    'books_processed': processed,
+                    'rows_written': rows_written,
+                    'csv_bytes': os.fstat(f.fileno()).st_size,
+                    'updated_at': datetime.now().isoformat()
+                })
+                print(f"  ✓ {processed} libros procesados, {rows_written} filas en el CSV")
+        
+        elapsed = time.perf_counter() - start
+        self._finish_run(processed - skip, rows_written, elapsed)
+        self.run_metrics['streaming'] = {
+            'output': str(output_csv),
+            'resumed_from': skip,
+            'books_processed': processed,
+            'rows_written': rows_written
+        }
+    
+    def _enrich_books(self, books):
+        """
+        Enriquece una lista de libros
+        Returns: [(registro o None, origen), ...] en el orden de entrada,
+        con origen 'manifest', 'catalog', 'cache', 'batch' o 'search'
+        """
+        # Enriquecimiento incremental: los libros cuya huella ya está en el
+        # manifiesto reutilizan su registro; solo se buscan los nuevos o cambiados
+        manifest_results = {}
+        fingerprints = None
+        if self.manifest is not None:
+            fingerprints = [book_fingerprint(book) for book in books]
+            manifest_results = {idx: self.manifest[fp] for idx, fp in enumerate(fingerprints)
+                                if fp in self.manifest}
+            books = [book if idx not in manifest_results else {} for idx, book in enumerate(books)]
+            self.incremental_stats['reused'] += len(manifest_results)
+            self.incremental_stats['fetched'] += len(books) - len(manifest_results)
+        
+        # Primero el catálogo local: búsqueda por ISBN en disco, sin red
+        catalog_results = {}
+        if self.catalog_index is not None:
+            for field in ('isbn13', 'isbn10'):
+                pending = [idx for idx, book in enumerate(books) if idx not in manifest_results
+                           and idx not in catalog_results and book.get(field)]
+                records = self.catalog_index.get_many([books[idx][field] for idx in pending])
+                catalog_results.update((idx, record) for idx, record in zip(pending, records) if record)
+            books = [book if idx not in catalog_results else {} for idx, book in enumerate(books)]
+        
+        # Libros que la caché de búsquedas resuelve por completo (con o sin
+        # resultado): no necesitan ninguna petición
+        cached_results = {}
+        if self.lookup_cache is not None:
+            self.lookup_cache.prefetch(q for book in books for q in self._lookup_queries(book))
+            for idx, book in enumerate(books):
+                if idx in manifest_results or idx in catalog_results:
+                    continue
+                resolved, record = self._cached_result(book)
+                if resolved:
+                    cached_results[idx] = record
+        
+        # Después los libros con ISBN, agrupados en queries por lotes; las
+        # búsquedas individuales quedan solo para lo que el lote no resolvió
+        batch_results = {}
+        if self.batch_size > 1:
+            batch_results = self._batch_isbn_lookup(
+                [book if idx not in cached_results else {} for idx, book in enumerate(books)]
+            )
+        
+        # El resto, con la cascada de búsquedas individuales en paralelo
+        pending = [idx for idx in range(len(books)) if idx not in manifest_results
+                   and idx not in catalog_results and idx not in cached_results
+                   and idx not in batch_results]
+        print(f"Búsquedas individuales: {len(pending)} libros ({self.concurrency} en paralelo)")
+        search_results = dict(zip(pending, self._run_concurrently(
+            self._search_google_books, [books[idx] for idx in pending]
+        )))
+        
+        results = []
+        for idx in range(len(books)):
+            if idx in manifest_results:
+                results.append((manifest_results[idx], 'manifest'))
+                continue
+            if idx in catalog_results:
+                results.append((catalog_results[idx], 'catalog'))
+            elif idx in cached_results:
+                results.append((cached_results[idx], 'cache'))
+            elif idx in batch_results:
+                results.append((batch_results[idx], 'batch'))
+            else:
+                results.append((search_results[idx], 'search'))
+            # Solo los libros enriquecidos: los "sin resultado" (o con error de
+            # red) se vuelven a intentar en el siguiente run
+            if fingerprints is not None and results[-1][0]:
+                self.manifest_updates[fingerprints[idx]] = results[-1][0]
+        return results
+    
+    def _finish_run(self, books_total, books_enriched, elapsed):
+        """Resumen del run por consola y en self.run_metrics"""
+        books_per_minute = books_total / elapsed * 60 if elapsed else 0.0
+        print(f"\n✓ Enriquecimiento completado: {books_enriched} libros")
+        print(f"  - Tiempo: {elapsed:.1f}s ({books_per_minute:.0f} libros/min)")
+        if self.manifest is not None:
+            print(f"  - Incremental: {self.incremental_stats['reused']} libros reutilizados del "
+                  f"manifiesto, {self.incremental_stats['fetched']} buscados")
+        
+        pool = self.http.pool_stats()
+        rate_control = self.rate_limiter.stats()
+        print(f"  - Conexiones reutilizadas: {pool['reuse_ratio']:.0%} "
+              f"({pool['handshakes']} handshakes en {pool['requests']} requests)")
+        print(f"  - Eventos de throttling: {rate_control['throttle_events']} "
+              f"({rate_control['requeued_requests']} peticiones reencoladas)")
+        if self.batch_stats['batch_requests']:
+            print(f"  - Búsqueda por lotes: {self.batch_stats['resolved_in_batch']}/"
+                  f"{self.batch_stats['batched_books']} libros resueltos en "
+                  f"{self.batch_stats['batch_requests']} peticiones")
+        print(f"  - Nivel de la cascada que resolvió cada búsqueda: {self.tier_wins}")
+        if self.hedge_delay is not None:
+            print(f"  - Búsqueda especulativa: {self.hedge_stats['speculative_requests']} peticiones "
+                  f"adelantadas, {self.hedge_stats['cancelled']} canceladas, "
+                  f"{self.hedge_stats['discarded']} descartadas")
+        decode = self._decode_summary()
+        print(f"  - Respuestas JSON ({decode['decoder']}, fields={'sí' if decode['fields'] else 'no'}): "
+              f"{decode['responses']} respuestas, {decode['bytes_per_response']:.0f} bytes y "
+              f"{decode['parse_us_per_response']:.0f} µs de parseo de media")
+        if self.catalog_index is not None:
+            print(f"  - Catálogo local: {self.catalog_index.hits} ISBNs resueltos sin red "
+                  f"({len(self.catalog_index)} claves en el índice)")
+        if self.lookup_cache is not None:
+            self.lookup_cache.flush()
+            lookup_stats = self.lookup_cache.stats
+            print(f"  - Caché de búsquedas: {lookup_stats['hits']} aciertos, "
+                  f"{lookup_stats['negative_hits']} sin resultado, {lookup_stats['misses']} fallos")
+        
+        self.run_metrics = {
+            'timestamp': datetime.now().isoformat(),
+            'books_total': books_total,
+            'books_enriched': books_enriched,
+            'elapsed_seconds': round(elapsed, 2),
+            'books_per_minute': round(books_per_minute, 1),
+            'concurrency': self.concurrency,
+            'quota_per_minute': self.quota_per_minute,
+            'http_pool': pool,
+            'rate_control': rate_control,
+            'isbn_batching': dict(self.batch_stats, batch_size=self.batch_size),
+            'lookup_cache': dict(self.lookup_cache.stats) if self.lookup_cache is not None else None,
+            'catalog_index': ({'hits': self.catalog_index.hits, 'keys': len(self.catalog_index)}
+                              if self.catalog_index is not None else None),
+            'tier_wins': dict(self.tier_wins),
+            'hedging': dict(self.hedge_stats, hedge_delay=self.hedge_delay),
+            'json_decode': decode,
+            'incremental': (dict(self.incremental_stats, manifest=str(self.manifest_path))
+                            if self.manifest is not None else None)
+        }
+    
+    def _decode_summary(self):
+        """Bytes y tiempo de parseo de las respuestas de la API (total y media)"""
+        stats = self.decode_stats
+        responses = stats['responses']
+        return {
+            'decoder': self.json_decoder,
+            'fields': self.fields is not None,
+            'responses': responses,
+            'bytes': stats['bytes'],
+            'bytes_per_response': round(stats['bytes'] / responses, 1) if responses else 0.0,
+            'parse_ms_total': round(stats['parse_seconds'] * 1000, 2),
+            'parse_us_per_response': round(stats['parse_seconds'] * 1e6 / responses, 1) if responses else 0.0
+        }
+    
+    def _batch_isbn_lookup(self, books):
+        """
+        Busca los libros con ISBN en lotes de batch_size con una sola query
+        'isbn:A OR isbn:B OR ...' y asigna cada resultado a su libro por
+        industryIdentifiers (ISBN-13 o ISBN-10)
+        Returns: {índice del libro en `books`: registro enriquecido}
+        """
+        pending = []
+        for idx, book in enumerate(books):
+            isbns = [clean_isbn(book.get(field)) for field in ('isbn13', 'isbn10')]
+            isbns = [isbn for isbn in isbns if isbn]
+            if isbns:
+                pending.append((idx, isbns))
+        
+        chunks = [pending[start:start + self.batch_size]
+                  for start in range(0, len(pending), self.batch_size)]
+        if chunks:
+            print(f"Búsqueda por lotes: {len(pending)} ISBNs en {len(chunks)} peticiones")
+        
+        results = {}
+        for chunk_results in self._run_concurrently(self._lookup_isbn_batch, chunks):
+            results.update(chunk_results)
+        
+        with self._stats_lock:
+            self.batch_stats['resolved_in_batch'] += len(results)
+        return results
+    
+    def _lookup_isbn_batch(self, chunk):
+        """
+        Una query por lotes para chunk = [(índice, [isbns del libro]), ...]
+        Returns: {índice: registro enriquecido} de los libros resueltos
+        """
+        query = ' OR '.join(self._isbn_query(isbns[0]) for _, isbns in chunk)
+        items = self._query_items(query, MAX_RESULTS_PER_QUERY) or []
+        with self._stats_lock:
+            self.batch_stats['batch_requests'] += 1
+            self.batch_stats['batched_books'] += len(chunk)
+        
+        # Índice ISBN → item (el primero que lo contenga, como con maxResults=1)
+        items_by_isbn = {}
+        for item in items:
+            for identifier in item.get('volumeInfo', {}).get('industryIdentifiers', []):
+                items_by_isbn.setdefault(clean_isbn(identifier.get('identifier')), item)
+        
+        results = {}
+        for idx, isbns in chunk:
+            matched = next((isbn for isbn in isbns if isbn in items_by_isbn), None)
+            if matched:
+                results[idx] = self._extract_book_info(items_by_isbn[matched])
+                # Se guarda con la clave de la búsqueda individual de cada ISBN
+                # del libro (niveles isbn13 e isbn10): ninguno vuelve a buscarse.
+                # Lo no resuelto no se guarda como negativo: lo decide la
+                # búsqueda individual
+                if self.lookup_cache is not None:
+                    for isbn in isbns:
+                        self.lookup_cache.put(self._isbn_query(isbn), results[idx])
+        return results
+    
+    def _run_concurrently(self, fn, items):
+        """
+        Ejecuta fn(item) para cada item con hasta self.concurrency llamadas
+        simultáneas y devuelve los resultados en el orden de entrada
         
-        print(f"\n✓ Enriquecimiento completado: {len(self.books_enriched)} libros")
+        Cada búsqueda (bloqueante, sobre la sesión HTTP compartida) corre en un
+        pool de hilos; el límite de tasa lo impone la cubeta de tokens del rate
+        limiter, común a todas ellas. No usa un bucle de eventos, así que
+        también funciona dentro de uno ya en marcha (por ejemplo, un notebook)
+        """
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(fn, items))
     
     def _search_google_books(self, book):
         """
         Busca un libro en Google Books API
         Prioridad: ISBN13 > ISBN10 > título+autor
         """
-        # Intentar búsqueda por ISBN (más precisa)
-        if book.get('isbn13'):
-            result = self._query_api(f"isbn:{book['isbn13']}")
-            if result:
-                return result
+        tiers = self._lookup_tiers(book)
+        if self._hedge_executor is not None and len(tiers) > 1:
+            return self._search_hedged(tiers)
         
-        if book.get('isbn10'):
-            result = self._query_api(f"isbn:{book['isbn10']}")
+        for tier, query in tiers:
+            result = self._query_api(query)
             if result:
+                self._record_tier_win(tier)
                 return result
         
+        self._record_tier_win('none')
+        return None
+    
+    def _search_hedged(self, tiers):
+        """
+        Cascada especulativa: si un nivel no responde en hedge_delay segundos
+        se lanza también el siguiente. Gana siempre el nivel de mayor
+        prioridad con resultado (un nivel inferior solo cuenta cuando todos
+        los anteriores han fallado) y los niveles pendientes se cancelan
+        """
+        futures = [self._hedge_executor.submit(self._query_api, tiers[0][1])]
+        current = 0  # Nivel de mayor prioridad aún sin respuesta
+        
+        try:
+            while current < len(tiers):
+                # Esperar al nivel actual; si tarda más de hedge_delay, adelantar el siguiente
+                can_hedge = len(futures) < len(tiers)
+                done, _ = wait([futures[current]], timeout=self.hedge_delay if can_hedge else None)
+                if not done:
+                    futures.append(self._hedge_executor.submit(self._query_api, tiers[len(futures)][1]))
+                    with self._stats_lock:
+                        self.hedge_stats['speculative_requests'] += 1
+                    continue
+                
+                result = futures[current].result()
+                if result:
+                    self._cancel_pending(futures[current + 1:])
+                    self._record_tier_win(tiers[current][0])
+                    return result
+                
+                current += 1
+                if current == len(futures) and current < len(tiers):
+                    futures.append(self._hedge_executor.submit(self._query_api, tiers[current][1]))
+        except BaseException:
+            # Un nivel falló (p. ej. CacheMiss en modo replay): los demás se cancelan
+            self._cancel_pending([future for future in futures if not future.done()])
+            raise
+        
+        self._record_tier_win('none')
+        return None
+    
+    def _cancel_pending(self, futures):
+        """Cancela los niveles que aún no han empezado; el resto se descarta"""
+        cancelled = sum(1 for future in futures if future.cancel())
+        with self._stats_lock:
+            self.hedge_stats['cancelled'] += cancelled
+            self.hedge_stats['discarded'] += len(futures) - cancelled
+    
+    def _record_tier_win(self, tier):
+        with self._stats_lock:
+            self.tier_wins[tier] += 1
+    
+    @staticmethod
+    def _isbn_query(isbn):
+        """
+        Query por ISBN con el ISBN limpio: es también la clave de la caché de
+        búsquedas, así que la búsqueda por lotes y la individual coinciden.
+        None si no hay ISBN
+        """
+        isbn = clean_isbn(isbn)
+        return f"isbn:{isbn}" if isbn else None
+    
+    @staticmethod
+    def _lookup_tiers(book):
+        """(nivel, query) a probar para un libro, en orden de prioridad"""
+        tiers = []
+        
+        # Búsqueda por ISBN (más precisa)
+        for tier in ('isbn13', 'isbn10'):
+            query = GoogleBooksEnricher._isbn_query(book.get(tier))
+            if query:
+                tiers.append((tier, query))
+        
         # Fallback: búsqueda por título y autor
         if book.get('title') and book.get('author'):
-            query = f"intitle:{book['title']}+inauthor:{book['author']}"
-            result = self._query_api(query)
-            if result:
-                return result
+            tiers.append(('title_author', f"intitle:{book['title']}+inauthor:{book['author']}"))
         
         # Último intento: solo título
         if book.get('title'):
-            result = self._query_api(f"intitle:{book['title']}")
-            if result:
-                return result
+            tiers.append(('title', f"intitle:{book['title']}"))
         
-        return None
+        return tiers
+    
+    @classmethod
+    def _lookup_queries(cls, book):
+        """Queries a probar para un libro, en orden de prioridad"""
+        return [query for _, query in cls._lookup_tiers(book)]
+    
+    def _cached_result(self, book):
+        """
+        Recorre la cascada de queries de un libro solo con la caché de búsquedas
+        Returns: (resuelto, registro); resuelto=False si alguna query necesaria
+        no está en caché
+        """
+        for query in self._lookup_queries(book):
+            entry = self.lookup_cache.get(query)
+            if entry is None:
+                return False, None
+            found, record = entry
+            if found:
+                return True, record
+        return True, None
     
     def _query_api(self, query):
         """
         Realiza una query a la API de Google Books
+        (consultando antes la caché de búsquedas, si la hay)
+        """
+        if self.lookup_cache is not None:
+            entry = self.lookup_cache.get(query)
+            if entry is not None:
+                return entry[1]
+        
+        items = self._query_items(query, 1)
+        if items is None:
+            return None  # Error de red: no se guarda como "sin resultado"
+        
+        # Extraer información del primer resultado
+        record = self._extract_book_info(items[0]) if items else None
+        if self.lookup_cache is not None:
+            self.lookup_cache.put(query, record)
+        return record
+    
+    def _query_items(self, query, max_results):
+        """
+        Devuelve los items de una query a la API (lista vacía si no hay
+        resultados, None si la petición falla)
         """
         params = {
             'q': query,
-            'maxResults': 1,
+            'maxResults': max_results,
             'printType': 'books'
         }
+        if self.fields:
+            params['fields'] = self.fields
         
         if self.api_key:
             params['key'] = self.api_key
         
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
+            response = self.http.get(self.base_url, params=params)
             response.raise_for_status()
             
-            data = response.json()
+            data = self._decode(response.content)
             
             if data.get('totalItems', 0) == 0:
-                return None
+                return []
             
-            # Extraer información del primer resultado
-            item = data['items'][0]
-            return self._extract_book_info(item)
+            return data.get('items', [])
             
-        except requests.RequestException as e:
+        except (requests.RequestException, ValueError) as e:
             print(f"    Error en API request: {e}")
             return None
     
+    def _decode(self, content):
+        """Decodifica el cuerpo de una respuesta registrando bytes y tiempo de parseo"""
+        start = time.perf_counter()
+        data = self._json_loads(content)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.decode_stats['responses'] += 1
+            self.decode_stats['bytes'] += len(content)
+            self.decode_stats['parse_seconds'] += elapsed
+        return data
+    
     def _extract_book_info(self, item):
         """
         Extrae campos relevantes de un item de Google Books
@@ -166,11 +757,7 @@ class GoogleBooksEnricher:
             print("⚠ No hay datos para guardar")
             return
         
-        fieldnames = [
-            'gb_id', 'title', 'subtitle', 'authors', 'publisher',
-            'pub_date', 'language', 'categories', 'isbn13', 'isbn10',
-            'price_amount', 'price_currency'
-        ]
+        fieldnames = CSV_FIELDNAMES
         
         with open(output_path, 'w', encoding='utf-8', newline='') as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
@@ -190,25 +777,106 @@ class GoogleBooksEnricher:
             non_null = sum(1 for book in self.books_enriched if book.get(field))
             pct = (non_null / len(self.books_enriched)) * 100
             print(f"    - {field}: {non_null}/{len(self.books_enriched)} ({pct:.1f}%)")
+    
+    def save_to_parquet(self, output_path):
+        """
+        Guarda los datos enriquecidos en Parquet con PARQUET_SCHEMA
+        (los textos vacíos se guardan como nulos, igual que al leer el CSV)
+        """
+        if not self.books_enriched:
+            print("⚠ No hay datos para guardar")
+            return
+        
+        rows = [{field: (value if value != '' else None) for field, value in book.items()}
+                for book in self.books_enriched]
+        table = pa.Table.from_pylist(rows, schema=PARQUET_SCHEMA)
+        pq.write_table(table, output_path, compression='zstd')
+        
+        print(f"\n✓ Datos guardados en: {output_path}")
+        print(f"  - Formato: Parquet (tipado)")
+        print(f"  - Total de registros: {table.num_rows}")
 
 
-def main():
-    """Función principal para ejecutar el enriquecimiento"""
+def csv_to_parquet(csv_path, parquet_path):
+    """
+    Convierte el CSV de la landing a Parquet con PARQUET_SCHEMA, por bloques
+    (para el modo streaming: no carga el CSV completo en memoria)
+    Returns: número de filas escritas
+    """
+    reader = pa_csv.open_csv(csv_path, convert_options=pa_csv.ConvertOptions(
+        column_types={field.name: field.type for field in PARQUET_SCHEMA},
+        strings_can_be_null=True
+    ))
+    rows = 0
+    with pq.ParquetWriter(parquet_path, PARQUET_SCHEMA, compression='zstd') as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    print(f"\n✓ Datos guardados en: {parquet_path} (Parquet tipado, {rows} registros)")
+    return rows
+
+
+def main(argv=None):
+    """
+    Función principal para ejecutar el enriquecimiento
+    
+    OPCIONES:
+        --stream           Lee la landing libro a libro y escribe el CSV por bloques
+        --resume           Continúa un enriquecimiento en streaming desde su checkpoint
+        --chunk-size N     Libros por bloque en modo streaming (default: 500)
+        --concurrency N    Búsquedas simultáneas (default: GOOGLE_BOOKS_CONCURRENCY u 8)
+        --full             Enriquece todos los libros (ignora el manifiesto del run anterior)
+        --parquet          Guarda también landing/googlebooks_books.parquet (tipado)
+    """
+    parser = argparse.ArgumentParser(description="Enriquecimiento con Google Books")
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--resume', action='store_true')
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--concurrency', type=int)
+    parser.add_argument('--full', action='store_true')
+    parser.add_argument('--parquet', action='store_true')
+    # parse_known_args: tolera las opciones de run_pipeline.py
+    args, _ = parser.parse_known_args(argv)
     
     # Crear carpetas necesarias si no existen
-    import os
     os.makedirs('landing', exist_ok=True)
     
-    # Inicializar enriquecedor
-    enricher = GoogleBooksEnricher()
+    # Procesar JSON/JSONL de Goodreads (el más reciente de los dos)
+    input_json = resolve_goodreads_landing("landing")
+    output_csv = "landing/googlebooks_books.csv"
+    output_parquet = "landing/googlebooks_books.parquet"
     
-    # Procesar JSON de Goodreads
-    input_json = "landing/goodreads_books.json"
-    enricher.enrich_from_json(input_json)
+    # Inicializar enriquecedor (caché HTTP en disco, caché de búsquedas en SQLite
+    # y catálogo local opcional, configurables en .env). Con el manifiesto solo
+    # se buscan los libros nuevos o cambiados desde el run anterior
+    manifest_path = manifest_path_for(output_csv)
+    if args.full:
+        manifest_path.unlink(missing_ok=True)
+        manifest_log_path_for(manifest_path).unlink(missing_ok=True)
+    with GoogleBooksEnricher(cache=ResponseCache.from_env(),
+                             lookup_cache=LookupCache.from_env(),
+                             concurrency=args.concurrency,
+                             catalog_index=CatalogIndex.from_env(),
+                             manifest_path=manifest_path) as enricher:
+        if args.stream or args.resume:
+            # Las filas se escriben en el CSV a medida que se completan
+            enricher.enrich_streaming(input_json, output_csv,
+                                      chunk_size=args.chunk_size, resume=args.resume)
+            enricher.lookup_cache.close()
+            if args.parquet:
+                csv_to_parquet(output_csv, output_parquet)
+        else:
+            enricher.enrich_from_json(input_json)
+            enricher.lookup_cache.close()
+            
+            # Guardar CSV (y Parquet tipado si se pide)
+            enricher.save_to_csv(output_csv)
+            if args.parquet:
+                enricher.save_to_parquet(output_parquet)
     
-    # Guardar CSV
-    output_csv = "landing/googlebooks_books.csv"
-    enricher.save_to_csv(output_csv)
+    # Métricas del run (tasa actual, throttling, pool de conexiones)
+    os.makedirs('docs', exist_ok=True)
+    save_quality_metrics(enricher.run_metrics, "docs/enrichment_metrics.json")
     
     print("\n" + "="*60)
     print("EJERCICIO 2 COMPLETADO")
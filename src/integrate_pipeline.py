@@ -12,6 +12,37 @@ from datetime import datetime
 import hashlib
 import re
 import os
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from utils_isbn import ISBN_KEY_MISSING, decode_isbn_array, encode_isbn_array
+from utils_jsonl import read_books, resolve_goodreads_landing
+
+
+# Columnas de la landing de Google Books que usa la integración
+GOOGLEBOOKS_COLUMNS = [
+    'gb_id', 'title', 'authors', 'publisher', 'pub_date', 'language',
+    'categories', 'isbn13', 'isbn10', 'price_amount', 'price_currency'
+]
+
+# Por encima de este número de libros el emparejamiento no lista cada libro
+MAX_MATCH_LOG_LINES = 100
+
+# Niveles exactos del emparejamiento, en orden: (matched_by, claves del join)
+EXACT_MATCH_TIERS = [
+    ('isbn', ['isbn_key']),
+    ('title_author', ['titulo_normalizado', 'autor_normalizado']),
+    ('title', ['titulo_normalizado']),
+]
+
+# Nivel difuso: similitud mínima de título y tamaño máximo de un bloque de
+# candidatos (los bloques mayores, p. ej. 'data science', no se comparan)
+FUZZY_MATCH_THRESHOLD = 0.85
+MAX_BLOCK_SIZE = 1000
+
+# bool() elemento a elemento sobre arrays object (reglas de supervivencia)
+_TRUTHY = np.frompyfunc(bool, 1, 1)
 
 
 class DataIntegrator:
@@ -39,6 +70,8 @@ class DataIntegrator:
         # Dataframes
         self.goodreads_df = None
         self.googlebooks_df = None
+        self.goodreads_path = None
+        self.googlebooks_path = None
         self.dim_book = None
         self.book_source_detail = None
         
@@ -66,6 +99,17 @@ class DataIntegrator:
         
         return title.strip()
     
+    def normalize_author_for_matching(self, authors):
+        """Normaliza el autor principal (el primero de la lista) para el emparejamiento"""
+        if pd.isna(authors) or not authors:
+            return ""
+        
+        author = str(authors).split(',')[0]
+        author = unicodedata.normalize('NFKD', author).encode('ascii', 'ignore').decode('ascii').lower()
+        author = re.sub(r'[^a-z\s]', '', author)
+        
+        return ' '.join(author.split())
+    
     def extract_year_from_date(self, date_str):
         """Extrae el año de una fecha"""
         if pd.isna(date_str):
@@ -78,25 +122,42 @@ class DataIntegrator:
         
         return None
     
+    def compute_isbn_keys(self, df):
+        """
+        Clave uint64 del ISBN de cada fila: el ISBN-13, o el ISBN-10 convertido
+        a ISBN-13 si no lo hay; ISBN_KEY_MISSING (0) si la fila no tiene ISBN
+        
+        Emparejar, deduplicar y ordenar sobre esta columna evita comparar y
+        hashear strings (y los ISBNs que llegan como float desde un CSV)
+        """
+        keys = np.zeros(len(df), dtype=np.uint64)
+        for column in ('isbn13', 'isbn10'):
+            if column in df.columns:
+                missing = keys == ISBN_KEY_MISSING
+                keys[missing] = np.asarray(encode_isbn_array(df[column]))[missing]
+        return keys
+    
     def load_goodreads_data(self):
-        """Carga datos de Goodreads"""
-        json_path = self.landing_dir / "goodreads_books.json"
+        """Carga datos de Goodreads (goodreads_books.json o .jsonl, el más reciente)"""
+        json_path = resolve_goodreads_landing(self.landing_dir)
         
         print(f"Cargando: {json_path}")
         
         if not json_path.exists():
             raise FileNotFoundError(f"No se encuentra el archivo: {json_path}")
         
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        books = data.get('books', [])
+        books, _ = read_books(json_path)
+        self.goodreads_path = json_path
         self.goodreads_df = pd.DataFrame(books)
         
         self.goodreads_df['source_index'] = range(len(self.goodreads_df))
+        self.goodreads_df['isbn_key'] = self.compute_isbn_keys(self.goodreads_df)
         self.goodreads_df['titulo_normalizado'] = self.goodreads_df['title'].apply(
             self.normalize_title_for_matching
         )
+        self.goodreads_df['autor_normalizado'] = self.goodreads_df['author'].apply(
+            self.normalize_author_for_matching
+        )
         
         print(f"  ✓ {len(self.goodreads_df)} registros cargados de Goodreads")
         
@@ -115,25 +176,40 @@ class DataIntegrator:
         return self.goodreads_df
     
     def load_googlebooks_data(self):
-        """Carga datos de Google Books"""
-        csv_path = self.landing_dir / "googlebooks_books.csv"
-        
-        print(f"Cargando: {csv_path}")
-        
-        if not csv_path.exists():
-            raise FileNotFoundError(f"No se encuentra el archivo: {csv_path}")
-        
-        self.googlebooks_df = pd.read_csv(csv_path)
+        """
+        Carga datos de Google Books (googlebooks_books.parquet o .csv, el más reciente)
+        
+        El Parquet ya viene tipado y se lee solo con las columnas necesarias;
+        del CSV se leen los ISBNs como texto para que no pasen por float
+        """
+        candidates = [p for p in (self.landing_dir / "googlebooks_books.parquet",
+                                  self.landing_dir / "googlebooks_books.csv") if p.exists()]
+        if not candidates:
+            raise FileNotFoundError(f"No se encuentra el archivo: {self.landing_dir / 'googlebooks_books.csv'}")
+        gb_path = max(candidates, key=lambda p: p.stat().st_mtime)
+        self.googlebooks_path = gb_path
+        
+        print(f"Cargando: {gb_path}")
+        
+        if gb_path.suffix == '.parquet':
+            self.googlebooks_df = pd.read_parquet(gb_path, columns=GOOGLEBOOKS_COLUMNS)
+        else:
+            self.googlebooks_df = pd.read_csv(gb_path, usecols=GOOGLEBOOKS_COLUMNS,
+                                              dtype={'gb_id': str, 'isbn13': str, 'isbn10': str})
         
         self.googlebooks_df['source_index'] = range(len(self.googlebooks_df))
+        self.googlebooks_df['isbn_key'] = self.compute_isbn_keys(self.googlebooks_df)
         self.googlebooks_df['titulo_normalizado'] = self.googlebooks_df['title'].apply(
             self.normalize_title_for_matching
         )
+        self.googlebooks_df['autor_normalizado'] = self.googlebooks_df['authors'].apply(
+            self.normalize_author_for_matching
+        )
         
         print(f"  ✓ {len(self.googlebooks_df)} registros cargados de Google Books")
         
         self.metrics['source_files']['googlebooks'] = {
-            'file': str(csv_path),
+            'file': str(gb_path),
             'records': len(self.googlebooks_df),
             'load_date': datetime.now().isoformat()
         }
@@ -146,38 +222,145 @@ class DataIntegrator:
         
         return self.googlebooks_df
     
-    def match_books_by_title(self):
-        """Empareja libros de Goodreads con Google Books usando título normalizado"""
-        print("\nEmparejando libros por título normalizado...")
-        
-        matches = []
+    def _has_keys(self, df, keys):
+        """Máscara de las filas con todas las claves informadas (sin ISBN, título o autor vacíos no emparejan)"""
+        mask = np.ones(len(df), dtype=bool)
+        for key in keys:
+            missing = ISBN_KEY_MISSING if key == 'isbn_key' else ''
+            mask &= (df[key] != missing).to_numpy()
+        return mask
+    
+    def _join_first_match(self, gr_rows, gb_rows, keys):
+        """
+        Join exacto por hash sobre `keys`: para cada libro de gr_rows, el
+        source_index de la primera fila de gb_rows con las mismas claves
+        (gana la primera de Google Books), o NaN si no hay ninguna
+        """
+        if keys == ['isbn_key']:
+            return self._join_first_isbn_key(gr_rows['isbn_key'].to_numpy(), gb_rows)
+        gb_first = gb_rows.drop_duplicates(keys, keep='first')
+        merged = gr_rows[keys].merge(gb_first[keys + ['source_index']], on=keys, how='left')
+        return merged['source_index'].to_numpy(dtype=float)
+    
+    def _join_first_isbn_key(self, gr_keys, gb_rows):
+        """
+        Join sobre isbn_key sin pasar por pandas: las claves uint64 de Google
+        Books se ordenan y deduplican con np.unique (se queda la primera
+        aparición) y cada clave de Goodreads se busca con searchsorted
+        """
+        gb_keys, first = np.unique(gb_rows['isbn_key'].to_numpy(), return_index=True)
+        found = np.full(len(gr_keys), np.nan)
+        if not len(gb_keys):
+            return found
+        position = np.minimum(np.searchsorted(gb_keys, gr_keys), len(gb_keys) - 1)
+        hit = gb_keys[position] == gr_keys
+        found[hit] = gb_rows['source_index'].to_numpy()[first[position[hit]]]
+        return found
+    
+    def _blocking_keys(self, title, author):
+        """Bloques de candidatos de un libro: cada token del autor y las dos primeras palabras del título"""
+        keys = {('autor', token) for token in author.split() if len(token) >= 3}
+        if title:
+            keys.add(('titulo', ' '.join(title.split()[:2])))
+        return keys
+    
+    def _fuzzy_title_matches(self, gr_rows, gb_rows):
+        """
+        Nivel difuso: similitud de título (difflib) solo contra las filas de
+        Google Books que comparten algún bloque con el libro, así que el
+        número de comparaciones crece con el tamaño de los bloques y no con
+        N×M. Gana la más parecida (y entre iguales, la primera)
+        Returns: (source_index de Google Books o NaN, similitud o NaN) por libro
+        """
+        gb_titles = gb_rows['titulo_normalizado'].tolist()
+        gb_source = gb_rows['source_index'].to_numpy()
+        blocks = defaultdict(list)
+        for position, (title, author) in enumerate(zip(gb_titles, gb_rows['autor_normalizado'])):
+            if title:
+                for key in self._blocking_keys(title, author):
+                    blocks[key].append(position)
+        
+        found = np.full(len(gr_rows), np.nan)
+        scores = np.full(len(gr_rows), np.nan)
+        matcher = SequenceMatcher(autojunk=False)
+        for i, (title, author) in enumerate(zip(gr_rows['titulo_normalizado'], gr_rows['autor_normalizado'])):
+            if not title:
+                continue
+            candidates = set()
+            for key in self._blocking_keys(title, author):
+                block = blocks.get(key, ())
+                if len(block) <= MAX_BLOCK_SIZE:
+                    candidates.update(block)
+            
+            matcher.set_seq2(title)
+            best, best_score = None, FUZZY_MATCH_THRESHOLD
+            for position in sorted(candidates):
+                matcher.set_seq1(gb_titles[position])
+                # Cotas superiores baratas antes de calcular ratio()
+                if best is None:
+                    if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                        continue
+                elif matcher.real_quick_ratio() <= best_score or matcher.quick_ratio() <= best_score:
+                    continue
+                score = matcher.ratio()
+                if score > best_score or (best is None and score >= best_score):
+                    best, best_score = position, score
+            if best is not None:
+                found[i] = gb_source[best]
+                scores[i] = round(best_score, 4)
+        return found, scores
+    
+    def match_books(self):
+        """
+        Empareja libros de Goodreads con Google Books por niveles; cada libro
+        se resuelve en el primer nivel que lo empareja:
+            1. isbn: mismo ISBN-13 (los ISBN-10 convertidos), sobre isbn_key
+            2. title_author: mismo título y autor principal normalizados
+            3. title: mismo título normalizado
+            4. fuzzy_title: título parecido (difflib) dentro de bloques de candidatos
+        matched_by guarda el nivel y confidence la puntuación (1.0 en los
+        niveles exactos, la similitud de título en el difuso)
+        """
+        print("\nEmparejando libros (ISBN → título+autor → título → título aproximado)...")
+        
+        gr_rows = self.goodreads_df
+        gb_rows = self.googlebooks_df
+        googlebooks_index = np.full(len(gr_rows), np.nan)
+        matched_by = np.full(len(gr_rows), None, dtype=object)
+        confidence = np.full(len(gr_rows), np.nan)
+        
+        for tier, keys in EXACT_MATCH_TIERS:
+            pending = np.flatnonzero(np.isnan(googlebooks_index) & self._has_keys(gr_rows, keys))
+            if not len(pending):
+                continue
+            found = self._join_first_match(gr_rows.iloc[pending], gb_rows[self._has_keys(gb_rows, keys)], keys)
+            hit = ~np.isnan(found)
+            googlebooks_index[pending[hit]] = found[hit]
+            matched_by[pending[hit]] = tier
+            confidence[pending[hit]] = 1.0
+        
+        pending = np.flatnonzero(np.isnan(googlebooks_index))
+        if len(pending):
+            found, scores = self._fuzzy_title_matches(gr_rows.iloc[pending], gb_rows)
+            hit = ~np.isnan(found)
+            googlebooks_index[pending[hit]] = found[hit]
+            matched_by[pending[hit]] = 'fuzzy_title'
+            confidence[pending[hit]] = scores[hit]
+        
+        matches_df = pd.DataFrame({
+            'goodreads_index': gr_rows['source_index'].to_numpy(),
+            'googlebooks_index': googlebooks_index,
+            'matched_by': matched_by,
+            'confidence': confidence
+        })
+        
+        if len(matches_df) <= MAX_MATCH_LOG_LINES:
+            for title, tier, score in zip(gr_rows['title'], matched_by, confidence):
+                if tier:
+                    print(f"  ✓ Match ({tier}, {score:.2f}): '{title[:50]}...'")
+                else:
+                    print(f"  ⚠ No match: '{title[:50]}...'")
         
-        for idx, gr_row in self.goodreads_df.iterrows():
-            gr_title_norm = gr_row['titulo_normalizado']
-            
-            gb_match = self.googlebooks_df[
-                self.googlebooks_df['titulo_normalizado'] == gr_title_norm
-            ]
-            
-            if len(gb_match) > 0:
-                gb_row = gb_match.iloc[0]
-                matches.append({
-                    'goodreads_index': gr_row['source_index'],
-                    'googlebooks_index': gb_row['source_index'],
-                    'matched_by': 'title',
-                    'confidence': 'high'
-                })
-                print(f"  ✓ Match: '{gr_row['title'][:50]}...'")
-            else:
-                print(f"  ⚠ No match: '{gr_row['title'][:50]}...'")
-                matches.append({
-                    'goodreads_index': gr_row['source_index'],
-                    'googlebooks_index': None,
-                    'matched_by': None,
-                    'confidence': None
-                })
-        
-        matches_df = pd.DataFrame(matches)
         matched_count = matches_df['googlebooks_index'].notna().sum()
         
         print(f"\n  Resultado: {matched_count}/{len(self.goodreads_df)} libros emparejados")
@@ -186,144 +369,281 @@ class DataIntegrator:
             'total_books': len(self.goodreads_df),
             'matched': int(matched_count),
             'unmatched': int(len(self.goodreads_df) - matched_count),
-            'match_rate': f"{(matched_count / len(self.goodreads_df) * 100):.1f}%"
+            'match_rate': f"{(matched_count / len(self.goodreads_df) * 100):.1f}%",
+            'by_tier': {tier: int((matches_df['matched_by'] == tier).sum())
+                        for tier in [name for name, _ in EXACT_MATCH_TIERS] + ['fuzzy_title']}
         }
         
         return matches_df
     
-    def create_unified_books(self, matches_df):
-        """Crea un DataFrame unificado combinando datos de ambas fuentes"""
-        print("\nCreando registros unificados...")
+    def match_books_by_title(self):
+        """
+        Emparejamiento solo por título normalizado (interfaz anterior a
+        match_books): mismo join por hash que su nivel 'title', con
+        matched_by='title' y confidence='high' en los libros emparejados
+        """
+        print("\nEmparejando libros por título normalizado...")
         
-        unified_books = []
+        gr_rows = self.goodreads_df
+        gb_rows = self.googlebooks_df
+        keys = ['titulo_normalizado']
+        googlebooks_index = np.full(len(gr_rows), np.nan)
+        has_title = self._has_keys(gr_rows, keys)
+        googlebooks_index[has_title] = self._join_first_match(
+            gr_rows[has_title], gb_rows[self._has_keys(gb_rows, keys)], keys
+        )
+        hit = ~np.isnan(googlebooks_index)
         
-        for idx, match in matches_df.iterrows():
-            gr_idx = match['goodreads_index']
-            gb_idx = match['googlebooks_index']
-            
-            gr_book = self.goodreads_df.iloc[gr_idx]
-            
-            if pd.notna(gb_idx):
-                gb_book = self.googlebooks_df.iloc[int(gb_idx)]
-                has_gb_data = True
-            else:
-                gb_book = None
-                has_gb_data = False
-            
-            # SUPERVIVENCIA: Combinar datos
-            
-            if has_gb_data and pd.notna(gb_book.get('isbn13')):
-                isbn13 = str(gb_book['isbn13'])
-                isbn_source = 'googlebooks'
-            elif pd.notna(gr_book.get('isbn13')):
-                isbn13 = gr_book['isbn13']
-                isbn_source = 'goodreads'
-            else:
-                isbn13 = None
-                isbn_source = None
-            
-            if has_gb_data and pd.notna(gb_book.get('isbn10')):
-                isbn10 = str(gb_book['isbn10'])
-            elif pd.notna(gr_book.get('isbn10')):
-                isbn10 = gr_book['isbn10']
-            else:
-                isbn10 = None
-            
-            gr_title = gr_book['title']
-            gb_title = gb_book['title'] if has_gb_data else None
-            
-            if gb_title and len(str(gb_title)) > len(str(gr_title)):
-                titulo = gb_title
-                titulo_source = 'googlebooks'
-            else:
-                titulo = gr_title
-                titulo_source = 'goodreads'
-            
-            gr_author = gr_book['author']
-            gb_authors = gb_book['authors'] if has_gb_data and pd.notna(gb_book.get('authors')) else None
-            
-            if gb_authors:
-                autores_list = [a.strip() for a in str(gb_authors).split(',')]
-                autor_principal = autores_list[0]
-                autores_completo = autores_list
-                autor_source = 'googlebooks'
-            else:
-                autor_principal = gr_author
-                autores_completo = [gr_author] if gr_author else []
-                autor_source = 'goodreads'
-            
-            rating_promedio = gr_book.get('rating')
-            numero_ratings = gr_book.get('ratings_count')
-            rating_source = 'goodreads' if pd.notna(rating_promedio) else None
-            
-            editorial = gb_book.get('publisher') if has_gb_data else None
-            fecha_publicacion = gb_book.get('pub_date') if has_gb_data else None
-            anio_publicacion = self.extract_year_from_date(fecha_publicacion) if fecha_publicacion else None
-            idioma = gb_book.get('language') if has_gb_data else None
-            
-            categorias_raw = gb_book.get('categories') if has_gb_data else None
-            if pd.notna(categorias_raw):
-                if isinstance(categorias_raw, str):
-                    categoria = [c.strip() for c in categorias_raw.split(',')]
-                else:
-                    categoria = [str(categorias_raw)]
-            else:
-                categoria = []
-            
-            precio = gb_book.get('price_amount') if has_gb_data else None
-            moneda = gb_book.get('price_currency') if has_gb_data else None
-            precio_source = 'googlebooks' if pd.notna(precio) else None
-            
-            goodreads_url = gr_book.get('book_url')
-            gb_id = gb_book.get('gb_id') if has_gb_data else None
-            
-            if isbn13:
-                book_id = f"ISBN13:{isbn13}"
-            elif isbn10:
-                book_id = f"ISBN10:{isbn10}"
+        matches_df = pd.DataFrame({
+            'goodreads_index': gr_rows['source_index'].to_numpy(),
+            'googlebooks_index': googlebooks_index,
+            'matched_by': np.where(hit, 'title', None),
+            'confidence': np.where(hit, 'high', None)
+        })
+        
+        matched_count = int(hit.sum())
+        print(f"\n  Resultado: {matched_count}/{len(gr_rows)} libros emparejados")
+        
+        self.metrics['deduplication']['matching'] = {
+            'total_books': len(gr_rows),
+            'matched': matched_count,
+            'unmatched': len(gr_rows) - matched_count,
+            'match_rate': f"{(matched_count / len(gr_rows) * 100):.1f}%"
+        }
+        
+        return matches_df
+    
+    def deduplicate_matches(self, matches_df):
+        """
+        Un libro por ISBN antes de la supervivencia: de los libros de Goodreads
+        cuyo ISBN final (el que elegirán las reglas de supervivencia: ISBN-13 de
+        Google Books, después el de Goodreads, y si no hay ninguno el ISBN-10)
+        tiene la misma clave, se conserva el primero. Los que no tienen ISBN se
+        conservan todos
+        
+        dim_book y book_source_detail se construyen con el resultado, así que
+        los dos tienen el mismo conjunto de libros de Goodreads; los descartados
+        quedan en deduplication.dim_book.duplicates junto al libro conservado
+        """
+        gr_positions = matches_df['goodreads_index'].to_numpy(dtype=np.int64)
+        gb_index = matches_df['googlebooks_index'].to_numpy(dtype=float)
+        has_gb_data = ~np.isnan(gb_index)
+        gb_positions = np.where(has_gb_data, gb_index, 0).astype(np.int64)
+        
+        final_isbns = {}
+        for column in ('isbn13', 'isbn10'):
+            gb_isbn = self._aligned_values(self.googlebooks_df, column, gb_positions, has_gb_data)
+            gr_isbn = self._aligned_values(self.goodreads_df, column, gr_positions)
+            final_isbns[column] = np.where(pd.notna(gb_isbn), gb_isbn, gr_isbn)
+        keys = self.compute_isbn_keys(pd.DataFrame(final_isbns))
+        
+        has_isbn = np.flatnonzero(keys != ISBN_KEY_MISSING)
+        _, first, group = np.unique(keys[has_isbn], return_index=True, return_inverse=True)
+        kept = has_isbn[first][group]  # fila conservada para cada fila con ISBN
+        dropped = has_isbn[kept != has_isbn]
+        
+        duplicates = [
+            {'goodreads_index': int(gr_positions[row]),
+             'kept_goodreads_index': int(gr_positions[kept_row]),
+             'isbn13': isbn13}
+            for row, kept_row, isbn13 in zip(dropped, kept[kept != has_isbn], decode_isbn_array(keys[dropped]))
+        ]
+        if duplicates:
+            print(f"  ✓ {len(duplicates)} libros duplicados por ISBN descartados")
+        
+        self.metrics['deduplication']['dim_book'] = {
+            'isbn_duplicates_removed': len(duplicates),
+            'duplicates': duplicates
+        }
+        
+        return matches_df.drop(index=matches_df.index[dropped]).reset_index(drop=True)
+    
+    def _aligned_values(self, df, column, positions, present=None):
+        """
+        Valores (dtype object) de `column` en las filas `positions` de df, como
+        los daría row.get(column) fila a fila: None si la columna no existe o
+        si la fila no tiene correspondencia (present False)
+        """
+        values = np.full(len(positions), None, dtype=object)
+        if column not in df.columns:
+            return values
+        column_values = df[column].to_numpy(dtype=object)
+        if present is None:
+            values[:] = column_values[positions]
+        else:
+            values[present] = column_values[positions[present]]
+        return values
+    
+    def _truthy(self, values):
+        """bool(valor) elemento a elemento (NaN cuenta como verdadero, '' y None no)"""
+        return _TRUTHY(values).astype(bool) if len(values) else np.zeros(0, dtype=bool)
+    
+    def _present(self, values):
+        """bool(valor) elemento a elemento, con NaN como ausente (igual que None)"""
+        return pd.notna(values) & self._truthy(values)
+    
+    def _split_by_comma(self, values, present):
+        """
+        Lista [p.strip() for p in valor.split(',')] por fila (o [str(valor)] si
+        no es texto) y [] donde present es False; cada texto distinto se parte
+        una sola vez
+        """
+        parts_by_value = {}
+        lists = []
+        for value, is_present in zip(values, present.tolist()):
+            if not is_present:
+                lists.append([])
+            elif isinstance(value, str):
+                parts = parts_by_value.get(value)
+                if parts is None:
+                    parts = parts_by_value[value] = tuple(map(str.strip, value.split(',')))
+                lists.append(list(parts))
             else:
-                hash_input = f"{titulo}|{autor_principal}|{editorial or ''}"
-                book_id = f"HASH:{hashlib.md5(hash_input.encode()).hexdigest()[:12]}"
-            
-            fuentes_score = {
-                'goodreads': (1 if rating_promedio else 0) + (1 if gr_author else 0),
-                'googlebooks': (1 if isbn13 else 0) + (1 if editorial else 0) + (1 if precio else 0)
-            }
-            fuente_ganadora = max(fuentes_score, key=fuentes_score.get)
-            
-            unified_book = {
-                'book_id': book_id,
-                'titulo': titulo,
-                'titulo_normalizado': self.normalize_title_for_matching(titulo),
-                'autor_principal': autor_principal,
-                'autores': autores_completo,
-                'editorial': editorial,
-                'anio_publicacion': anio_publicacion,
-                'fecha_publicacion': fecha_publicacion,
-                'idioma': idioma,
-                'isbn10': isbn10,
-                'isbn13': isbn13,
-                'categoria': categoria,
-                'rating_promedio': rating_promedio,
-                'numero_ratings': numero_ratings,
-                'precio': precio,
-                'moneda': moneda,
-                'goodreads_url': goodreads_url,
-                'google_books_id': gb_id,
-                'fuente_ganadora': fuente_ganadora,
-                'fuente_titulo': titulo_source,
-                'fuente_isbn': isbn_source,
-                'fuente_autor': autor_source,
-                'fuente_rating': rating_source,
-                'fuente_precio': precio_source,
-                'tiene_datos_goodreads': True,
-                'tiene_datos_googlebooks': has_gb_data,
-                'ts_ultima_actualizacion': datetime.now().isoformat()
-            }
-            
-            unified_books.append(unified_book)
+                lists.append([str(value)])
+        return lists
+    
+    def _str_len(self, values):
+        """len(str(valor)) elemento a elemento"""
+        return np.fromiter((len(v) if type(v) is str else len(str(v)) for v in values),
+                           dtype=np.int64, count=len(values))
+    
+    def create_unified_books(self, matches_df):
+        """
+        Crea un DataFrame unificado combinando datos de ambas fuentes
         
-        unified_df = pd.DataFrame(unified_books)
+        Las reglas de supervivencia se aplican por columnas: ambas fuentes se
+        alinean con matches_df (una fila por libro de Goodreads) y cada campo
+        se elige con máscaras de numpy en lugar de recorrer los libros
+        """
+        print("\nCreando registros unificados...")
+        
+        n = len(matches_df)
+        gr_positions = matches_df['goodreads_index'].to_numpy(dtype=np.int64)
+        gb_index = matches_df['googlebooks_index'].to_numpy(dtype=float)
+        has_gb_data = ~np.isnan(gb_index)
+        gb_positions = np.where(has_gb_data, gb_index, 0).astype(np.int64)
+        
+        def gr_values(column):
+            return self._aligned_values(self.goodreads_df, column, gr_positions)
+        
+        def gb_values(column):
+            return self._aligned_values(self.googlebooks_df, column, gb_positions, has_gb_data)
+        
+        def choose(condition, if_true, if_false):
+            return np.where(condition, np.asarray(if_true, dtype=object), np.asarray(if_false, dtype=object))
+        
+        def source(condition, name):
+            return choose(condition, name, None)
+        
+        # SUPERVIVENCIA: Combinar datos
+        
+        # ISBN: Google Books primero, después Goodreads
+        gb_isbn13, gr_isbn13 = gb_values('isbn13'), gr_values('isbn13')
+        isbn13_from_gb = pd.notna(gb_isbn13)
+        isbn13_from_gr = ~isbn13_from_gb & pd.notna(gr_isbn13)
+        isbn13 = choose(isbn13_from_gb, gb_isbn13, choose(isbn13_from_gr, gr_isbn13, None))
+        isbn_source = choose(isbn13_from_gb, 'googlebooks', source(isbn13_from_gr, 'goodreads'))
+        
+        gb_isbn10, gr_isbn10 = gb_values('isbn10'), gr_values('isbn10')
+        isbn10 = choose(pd.notna(gb_isbn10), gb_isbn10, choose(pd.notna(gr_isbn10), gr_isbn10, None))
+        
+        # Título: el más largo (Google Books solo si es más largo)
+        gr_title, gb_title = gr_values('title'), gb_values('title')
+        title_from_gb = self._truthy(gb_title) & (self._str_len(gb_title) > self._str_len(gr_title))
+        titulo = choose(title_from_gb, gb_title, gr_title)
+        titulo_source = choose(title_from_gb, 'googlebooks', 'goodreads')
+        # titulo_normalizado ya está calculado en cada fuente para el emparejamiento
+        titulo_normalizado = choose(title_from_gb, gb_values('titulo_normalizado'), gr_values('titulo_normalizado'))
+        
+        # Autores: los de Google Books (separados por comas) o el de Goodreads
+        gr_author = gr_values('author')
+        gb_authors = gb_values('authors')
+        authors_from_gb = pd.notna(gb_authors) & self._truthy(gb_authors)
+        gr_author_present = self._truthy(gr_author)
+        autores_completo = self._split_by_comma(gb_authors, authors_from_gb)
+        for i in np.flatnonzero(~authors_from_gb & gr_author_present):
+            autores_completo[i] = [gr_author[i]]
+        autor_principal = choose(authors_from_gb, [autores[0] if autores else None for autores in autores_completo],
+                                 gr_author)
+        autor_source = choose(authors_from_gb, 'googlebooks', 'goodreads')
+        
+        rating_promedio = gr_values('rating')
+        numero_ratings = gr_values('ratings_count')
+        rating_source = source(pd.notna(rating_promedio), 'goodreads')
+        
+        editorial = gb_values('publisher')
+        fecha_publicacion = gb_values('pub_date')
+        # Como extract_year_from_date (primer año 19xx/20xx del texto de la fecha),
+        # una vez por fecha distinta
+        fechas = pd.Series(fecha_publicacion, dtype=object)
+        codes, fechas_distintas = pd.factorize(fechas.where(fechas.isna(), fechas.astype(str)))
+        anios = pd.Series(fechas_distintas, dtype=object).str.extract(r'\b((?:19|20)\d{2})\b', expand=False)
+        anios = np.append(np.array([int(a) if isinstance(a, str) else None for a in anios], dtype=object), None)
+        anio_publicacion = anios[codes]  # código -1 (sin fecha) → último elemento, None
+        idioma = gb_values('language')
+        
+        categorias_raw = gb_values('categories')
+        categoria = self._split_by_comma(categorias_raw, pd.notna(categorias_raw))
+        
+        precio = gb_values('price_amount')
+        moneda = gb_values('price_currency')
+        precio_source = source(pd.notna(precio), 'googlebooks')
+        
+        goodreads_url = gr_values('book_url')
+        gb_id = gb_values('gb_id')
+        
+        # book_id: ISBN-13, ISBN-10 o hash de título|autor|editorial
+        has_isbn13 = self._truthy(isbn13)
+        has_isbn10 = ~has_isbn13 & self._truthy(isbn10)
+        needs_hash = ~has_isbn13 & ~has_isbn10
+        # Presencia para el hash y la puntuación: bool(valor) como antes, pero un
+        # campo vacío (NaN desde el CSV, None desde el Parquet) no cuenta
+        editorial_presente = self._present(editorial)
+        precio_presente = self._present(precio)
+        editorial_hash = choose(editorial_presente, editorial, '')
+        book_id = np.empty(n, dtype=object)
+        book_id[has_isbn13] = [f"ISBN13:{isbn}" for isbn in isbn13[has_isbn13]]
+        book_id[has_isbn10] = [f"ISBN10:{isbn}" for isbn in isbn10[has_isbn10]]
+        book_id[needs_hash] = [
+            f"HASH:{hashlib.md5(f'{t}|{a}|{e}'.encode()).hexdigest()[:12]}"
+            for t, a, e in zip(titulo[needs_hash], autor_principal[needs_hash], editorial_hash[needs_hash])
+        ]
+        
+        # '' y 0.0 no suman, igual que None y NaN
+        score_goodreads = self._present(rating_promedio).astype(int) + self._present(gr_author)
+        score_googlebooks = has_isbn13.astype(int) + editorial_presente + precio_presente
+        # Empate: gana Goodreads (primera fuente del ranking)
+        fuente_ganadora = choose(score_googlebooks > score_goodreads, 'googlebooks', 'goodreads')
+        
+        unified_df = pd.DataFrame({
+            'book_id': book_id,
+            'titulo': titulo,
+            'titulo_normalizado': titulo_normalizado,
+            'autor_principal': autor_principal,
+            'autores': pd.Series(autores_completo, dtype=object),
+            'editorial': editorial,
+            'anio_publicacion': anio_publicacion,
+            'fecha_publicacion': fecha_publicacion,
+            'idioma': idioma,
+            'isbn10': isbn10,
+            'isbn13': isbn13,
+            'categoria': pd.Series(categoria, dtype=object),
+            'rating_promedio': rating_promedio,
+            'numero_ratings': numero_ratings,
+            'precio': precio,
+            'moneda': moneda,
+            'goodreads_url': goodreads_url,
+            'google_books_id': gb_id,
+            'fuente_ganadora': fuente_ganadora,
+            'fuente_titulo': titulo_source,
+            'fuente_isbn': isbn_source,
+            'fuente_autor': autor_source,
+            'fuente_rating': rating_source,
+            'fuente_precio': precio_source,
+            'tiene_datos_goodreads': np.ones(n, dtype=bool),
+            'tiene_datos_googlebooks': has_gb_data,
+            'ts_ultima_actualizacion': datetime.now().isoformat()
+        }).infer_objects()  # mismos dtypes que al construir el DataFrame fila a fila
         
         print(f"  ✓ {len(unified_df)} libros unificados creados")
         print(f"  ✓ {unified_df['tiene_datos_googlebooks'].sum()} con datos de Google Books")
@@ -380,81 +700,86 @@ class DataIntegrator:
         
         return self.dim_book
     
+    def _book_ids(self, isbn13, hash_inputs):
+        """ISBN13:<isbn13> donde hay ISBN-13 y HASH:<md5 del texto de hash_inputs> en el resto"""
+        has_isbn13 = pd.notna(isbn13)
+        book_id = np.empty(len(isbn13), dtype=object)
+        book_id[has_isbn13] = [f"ISBN13:{isbn}" for isbn in isbn13[has_isbn13]]
+        book_id[~has_isbn13] = [
+            f"HASH:{hashlib.md5(text.encode()).hexdigest()[:12]}"
+            for text in hash_inputs[~has_isbn13]
+        ]
+        return book_id
+    
     def create_book_source_detail(self, matches_df):
-        """Crea la tabla de detalle por fuente"""
+        """
+        Crea la tabla de detalle por fuente
+        
+        Un registro por libro de Goodreads de matches_df y por libro de Google
+        Books, construidos por columnas a partir de las dos fuentes
+        """
         print("\nCreando book_source_detail.parquet...")
         
-        detail_records = []
+        gr_rows = self.goodreads_df[self.goodreads_df['source_index'].isin(matches_df['goodreads_index'])]
+        gb_rows = self.googlebooks_df
+        
+        def values(df, column):
+            return self._aligned_values(df, column, np.arange(len(df)))
+        
+        def text(*columns):
+            return np.array(['|'.join(parts) for parts in zip(*columns)], dtype=object)
+        
+        # Goodreads: ISBN-13 del libro de Google Books emparejado, o hash de título|autor|
+        googlebooks_index = matches_df.drop_duplicates('goodreads_index').set_index('goodreads_index')['googlebooks_index']
+        gb_index = gr_rows['source_index'].map(googlebooks_index).to_numpy(dtype=float)
+        has_gb_data = ~np.isnan(gb_index)
+        gb_positions = np.where(has_gb_data, gb_index, 0).astype(np.int64)
+        gr_isbn13_for_id = self._aligned_values(gb_rows, 'isbn13', gb_positions, has_gb_data)
+        gr_title, gr_author = values(gr_rows, 'title'), values(gr_rows, 'author')
+        gr_book_id = self._book_ids(
+            gr_isbn13_for_id,
+            text(map(str, gr_title), map(str, gr_author), [''] * len(gr_rows))
+        )
         
-        for idx, gr_row in self.goodreads_df.iterrows():
-            match = matches_df[matches_df['goodreads_index'] == gr_row['source_index']]
-            
-            if len(match) > 0:
-                gb_idx = match.iloc[0]['googlebooks_index']
-                if pd.notna(gb_idx):
-                    gb_book = self.googlebooks_df.iloc[int(gb_idx)]
-                    isbn13_for_id = gb_book.get('isbn13')
-                else:
-                    isbn13_for_id = None
-            else:
-                isbn13_for_id = None
-            
-            if pd.notna(isbn13_for_id):
-                book_id = f"ISBN13:{isbn13_for_id}"
-            else:
-                hash_input = f"{gr_row['title']}|{gr_row['author']}|"
-                book_id = f"HASH:{hashlib.md5(hash_input.encode()).hexdigest()[:12]}"
-            
-            detail_records.append({
-                'source_id': f"GR_{idx}",
-                'source_name': 'goodreads',
-                'source_file': 'goodreads_books.json',
-                'source_index': int(gr_row['source_index']),
-                'book_id': book_id,
-                'titulo_original': gr_row['title'],
-                'autor_original': gr_row['author'],
-                'rating': gr_row.get('rating'),
-                'ratings_count': gr_row.get('ratings_count'),
-                'url': gr_row.get('book_url'),
-                'isbn10': gr_row.get('isbn10'),
-                'isbn13': gr_row.get('isbn13'),
-                'ts_ingesta': datetime.now().isoformat()
-            })
-        
-        for idx, gb_row in self.googlebooks_df.iterrows():
-            match = matches_df[matches_df['googlebooks_index'] == gb_row['source_index']]
-            
-            if len(match) > 0:
-                isbn13_for_id = gb_row.get('isbn13')
-            else:
-                isbn13_for_id = None
-            
-            if pd.notna(isbn13_for_id):
-                book_id = f"ISBN13:{isbn13_for_id}"
-            else:
-                hash_input = f"{gb_row['title']}|{gb_row.get('authors', '')}|{gb_row.get('publisher', '')}"
-                book_id = f"HASH:{hashlib.md5(hash_input.encode()).hexdigest()[:12]}"
-            
-            detail_records.append({
-                'source_id': f"GB_{idx}",
-                'source_name': 'googlebooks',
-                'source_file': 'googlebooks_books.csv',
-                'source_index': int(gb_row['source_index']),
-                'book_id': book_id,
-                'titulo_original': gb_row['title'],
-                'autor_original': gb_row.get('authors'),
-                'editorial': gb_row.get('publisher'),
-                'fecha_publicacion': gb_row.get('pub_date'),
-                'idioma': gb_row.get('language'),
-                'isbn10': gb_row.get('isbn10'),
-                'isbn13': gb_row.get('isbn13'),
-                'precio': gb_row.get('price_amount'),
-                'moneda': gb_row.get('price_currency'),
-                'google_books_id': gb_row.get('gb_id'),
-                'ts_ingesta': datetime.now().isoformat()
-            })
-        
-        self.book_source_detail = pd.DataFrame(detail_records)
+        # Google Books: su ISBN-13 si algún libro de Goodreads lo emparejó, o hash de título|autores|editorial
+        gb_matched = gb_rows['source_index'].isin(matches_df['googlebooks_index']).to_numpy()
+        gb_isbn13 = values(gb_rows, 'isbn13')
+        gb_title, gb_authors, gb_publisher = (values(gb_rows, column) for column in ('title', 'authors', 'publisher'))
+        gb_book_id = self._book_ids(
+            np.where(gb_matched, gb_isbn13, None),
+            text(map(str, gb_title), map(str, gb_authors), map(str, gb_publisher))
+        )
+        
+        ts_ingesta = datetime.now().isoformat()
+        n_gr, n_gb = len(gr_rows), len(gb_rows)
+        
+        def stack(goodreads=None, googlebooks=None):
+            # Campo que solo tiene una de las fuentes: NaN en los registros de la otra
+            goodreads = np.full(n_gr, np.nan, dtype=object) if goodreads is None else goodreads
+            googlebooks = np.full(n_gb, np.nan, dtype=object) if googlebooks is None else googlebooks
+            return np.concatenate([np.asarray(goodreads, dtype=object), np.asarray(googlebooks, dtype=object)])
+        
+        self.book_source_detail = pd.DataFrame({
+            'source_id': stack([f"GR_{idx}" for idx in gr_rows.index], [f"GB_{idx}" for idx in gb_rows.index]),
+            'source_name': stack(['goodreads'] * n_gr, ['googlebooks'] * n_gb),
+            'source_file': stack([self.goodreads_path.name] * n_gr, [self.googlebooks_path.name] * n_gb),
+            'source_index': stack(gr_rows['source_index'].tolist(), gb_rows['source_index'].tolist()),
+            'book_id': stack(gr_book_id, gb_book_id),
+            'titulo_original': stack(gr_title, gb_title),
+            'autor_original': stack(gr_author, gb_authors),
+            'rating': stack(goodreads=values(gr_rows, 'rating')),
+            'ratings_count': stack(goodreads=values(gr_rows, 'ratings_count')),
+            'url': stack(goodreads=values(gr_rows, 'book_url')),
+            'isbn10': stack(values(gr_rows, 'isbn10'), values(gb_rows, 'isbn10')),
+            'isbn13': stack(values(gr_rows, 'isbn13'), gb_isbn13),
+            'ts_ingesta': stack([ts_ingesta] * n_gr, [ts_ingesta] * n_gb),
+            'editorial': stack(googlebooks=gb_publisher),
+            'fecha_publicacion': stack(googlebooks=values(gb_rows, 'pub_date')),
+            'idioma': stack(googlebooks=values(gb_rows, 'language')),
+            'precio': stack(googlebooks=values(gb_rows, 'price_amount')),
+            'moneda': stack(googlebooks=values(gb_rows, 'price_currency')),
+            'google_books_id': stack(googlebooks=values(gb_rows, 'gb_id'))
+        }).infer_objects()  # mismos dtypes que al construir el DataFrame registro a registro
         
         output_path = self.standard_dir / "book_source_detail.parquet"
         self.book_source_detail.to_parquet(output_path, index=False)
@@ -519,7 +844,7 @@ class DataIntegrator:
             self.load_goodreads_data()
             self.load_googlebooks_data()
             
-            matches_df = self.match_books_by_title()
+            matches_df = self.deduplicate_matches(self.match_books())
             unified_df = self.create_unified_books(matches_df)
             self.create_dim_book(unified_df)
             self.create_book_source_detail(matches_df)
@@ -9,18 +9,20 @@ OBJETIVO:
 
 FUNCIONAMIENTO:
     1. Busca libros en Goodreads con un término (ej: "data science")
-    2. Scrapea múltiples páginas de resultados si es necesario
+    2. Scrapea páginas de resultados (por adelantado) hasta tener suficientes libros
     3. Accede a la página de cada libro individual
     4. Extrae: título, autor, rating, número de valoraciones, URL, ISBN
     5. Guarda todo en un archivo JSON con metadata del scraping
 
 TECNOLOGÍAS:
     - requests: para hacer peticiones HTTP a Goodreads
-    - BeautifulSoup: para extraer datos del HTML
+    - JSON-LD / __NEXT_DATA__ y lxml (XPath): extracción rápida de datos
+    - BeautifulSoup: para extraer datos del HTML (fallback)
     - json: para guardar los resultados
 
 ÉTICA:
-    - Pausas de 1 segundo entre peticiones (no saturar el servidor)
+    - Máximo 1 petición por segundo por host (token bucket, configurable)
+    - Peticiones simultáneas limitadas por host (max_in_flight)
     - User-Agent identificable (no fingir ser un navegador)
     - Límite de 15 libros (minimizar carga en Goodreads)
 """
@@ -32,9 +34,56 @@ TECNOLOGÍAS:
 import requests          # Para hacer peticiones HTTP a Goodreads
 from bs4 import BeautifulSoup  # Para extraer datos del HTML
 import json             # Para guardar los datos en formato JSON
-import time             # Para hacer pausas entre peticiones
 from datetime import datetime  # Para registrar fecha/hora del scraping
-import re               # Para buscar patrones (como ISBNs) en texto
+import argparse         # Para leer opciones de línea de comandos
+import threading        # Para proteger contadores compartidos entre hilos
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor  # Hilos y procesos
+from multiprocessing import Manager  # Frontera compartida entre procesos
+from collections import deque  # Ventana de descargas en vuelo
+import queue            # Cola acotada de URLs entre páginas de resultados y descargas
+from pathlib import Path
+
+from utils_http import HostRateLimiter, HttpClient  # Límite por host y sesión compartida
+from utils_cache import ResponseCache, CacheMiss     # Caché HTTP en disco
+from utils_extract import GoodreadsPageExtractor, EXTRACTION_PATHS  # Extracción rápida
+from utils_jsonl import (JsonlWriter, checkpoint_path_for, iter_jsonl, load_checkpoint,  # Salida incremental
+                         resolve_goodreads_landing)
+
+
+# URLs sin respuesta en caché que se listan en modo offline (replay-only)
+MAX_LOGGED_CACHE_MISSES = 20
+
+
+def canonical_book_url(url):
+    """URL del libro sin query string (qid y rank cambian en cada búsqueda)"""
+    return url.split('#', 1)[0].split('?', 1)[0]
+
+
+#═════════════════════════════════════════════════════════════════════════════
+# FRONTERA DEL CRAWL (deduplicación de URLs entre búsquedas y procesos)
+#═════════════════════════════════════════════════════════════════════════════
+
+class CrawlFrontier:
+    """
+    Registro de URLs de libro ya reclamadas por algún scraper
+    
+    Con un dict y un lock de multiprocessing.Manager se comparte entre
+    procesos, de forma que cada página de libro se descarga una sola vez
+    por ejecución aunque aparezca en varias búsquedas o páginas.
+    """
+    
+    def __init__(self, seen=None, lock=None):
+        self.seen = seen if seen is not None else {}
+        self.lock = lock if lock is not None else threading.Lock()
+    
+    def claim(self, url):
+        """Reclama una URL; devuelve False si otro scraper ya la reclamó"""
+        key = canonical_book_url(url)
+        with self.lock:
+            if key in self.seen:
+                return False
+            self.seen[key] = True
+            return True
 
 
 #═════════════════════════════════════════════════════════════════════════════
@@ -51,9 +100,20 @@ class GoodreadsScraper:
     3. Guardar los resultados en JSON
     """
     
-    def __init__(self):
+    def __init__(self, concurrency=1, requests_per_second=1.0, max_in_flight=None,
+                 http_client=None, cache=None, frontier=None, max_requests_per_second=None):
         """
         Inicializa el scraper con toda la configuración necesaria
+        
+        PARÁMETROS:
+            concurrency (int): Hilos que descargan páginas de libros en paralelo
+            requests_per_second (float): Peticiones por segundo permitidas por host
+            max_in_flight (int): Peticiones simultáneas por host (default: concurrency)
+            http_client (HttpClient): Cliente HTTP compartido (opcional)
+            cache (ResponseCache): Caché de respuestas en disco (opcional)
+            frontier (CrawlFrontier): Frontera compartida para no repetir libros (opcional)
+            max_requests_per_second (float): Techo del control adaptativo
+                (default: requests_per_second, nunca se supera la tasa configurada)
         """
         
         #─────────────────────────────────────────────────────────────────────
@@ -76,10 +136,54 @@ class GoodreadsScraper:
             'Referer': 'https://www.goodreads.com/'
         }
         
+        #─────────────────────────────────────────────────────────────────────
+        # CONTROL DE TASA (ética de scraping)
+        #─────────────────────────────────────────────────────────────────────
+        # El token bucket sustituye a las pausas fijas: nunca se superan
+        # requests_per_second peticiones por host, aunque haya varios hilos.
+        # Control adaptativo (AIMD): ante 429/5xx la tasa se reduce a la mitad
+        # y se respeta Retry-After; con respuestas sanas se recupera poco a poco
+        self.concurrency = max(1, int(concurrency))
+        # Con un cliente compartido se usa su limitador: es el que ven sus peticiones
+        if http_client is not None and http_client.rate_limiter is not None:
+            self.rate_limiter = http_client.rate_limiter
+        else:
+            self.rate_limiter = HostRateLimiter(
+                requests_per_second=requests_per_second,
+                max_in_flight=max_in_flight or self.concurrency,
+                adaptive=True,
+                max_rps=max_requests_per_second or requests_per_second
+            )
+        
+        #─────────────────────────────────────────────────────────────────────
+        # CLIENTE HTTP (conexiones keep-alive, gzip y reintentos con backoff)
+        #─────────────────────────────────────────────────────────────────────
+        # El pool tiene tantas conexiones como peticiones simultáneas por host
+        self.http = http_client or HttpClient(
+            pool_size=self.rate_limiter.max_in_flight,
+            headers=self.headers,
+            rate_limiter=self.rate_limiter,
+            cache=cache
+        )
+        
+        #─────────────────────────────────────────────────────────────────────
+        # EXTRACCIÓN DE CAMPOS (datos estructurados primero, BeautifulSoup al final)
+        #─────────────────────────────────────────────────────────────────────
+        self.extractor = GoodreadsPageExtractor()
+        self._stats_lock = threading.Lock()
+        
         #─────────────────────────────────────────────────────────────────────
         # ALMACENAMIENTO DE DATOS
         #─────────────────────────────────────────────────────────────────────
         self.books = []  # Lista donde guardaremos todos los libros extraídos
+        self.books_scraped = 0       # Contador (en modo streaming self.books no crece)
+        self.completed_urls = set()  # URLs canónicas ya extraídas (para --resume)
+        self.current_page = 1        # Página de resultados en curso
+        self.writer = None           # JsonlWriter si la salida es incremental
+        self.stream_options = None   # Argumentos del JsonlWriter (se abre con el primer libro)
+        self.resume_query = None     # Búsqueda del checkpoint reanudado
+        self.frontier = frontier     # Frontera compartida entre búsquedas (opcional)
+        self.page_frontier = []      # URLs pendientes de la página de resultados actual
         
         #─────────────────────────────────────────────────────────────────────
         # METADATA DEL SCRAPING (para documentación)
@@ -100,53 +204,276 @@ class GoodreadsScraper:
                 'book_url': '.BookCard__title a[href]',     # Para extraer URL del libro
                 'isbn': 'meta[property="books:isbn"]'       # Para extraer ISBN
             },
+            # Páginas resueltas por cada ruta de extracción
+            'extraction_paths': {path: 0 for path in EXTRACTION_PATHS},
+            'rate_limit': {
+                'requests_per_second': requests_per_second,
+                'max_in_flight': self.rate_limiter.max_in_flight,
+                'concurrency': self.concurrency
+            },
             'total_books_scraped': 0,  # Contador (se actualiza al final)
-            'pages_scraped': 0         # Número de páginas scrapeadas
+            'pages_scraped': 0,        # Número de páginas scrapeadas
+            'cache_misses': []         # URLs sin respuesta en caché (modo replay-only)
         }
     
+    #═════════════════════════════════════════════════════════════════════════
+    # MÉTODO AUXILIAR: PETICIÓN HTTP CON LÍMITE DE TASA
+    #═════════════════════════════════════════════════════════════════════════
+    
+    def _get(self, url):
+        """
+        Hace un GET con el cliente compartido, que respeta el límite de tasa
+        y de concurrencia del host
+        Lanza requests.HTTPError si el status code no es 2xx
+        """
+        response = self.http.get(url, headers=self.headers)
+        response.raise_for_status()
+        return response
+    
+    #═════════════════════════════════════════════════════════════════════════
+    # SALIDA INCREMENTAL (JSONL + CHECKPOINTS)
+    #═════════════════════════════════════════════════════════════════════════
+    
+    def start_streaming(self, jsonl_path, checkpoint_every=25, resume=False):
+        """
+        Activa la escritura incremental: cada libro se añade al JSONL en cuanto
+        se extrae y cada `checkpoint_every` libros se guarda (con fsync) el
+        estado del crawl en <nombre>.checkpoint.json
+        
+        Con resume=True se continúa desde el último checkpoint: se recupera
+        la metadata y la página en curso, y no se vuelven a descargar las URLs
+        que ya están en el JSONL.
+        
+        Sin resume el JSONL no se abre (ni se vacía) hasta extraer el primer
+        libro: un crawl offline sin páginas en caché conserva la landing previa.
+        """
+        checkpoint_path = checkpoint_path_for(jsonl_path)
+        
+        if resume:
+            checkpoint = load_checkpoint(checkpoint_path)
+            if checkpoint:
+                self.metadata.update(checkpoint.get('metadata', {}))
+                self.current_page = checkpoint.get('next_page', 1)
+                self.completed_urls.update(checkpoint.get('completed_urls', []))
+                self.resume_query = self.metadata.get('search_term') or None
+            
+            # El JSONL es la fuente de verdad: puede ir por delante del checkpoint
+            try:
+                for book in iter_jsonl(jsonl_path):
+                    self.completed_urls.add(canonical_book_url(book['book_url']))
+                    self.books_scraped += 1
+            except FileNotFoundError:
+                pass
+            
+            print(f"Reanudando desde página {self.current_page}: "
+                  f"{self.books_scraped} libros ya extraídos")
+        
+        self.stream_options = dict(
+            path=jsonl_path,
+            checkpoint_path=checkpoint_path,
+            checkpoint_every=checkpoint_every,
+            state_fn=self._checkpoint_state,
+            append=resume
+        )
+        if resume:
+            self._open_writer()
+    
+    def _open_writer(self):
+        """Abre el JSONL de salida (en modo 'w' sustituye la landing existente)"""
+        if self.writer is None:
+            self.writer = JsonlWriter(**self.stream_options)
+        return self.writer
+    
+    def _checkpoint_state(self):
+        """Estado del crawl que se guarda en cada checkpoint"""
+        self.metadata['total_books_scraped'] = self.books_scraped
+        return {
+            'status': 'running',
+            'metadata': self.metadata,
+            'next_page': self.current_page,
+            'frontier': list(self.page_frontier),
+            'completed_urls': sorted(self.completed_urls)
+        }
+    
+    def finish_streaming(self):
+        """Cierra el JSONL con un checkpoint final marcado como completado"""
+        if self.stream_options is None:
+            return
+        # Offline sin ningún libro en caché: el JSONL no llegó a abrirse
+        if self.writer is None and self.metadata['cache_misses'] and not self.books_scraped:
+            keep_existing_landing(self.metadata['cache_misses'], Path(self.stream_options['path']).parent)
+            return
+        self._open_writer().close(status='completed')
+        
+        print(f"\n{'='*60}")
+        print(f"✓ Datos guardados exitosamente")
+        print(f"{'='*60}")
+        print(f"  Archivo: {self.writer.path}")
+        print(f"  Checkpoint: {self.writer.checkpoint_path}")
+        print(f"  Total de libros: {self.books_scraped}")
+    
+    def _add_book(self, book_data):
+        """Registra un libro extraído (en memoria o en el JSONL)"""
+        self.completed_urls.add(canonical_book_url(book_data['book_url']))
+        self.books_scraped += 1
+        
+        if self.stream_options is not None:
+            self._open_writer().write(book_data)
+        else:
+            self.books.append(book_data)
+    
     #═════════════════════════════════════════════════════════════════════════
     # MÉTODO PRINCIPAL: BUSCAR LIBROS CON PAGINACIÓN
     #═════════════════════════════════════════════════════════════════════════
     
-    def search_books(self, query, max_books=15):
+    def search_books(self, query, max_books=15, max_pages=None, prefetch_urls=40):
         """
         Busca libros en Goodreads y extrae información de cada uno
-        Scrapea múltiples páginas si es necesario para obtener max_books
+        Scrapea páginas de resultados hasta obtener max_books o agotar resultados
         
         PARÁMETROS:
             query (str): Término de búsqueda (ej: "data science")
             max_books (int): Máximo número de libros a extraer (default: 15)
+            max_pages (int): Límite opcional de páginas de resultados (default: sin límite)
+            prefetch_urls (int): URLs de libro que se pueden adelantar en la cola
         
-        PROCESO:
-            1. Construye la URL de búsqueda
-            2. Scrapea páginas hasta obtener max_books libros
-            3. Extrae enlaces a páginas individuales de libros
-            4. Visita cada página de libro y extrae datos
-            5. Hace pausas entre peticiones (ética de scraping)
+        PROCESO (en tubería):
+            1. Un hilo productor descarga y parsea las páginas de resultados
+               por adelantado y deja las URLs de libro en una cola acotada
+            2. Los hilos de descarga vacían la cola y extraen cada libro
+               (hasta self.concurrency a la vez)
+            3. La paginación continúa hasta llegar a max_books o a una página
+               sin resultados; el productor se detiene en cuanto basta
+            4. Respeta el límite de peticiones por host (ética de scraping)
         
         RESULTADO:
             Llena self.books con información de los libros encontrados
+            (o los añade al JSONL si se llamó a start_streaming)
         """
         
         #─────────────────────────────────────────────────────────────────────
         # PASO 1: Preparar la búsqueda
         #─────────────────────────────────────────────────────────────────────
+        if self.resume_query and self.resume_query != query:
+            raise ValueError(
+                f"El checkpoint corresponde a la búsqueda '{self.resume_query}', no a '{query}'"
+            )
         self.metadata['search_term'] = query  # Guardar término para metadata
         
         print(f"Buscando libros sobre '{query}' en Goodreads...")
         print(f"Objetivo: {max_books} libros")
         
         #─────────────────────────────────────────────────────────────────────
-        # PASO 2: Scrapear múltiples páginas si es necesario
+        # PASO 2: Lanzar el productor de páginas de resultados
         #─────────────────────────────────────────────────────────────────────
-        page = 1
-        max_pages = 3  # Máximo 3 páginas para evitar sobrecarga
+        url_queue = queue.Queue(maxsize=max(prefetch_urls, self.concurrency))
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce_book_urls,
+            args=(query, url_queue, stop, max_pages),
+            daemon=True
+        )
+        producer.start()
+        
+        #─────────────────────────────────────────────────────────────────────
+        # PASO 3: Descargar libros a medida que llegan URLs
+        # Ventana deslizante de descargas en vuelo: los resultados se
+        # registran en el orden de las URLs aunque terminen desordenados
+        #─────────────────────────────────────────────────────────────────────
+        in_flight = deque()  # (página, url, future) en orden de llegada
+        exhausted = False
         
         try:
-            while len(self.books) < max_books and page <= max_pages:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                while True:
+                    # Rellenar la ventana sin lanzar más descargas de las necesarias
+                    while (not exhausted and len(in_flight) < self.concurrency
+                           and self.books_scraped + len(in_flight) < max_books):
+                        item = url_queue.get()
+                        if item is None:
+                            exhausted = True
+                        elif isinstance(item, Exception):
+                            raise item
+                        else:
+                            page, book_url = item
+                            if canonical_book_url(book_url) in self.completed_urls:
+                                continue  # Ya extraída (por ejemplo, antes de un --resume)
+                            if self.frontier is not None and not self.frontier.claim(book_url):
+                                continue  # Reclamada por otra búsqueda
+                            print(f"Procesando: {book_url}")
+                            self.page_frontier.append(book_url)
+                            in_flight.append((page, book_url, executor.submit(self._scrape_book_page, book_url)))
+                    
+                    if not in_flight:
+                        break
+                    
+                    page, book_url, future = in_flight.popleft()
+                    # Todas las URLs de páginas anteriores ya están resueltas
+                    self.current_page = page
+                    book_data = future.result()
+                    self.page_frontier.remove(book_url)
+                    
+                    if book_data:
+                        self._add_book(book_data)
+                        print(f"✓ Libro extraído ({self.books_scraped}/{max_books}): "
+                              f"{book_data.get('title', 'Sin título')}")
+            
+            if self.books_scraped >= max_books:
+                print(f"\n✓ Objetivo alcanzado: {max_books} libros")
+            
+            #─────────────────────────────────────────────────────────────────
+            # PASO 4: Actualizar metadata con el total extraído
+            #─────────────────────────────────────────────────────────────────
+            self.metadata['total_books_scraped'] = self.books_scraped
+            self.metadata['http_pool'] = self.http.pool_stats()
+            self.metadata['rate_control'] = self.rate_limiter.stats()
+            
+            print(f"\n{'='*60}")
+            print(f"✓ Scraping completado exitosamente")
+            print(f"{'='*60}")
+            print(f"  - Libros extraídos: {self.books_scraped}")
+            print(f"  - Páginas scrapeadas: {self.metadata['pages_scraped']}")
+            print(f"  - URLs visitadas: {len(self.metadata['search_urls'])}")
+            print(f"  - Conexiones reutilizadas: {self.metadata['http_pool']['reuse_ratio']:.0%} "
+                  f"({self.metadata['http_pool']['handshakes']} handshakes)")
+            print(f"  - Eventos de throttling: {self.metadata['rate_control']['throttle_events']} "
+                  f"({self.metadata['rate_control']['requeued_requests']} peticiones reencoladas)")
+            
+        except requests.RequestException as e:
+            # Si hay algún error en la petición HTTP, mostrarlo
+            print(f"✗ Error en la búsqueda: {e}")
+            raise
+        
+        finally:
+            # Detener el productor (y desbloquearlo si espera hueco en la cola)
+            stop.set()
+            while producer.is_alive():
+                try:
+                    url_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                producer.join(timeout=0.1)
+    
+    #═════════════════════════════════════════════════════════════════════════
+    # MÉTODO AUXILIAR: PRODUCTOR DE URLs (PÁGINAS DE RESULTADOS)
+    #═════════════════════════════════════════════════════════════════════════
+    
+    def _produce_book_urls(self, query, url_queue, stop, max_pages):
+        """
+        Descarga páginas de resultados por adelantado y encola (página, url)
+        
+        Termina con None cuando no hay más resultados, se alcanza max_pages o
+        el consumidor activa `stop`. Los errores HTTP se encolan para que
+        search_books los relance.
+        """
+        page = self.current_page  # 1, o la página del checkpoint si se reanuda
+        
+        try:
+            while not stop.is_set() and (max_pages is None or page <= max_pages):
                 # Construir URL de búsqueda con paginación
-                search_url = f"{self.base_url}/search?q={query.replace(' ', '+')}&page={page}"
-                self.metadata['search_urls'].append(search_url)  # Guardar URL visitada
+                search_url = self._search_url(query, page)
+                if search_url not in self.metadata['search_urls']:
+                    self.metadata['search_urls'].append(search_url)  # Guardar URL visitada
                 
                 print(f"\n{'='*60}")
                 print(f"Scrapeando página {page} de resultados")
@@ -154,95 +481,67 @@ class GoodreadsScraper:
                 print(f"URL: {search_url}")
                 
                 #─────────────────────────────────────────────────────────────
-                # PASO 3: Hacer la petición HTTP a Goodreads
-                #─────────────────────────────────────────────────────────────
-                response = requests.get(
-                    search_url, 
-                    headers=self.headers,  # Enviar nuestros headers
-                    timeout=10             # Timeout de 10 segundos
-                )
-                response.raise_for_status()  # Lanzar error si status code no es 200
-                
-                #─────────────────────────────────────────────────────────────
-                # PASO 4: Parsear el HTML con BeautifulSoup
+                # Hacer la petición HTTP a Goodreads
                 #─────────────────────────────────────────────────────────────
-                soup = BeautifulSoup(response.content, 'lxml')
+                try:
+                    response = self._get(search_url)  # Lanza error si status code no es 2xx
+                except CacheMiss:
+                    # Modo replay-only: no hay más páginas grabadas en caché
+                    print(f"Página {page} no disponible en caché (replay-only)")
+                    self._record_cache_miss(search_url)
+                    break
                 
                 #─────────────────────────────────────────────────────────────
-                # PASO 5: Buscar enlaces a páginas de libros
+                # Buscar enlaces a páginas de libros
                 #─────────────────────────────────────────────────────────────
-                # Intentar con el selector principal
-                book_links = soup.select('a.bookTitle')
-                
-                # Si no encuentra nada, intentar método alternativo
-                if not book_links:
-                    print("⚠ No se encontraron libros con los selectores actuales")
-                    print("Intentando método alternativo...")
-                    book_links = soup.find_all('a', {'class': 'bookTitle'})
+                book_hrefs = self.parse_search_results(response.content)
                 
                 # Si esta página no tiene resultados, terminar
-                if not book_links:
+                if not book_hrefs:
                     print(f"No hay más resultados en la página {page}")
                     break
                 
-                print(f"Se encontraron {len(book_links)} libros en la página {page}")
-                
-                #─────────────────────────────────────────────────────────────
-                # PASO 6: Procesar cada libro individualmente
-                #─────────────────────────────────────────────────────────────
-                for idx, link in enumerate(book_links, 1):
-                    # Si ya tenemos suficientes libros, parar
-                    if len(self.books) >= max_books:
-                        print(f"\n✓ Objetivo alcanzado: {max_books} libros")
-                        break
-                    
-                    # Construir URL completa del libro
-                    book_url = self.base_url + link.get('href', '')
-                    total_processed = len(self.books) + 1
-                    print(f"\nProcesando libro {total_processed}/{max_books}: {book_url}")
-                    
-                    # Extraer datos del libro (método separado abajo)
-                    book_data = self._scrape_book_page(book_url)
-                    
-                    # Si se extrajo algo, añadirlo a la lista
-                    if book_data:
-                        self.books.append(book_data)
-                        print(f"✓ Libro extraído: {book_data.get('title', 'Sin título')}")
-                    
-                    #─────────────────────────────────────────────────────────
-                    # PAUSA ÉTICA: esperar 1 segundo antes de la siguiente petición
-                    # Esto evita saturar el servidor de Goodreads
-                    #─────────────────────────────────────────────────────────
-                    time.sleep(1.0)
-                
-                # Si ya tenemos todos los libros, salir del bucle
-                if len(self.books) >= max_books:
-                    break
+                print(f"Se encontraron {len(book_hrefs)} libros en la página {page}")
+                self.metadata['pages_scraped'] += 1
                 
-                # Pausa más larga entre páginas (2 segundos)
-                if len(self.books) < max_books and page < max_pages:
-                    print(f"\nPausa entre páginas...")
-                    time.sleep(2.0)
+                for href in book_hrefs:
+                    if not self._put_until_stopped(url_queue, (page, self.base_url + href), stop):
+                        return
                 
                 page += 1
-            
-            #─────────────────────────────────────────────────────────────────
-            # PASO 7: Actualizar metadata con el total extraído
-            #─────────────────────────────────────────────────────────────────
-            self.metadata['total_books_scraped'] = len(self.books)
-            self.metadata['pages_scraped'] = page - 1
-            
-            print(f"\n{'='*60}")
-            print(f"✓ Scraping completado exitosamente")
-            print(f"{'='*60}")
-            print(f"  - Libros extraídos: {len(self.books)}")
-            print(f"  - Páginas scrapeadas: {self.metadata['pages_scraped']}")
-            print(f"  - URLs visitadas: {len(self.metadata['search_urls'])}")
-            
+        
         except requests.RequestException as e:
-            # Si hay algún error en la petición HTTP, mostrarlo
-            print(f"✗ Error en la búsqueda: {e}")
-            raise
+            self._put_until_stopped(url_queue, e, stop)
+        
+        finally:
+            self._put_until_stopped(url_queue, None, stop)
+    
+    @staticmethod
+    def parse_search_results(content):
+        """
+        Extrae los enlaces (href) a páginas de libro de una página de resultados
+        """
+        soup = BeautifulSoup(content, 'lxml')
+        
+        # Intentar con el selector principal
+        book_links = soup.select('a.bookTitle')
+        
+        # Si no encuentra nada, intentar método alternativo
+        if not book_links:
+            book_links = soup.find_all('a', {'class': 'bookTitle'})
+        
+        return [link.get('href', '') for link in book_links]
+    
+    @staticmethod
+    def _put_until_stopped(url_queue, item, stop):
+        """Encola esperando hueco; devuelve False si se activó `stop`"""
+        while not stop.is_set():
+            try:
+                url_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
     
     #═════════════════════════════════════════════════════════════════════════
     # MÉTODO AUXILIAR: SCRAPEAR PÁGINA INDIVIDUAL DE LIBRO
@@ -258,7 +557,7 @@ class GoodreadsScraper:
         PROCESO:
             1. Hace petición HTTP a la página del libro
             2. Extrae: título, autor, rating, número de ratings, ISBNs
-            3. Maneja múltiples selectores (por si cambia el HTML)
+            3. Usa la ruta más barata disponible (ver utils_extract.py)
         
         RETORNO:
             dict: Diccionario con la información del libro
@@ -268,98 +567,53 @@ class GoodreadsScraper:
             #─────────────────────────────────────────────────────────────────
             # PASO 1: Hacer petición HTTP
             #─────────────────────────────────────────────────────────────────
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            #─────────────────────────────────────────────────────────────────
-            # PASO 2: Parsear HTML
-            #─────────────────────────────────────────────────────────────────
-            soup = BeautifulSoup(response.content, 'lxml')
-            
-            #─────────────────────────────────────────────────────────────────
-            # PASO 3: Inicializar estructura de datos
-            #─────────────────────────────────────────────────────────────────
-            book_data = {
-                'book_url': url,
-                'title': None,
-                'author': None,
-                'rating': None,
-                'ratings_count': None,
-                'isbn10': None,
-                'isbn13': None
-            }
+            response = self._get(url)
             
             #─────────────────────────────────────────────────────────────────
-            # PASO 4: Extraer título
-            # Intentar múltiples selectores (Goodreads cambia su HTML)
+            # PASO 2: Extraer los campos
+            # El extractor prueba primero los datos estructurados embebidos
+            # (JSON-LD, __NEXT_DATA__), luego XPath con lxml y, como último
+            # recurso, BeautifulSoup con los selectores originales
             #─────────────────────────────────────────────────────────────────
-            title_elem = soup.find('h1', {'class': 'Text__title1'})
-            if not title_elem:
-                title_elem = soup.find('h1', {'data-testid': 'bookTitle'})
-            if title_elem:
-                book_data['title'] = title_elem.get_text(strip=True)
+            fields, path = self.extractor.extract(response.content, url)
             
-            #─────────────────────────────────────────────────────────────────
-            # PASO 5: Extraer autor
-            #─────────────────────────────────────────────────────────────────
-            author_elem = soup.find('span', {'class': 'ContributorLink__name'})
-            if not author_elem:
-                author_elem = soup.find('a', {'class': 'authorName'})
-            if author_elem:
-                book_data['author'] = author_elem.get_text(strip=True)
-            
-            #─────────────────────────────────────────────────────────────────
-            # PASO 6: Extraer rating (valoración promedio)
-            #─────────────────────────────────────────────────────────────────
-            rating_elem = soup.find('div', {'class': 'RatingStatistics__rating'})
-            if rating_elem:
-                rating_text = rating_elem.get_text(strip=True)
-                try:
-                    book_data['rating'] = float(rating_text)
-                except:
-                    book_data['rating'] = None
-            
-            #─────────────────────────────────────────────────────────────────
-            # PASO 7: Extraer número de ratings (cuántas valoraciones)
-            #─────────────────────────────────────────────────────────────────
-            ratings_elem = soup.find('span', {'data-testid': 'ratingsCount'})
-            if ratings_elem:
-                ratings_text = ratings_elem.get_text(strip=True)
-                # Extraer número (ej: "1,234 ratings" -> 1234)
-                numbers = re.findall(r'[\d,]+', ratings_text)
-                if numbers:
-                    book_data['ratings_count'] = int(numbers[0].replace(',', ''))
-            
-            #─────────────────────────────────────────────────────────────────
-            # PASO 8: Extraer ISBN del meta tag
-            #─────────────────────────────────────────────────────────────────
-            isbn_meta = soup.find('meta', {'property': 'books:isbn'})
-            if isbn_meta:
-                isbn = isbn_meta.get('content', '').strip()
-                if len(isbn) == 13:
-                    book_data['isbn13'] = isbn
-                elif len(isbn) == 10:
-                    book_data['isbn10'] = isbn
+            with self._stats_lock:
+                self.metadata['extraction_paths'][path] += 1
+            print(f"  · {url} extraído vía {path}")
             
             #─────────────────────────────────────────────────────────────────
-            # PASO 9: Buscar ISBN en el texto de la página (fallback)
+            # PASO 3: Construir el registro del libro
             #─────────────────────────────────────────────────────────────────
-            if not book_data['isbn13'] and not book_data['isbn10']:
-                page_text = soup.get_text()
-                isbn_match = re.search(r'ISBN[:\s]*(\d{10}|\d{13})', page_text)
-                if isbn_match:
-                    isbn = isbn_match.group(1)
-                    if len(isbn) == 13:
-                        book_data['isbn13'] = isbn
-                    elif len(isbn) == 10:
-                        book_data['isbn10'] = isbn
+            book_data = {'book_url': url, **fields}
             
             return book_data
             
+        except CacheMiss:
+            print(f"  ⚠ {url} no disponible en caché (replay-only)")
+            self._record_cache_miss(url)
+            return None
         except Exception as e:
             print(f"  ⚠ Error al procesar {url}: {e}")
             return None
     
+    def _record_cache_miss(self, url):
+        with self._stats_lock:
+            self.metadata['cache_misses'].append(url)
+    
+    def _search_url(self, query, page):
+        """URL de una página de resultados de búsqueda"""
+        return f"{self.base_url}/search?q={query.replace(' ', '+')}&page={page}"
+    
+    def search_replay_available(self, query):
+        """
+        False si la caché está en modo replay-only y no tiene la primera página
+        de resultados de `query` (no se podría extraer ningún libro)
+        """
+        cache = self.http.cache
+        if cache is None or not cache.replay_only:
+            return True
+        return cache.get(cache.key_for(self._search_url(query, self.current_page))) is not None
+    
     #═════════════════════════════════════════════════════════════════════════
     # MÉTODO: GUARDAR EN JSON
     #═════════════════════════════════════════════════════════════════════════
@@ -394,12 +648,193 @@ class GoodreadsScraper:
         print(f"  Páginas scrapeadas: {self.metadata['pages_scraped']}")
 
 
+#═════════════════════════════════════════════════════════════════════════════
+# CRAWL MULTI-BÚSQUEDA REPARTIDO EN PROCESOS
+#═════════════════════════════════════════════════════════════════════════════
+
+def _crawl_shard(shard_id, queries, max_books, shard_dir, frontier_seen, frontier_lock,
+                 scraper_kwargs):
+    """
+    Ejecuta en un proceso las búsquedas de un shard
+    Cada búsqueda escribe su propio JSONL dentro de shard_dir
+    Todas las búsquedas del shard comparten un HttpClient (pool keep-alive y
+    limitador con la tasa ya ajustada por AIMD), así que rate_control y
+    http_pool de cada búsqueda son acumulados del shard
+    Returns: lista de (ruta JSONL, metadata de la búsqueda)
+    """
+    frontier = CrawlFrontier(frontier_seen, frontier_lock)
+    cache = ResponseCache.from_env()
+    http = None
+    outputs = []
+    
+    try:
+        for query_idx, query in queries:
+            scraper = GoodreadsScraper(http_client=http, cache=cache, frontier=frontier, **scraper_kwargs)
+            http = scraper.http
+            shard_path = Path(shard_dir) / f"shard{shard_id:02d}_q{query_idx:03d}.jsonl"
+            scraper.start_streaming(shard_path)
+            scraper.search_books(query, max_books=max_books)
+            scraper.finish_streaming()
+            outputs.append((query_idx, str(shard_path), scraper.metadata))
+    finally:
+        if http is not None:
+            http.close()
+    
+    return outputs
+
+
+def merge_shards(shard_outputs, output_path, queries, shards=1):
+    """
+    Une los JSONL de todos los shards en el fichero de landing
+    
+    Respeta el orden de las búsquedas y vuelve a deduplicar por URL canónica
+    como salvaguarda. Si output_path termina en .jsonl se escribe JSONL
+    (con su checkpoint); si no, el JSON con metadata habitual.
+    """
+    shard_outputs = sorted(shard_outputs)
+    seen = set()
+    books = []
+    for _, shard_path, _ in shard_outputs:
+        for book in iter_jsonl(shard_path):
+            key = canonical_book_url(book['book_url'])
+            if key not in seen:
+                seen.add(key)
+                books.append(book)
+    
+    metadatas = [metadata for _, _, metadata in shard_outputs]
+    extraction_paths = {path: 0 for path in EXTRACTION_PATHS}
+    for metadata in metadatas:
+        for path, count in metadata.get('extraction_paths', {}).items():
+            extraction_paths[path] = extraction_paths.get(path, 0) + count
+    
+    metadata = {
+        'scraper': 'GoodreadsScraper',
+        'search_term': ' | '.join(queries),
+        'search_terms': list(queries),
+        'search_urls': [url for m in metadatas for url in m.get('search_urls', [])],
+        'user_agent': metadatas[0]['user_agent'] if metadatas else None,
+        'scrape_date': datetime.now().isoformat(),
+        'selectors_used': metadatas[0]['selectors_used'] if metadatas else {},
+        'extraction_paths': extraction_paths,
+        'shards': shards,
+        'total_books_scraped': len(books),
+        'pages_scraped': sum(m.get('pages_scraped', 0) for m in metadatas),
+        'rate_control': [m.get('rate_control') for m in metadatas]
+    }
+    
+    output_path = Path(output_path)
+    if output_path.suffix == '.jsonl':
+        writer = JsonlWriter(output_path, checkpoint_every=0, state_fn=lambda: {'metadata': metadata})
+        for book in books:
+            writer.write(book)
+        writer.close(status='completed')
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({'metadata': metadata, 'books': books}, f, ensure_ascii=False, indent=2)
+    
+    print(f"\n✓ {len(shard_outputs)} salidas de shard unidas en {output_path} "
+          f"({len(books)} libros únicos)")
+    return metadata
+
+
+def keep_existing_landing(cache_misses, landing_dir="landing"):
+    """
+    Modo offline (replay-only) sin ningún libro en caché: en lugar de
+    sobrescribir la landing con una salida vacía se conserva la existente
+    y se listan las URLs que faltaban en caché
+    Lanza RuntimeError si no hay una landing previa con la que continuar
+    """
+    print(f"\n⚠ Modo offline: ningún libro disponible en caché "
+          f"({len(cache_misses)} URLs sin respuesta grabada)")
+    for url in cache_misses[:MAX_LOGGED_CACHE_MISSES]:
+        print(f"  - {url}")
+    if len(cache_misses) > MAX_LOGGED_CACHE_MISSES:
+        print(f"  ... y {len(cache_misses) - MAX_LOGGED_CACHE_MISSES} más")
+    
+    landing_path = resolve_goodreads_landing(landing_dir)
+    if not landing_path.exists():
+        raise RuntimeError("Modo offline sin respuestas en caché y sin landing previa de Goodreads")
+    print(f"  Se conserva la landing existente: {landing_path}")
+
+
+def crawl_queries(queries, max_books_per_query=15, workers=2, output_path="landing/goodreads_books.json",
+                  shard_dir="landing/shards", concurrency=1, requests_per_second=1.0):
+    """
+    Crawl de varias búsquedas repartidas en `workers` procesos
+    
+    - Las búsquedas se reparten en round-robin entre los shards
+    - Una frontera compartida (Manager) garantiza que cada libro se descarga
+      una sola vez aunque aparezca en varias búsquedas
+    - El límite de peticiones por segundo se reparte entre los procesos,
+      de modo que el total por host sigue siendo requests_per_second
+    """
+    Path(shard_dir).mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(workers, len(queries)))
+    scraper_kwargs = {
+        'concurrency': concurrency,
+        'requests_per_second': requests_per_second / workers
+    }
+    
+    indexed = list(enumerate(queries))
+    shards = [indexed[i::workers] for i in range(workers)]
+    
+    print(f"Crawl de {len(queries)} búsquedas en {workers} procesos")
+    
+    with Manager() as manager:
+        frontier_seen = manager.dict()
+        frontier_lock = manager.Lock()
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_crawl_shard, shard_id, shard_queries, max_books_per_query,
+                                shard_dir, frontier_seen, frontier_lock, scraper_kwargs)
+                for shard_id, shard_queries in enumerate(shards)
+            ]
+            shard_outputs = [output for future in futures for output in future.result()]
+        
+        print(f"Libros únicos reclamados en la frontera: {len(frontier_seen)}")
+    
+    # Offline sin ningún libro en caché: no se sustituye la landing por una vacía
+    cache_misses = [url for _, _, metadata in shard_outputs for url in metadata['cache_misses']]
+    if cache_misses and not any(metadata['total_books_scraped'] for _, _, metadata in shard_outputs):
+        keep_existing_landing(cache_misses, Path(output_path).parent)
+        return None
+    
+    return merge_shards(shard_outputs, output_path, queries, shards=workers)
+
+
 #═════════════════════════════════════════════════════════════════════════════
 # FUNCIÓN PRINCIPAL
 #═════════════════════════════════════════════════════════════════════════════
 
-def main():
-    """Función principal para ejecutar el scraping"""
+def main(argv=None):
+    """
+    Función principal para ejecutar el scraping
+    
+    OPCIONES:
+        --query TEXTO      Término de búsqueda (default: "data science")
+        --max-books N      Número de libros a extraer (default: 15)
+        --concurrency N    Descargas de páginas de libro en paralelo
+        --rps R            Peticiones por segundo por host
+        --jsonl            Salida incremental en landing/goodreads_books.jsonl
+        --resume           Continúa el último crawl JSONL desde su checkpoint
+        --queries A;B;C    Varias búsquedas (crawl repartido en procesos)
+        --queries-file F   Fichero con una búsqueda por línea
+        --workers N        Procesos para el crawl multi-búsqueda
+    """
+    parser = argparse.ArgumentParser(description="Scraping de Goodreads")
+    parser.add_argument('--query', default="data science")
+    parser.add_argument('--max-books', type=int, default=15)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--rps', type=float, default=1.0)
+    parser.add_argument('--jsonl', action='store_true')
+    parser.add_argument('--resume', action='store_true')
+    parser.add_argument('--checkpoint-every', type=int, default=25)
+    parser.add_argument('--queries')
+    parser.add_argument('--queries-file')
+    parser.add_argument('--workers', type=int, default=2)
+    # parse_known_args: tolera las opciones de run_pipeline.py
+    args, _ = parser.parse_known_args(argv)
     
     # Crear carpetas necesarias si no existen
     import os
@@ -409,16 +844,60 @@ def main():
     print("  EJERCICIO 1: SCRAPING DE GOODREADS")
     print("="*70 + "\n")
     
-    # Inicializar scraper
-    scraper = GoodreadsScraper()
+    # Varias búsquedas: crawl repartido en procesos con frontera compartida
+    queries = []
+    if args.queries:
+        queries = [q.strip() for q in args.queries.split(';') if q.strip()]
+    if args.queries_file:
+        with open(args.queries_file, 'r', encoding='utf-8') as f:
+            queries += [line.strip() for line in f if line.strip()]
+    
+    if queries:
+        output_path = "landing/goodreads_books.jsonl" if args.jsonl else "landing/goodreads_books.json"
+        crawl_queries(
+            queries,
+            max_books_per_query=args.max_books,
+            workers=args.workers,
+            output_path=output_path,
+            concurrency=args.concurrency,
+            requests_per_second=args.rps
+        )
+        print("\n" + "="*70)
+        print("EJERCICIO 1 COMPLETADO")
+        print("="*70)
+        return
+    
+    # Inicializar scraper (con caché HTTP en disco, configurable en .env)
+    scraper = GoodreadsScraper(
+        concurrency=args.concurrency,
+        requests_per_second=args.rps,
+        cache=ResponseCache.from_env()
+    )
+    
+    # Offline sin la búsqueda en caché: no se abre (ni se vacía) el JSONL
+    if not args.resume and not scraper.search_replay_available(args.query):
+        keep_existing_landing([scraper._search_url(args.query, scraper.current_page)])
+        return
+    
+    # Salida incremental: cada libro se escribe al extraerse (--resume la implica)
+    if args.jsonl or args.resume:
+        scraper.start_streaming(
+            "landing/goodreads_books.jsonl",
+            checkpoint_every=args.checkpoint_every,
+            resume=args.resume
+        )
     
     # Realizar búsqueda (15 libros para obtener la máxima puntuación)
-    search_term = "data science"
-    scraper.search_books(search_term, max_books=15)
+    scraper.search_books(args.query, max_books=args.max_books)
     
-    # Guardar resultados
-    output_path = "landing/goodreads_books.json"
-    scraper.save_to_json(output_path)
+    # Guardar resultados (offline sin ningún libro en caché: se conserva la landing)
+    if scraper.stream_options is not None:
+        scraper.finish_streaming()
+    elif scraper.metadata['cache_misses'] and not scraper.books_scraped:
+        keep_existing_landing(scraper.metadata['cache_misses'])
+    else:
+        output_path = "landing/goodreads_books.json"
+        scraper.save_to_json(output_path)
     
     print("\n" + "="*70)
     print("EJERCICIO 1 COMPLETADO")
@@ -0,0 +1,372 @@
+"""
+Utilidades de caché: caché HTTP persistente en disco y caché de búsquedas
+(SQLite) con resultados negativos
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+# Parámetros que no forman parte de la identidad de la respuesta
+IGNORED_PARAMS = {'key'}
+
+# Cabeceras que se guardan junto al cuerpo
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Retry-After')
+
+
+class CacheMiss(requests.RequestException):
+    """La respuesta no está en caché y el modo replay-only impide ir a la red"""
+
+
+def normalize_url(url, params=None):
+    """
+    Normaliza URL + parámetros: esquema y host en minúsculas, sin fragmento,
+    parámetros ordenados y sin la API key
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((k, str(v)) for k, v in params.items() if v is not None)
+    query = sorted((k, v) for k, v in query if k not in IGNORED_PARAMS)
+
+    return urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path or '/',
+        urlencode(query),
+        ''
+    ))
+
+
+class ResponseCache:
+    """
+    Caché HTTP en disco direccionada por contenido
+
+    Cada entrada se guarda en <cache_dir>/<hh>/<sha256>.json (metadatos) y
+    <sha256>.gz (cuerpo comprimido). Las entradas caducan por TTL y se
+    revalidan con ETag/Last-Modified; cuando el tamaño total supera
+    max_bytes se eliminan las menos usadas recientemente.
+    """
+
+    def __init__(self, cache_dir='cache/http', ttl=86400, max_bytes=512 * 1024 * 1024,
+                 replay_only=False):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay_only = replay_only
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stored': 0, 'evicted': 0}
+        self._total_bytes = sum(p.stat().st_size for p in self.cache_dir.glob('*/*') if p.is_file())
+
+    @classmethod
+    def from_env(cls):
+        """
+        Crea la caché a partir de variables de entorno (.env):
+        HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_MB, HTTP_CACHE_REPLAY_ONLY
+        """
+        from dotenv import load_dotenv
+        load_dotenv()
+
+        return cls(
+            cache_dir=os.getenv('HTTP_CACHE_DIR', 'cache/http'),
+            ttl=int(os.getenv('HTTP_CACHE_TTL', 86400)),
+            max_bytes=int(os.getenv('HTTP_CACHE_MAX_MB', 512)) * 1024 * 1024,
+            replay_only=os.getenv('HTTP_CACHE_REPLAY_ONLY', '0').lower() in ('1', 'true', 'yes')
+        )
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Claves y rutas
+    #─────────────────────────────────────────────────────────────────────────
+
+    def key_for(self, url, params=None):
+        return hashlib.sha256(normalize_url(url, params).encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        folder = self.cache_dir / key[:2]
+        return folder / f"{key}.json", folder / f"{key}.gz"
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Lectura
+    #─────────────────────────────────────────────────────────────────────────
+
+    def get(self, key):
+        """Devuelve (meta, body) o None si la entrada no existe o está corrupta"""
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with gzip.open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError, EOFError):
+            return None
+
+        # Marcar como usada recientemente (la evicción es LRU por mtime)
+        now = time.time()
+        try:
+            os.utime(meta_path, (now, now))
+        except OSError:
+            pass
+        return meta, body
+
+    def is_fresh(self, meta):
+        return time.time() - meta.get('stored_at', 0) < self.ttl
+
+    def conditional_headers(self, meta):
+        """Cabeceras para revalidar una entrada caducada"""
+        headers = {}
+        if meta['headers'].get('ETag'):
+            headers['If-None-Match'] = meta['headers']['ETag']
+        if meta['headers'].get('Last-Modified'):
+            headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+        return headers
+
+    @staticmethod
+    def to_response(meta, body):
+        """Reconstruye un requests.Response a partir de una entrada de caché"""
+        response = requests.Response()
+        response.status_code = meta['status']
+        response.url = meta['url']
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = body
+        response.from_cache = True
+        return response
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Escritura
+    #─────────────────────────────────────────────────────────────────────────
+
+    def store(self, key, response):
+        """Guarda una respuesta 200 (cuerpo comprimido + metadatos)"""
+        meta = {
+            'url': normalize_url(response.url),  # Sin la API key
+            'status': response.status_code,
+            'headers': {h: response.headers[h] for h in STORED_HEADERS if h in response.headers},
+            'stored_at': time.time()
+        }
+        meta_path, body_path = self._paths(key)
+        meta_path.parent.mkdir(exist_ok=True)
+
+        old_size = self._size(meta_path) + self._size(body_path)
+        self._atomic_write(body_path, gzip.compress(response.content))
+        self._atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+        new_size = self._size(meta_path) + self._size(body_path)
+
+        with self._lock:
+            self.stats['stored'] += 1
+            self._total_bytes += new_size - old_size
+            over_limit = self._total_bytes > self.max_bytes
+
+        if over_limit:
+            self.evict()
+
+    def refresh(self, key, meta):
+        """Renueva el TTL de una entrada tras un 304 Not Modified"""
+        meta['stored_at'] = time.time()
+        meta_path, _ = self._paths(key)
+        self._atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+        with self._lock:
+            self.stats['revalidated'] += 1
+
+    def evict(self):
+        """Elimina entradas LRU hasta dejar la caché en el 90% de max_bytes"""
+        entries = sorted(self.cache_dir.glob('*/*.json'), key=lambda p: self._mtime(p))
+        target = self.max_bytes * 0.9
+
+        with self._lock:
+            for meta_path in entries:
+                if self._total_bytes <= target:
+                    break
+                body_path = meta_path.with_suffix('.gz')
+                freed = self._size(meta_path) + self._size(body_path)
+                for path in (meta_path, body_path):
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+                self._total_bytes -= freed
+                self.stats['evicted'] += 1
+
+    def record(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Auxiliares
+    #─────────────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _atomic_write(path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _size(path):
+        try:
+            return path.stat().st_size
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return path.stat().st_mtime
+        except OSError:
+            return 0
+
+
+#─────────────────────────────────────────────────────────────────────────────
+# Caché de búsquedas (query normalizada → registro extraído)
+#─────────────────────────────────────────────────────────────────────────────
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_query(query):
+    """Clave de una búsqueda: minúsculas y espacios colapsados"""
+    return _WHITESPACE_RE.sub(' ', str(query)).strip().lower()
+
+
+class LookupCache:
+    """
+    Caché persistente en SQLite de búsquedas ya resueltas
+
+    Guarda el registro extraído de cada query (no la respuesta HTTP) y
+    también las respuestas sin resultado ("negativas"), cada tipo con su
+    propio TTL. prefetch() carga de una vez todas las claves que va a
+    necesitar un run, de modo que las consultas posteriores no tocan disco.
+    Las escrituras se agrupan y se confirman cada `flush_every` registros.
+    """
+
+    def __init__(self, db_path='cache/lookups.sqlite', ttl=30 * 86400, negative_ttl=7 * 86400,
+                 flush_every=500):
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.flush_every = flush_every
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS lookups ('
+            ' key TEXT PRIMARY KEY,'
+            ' record TEXT,'          # JSON del registro; NULL = sin resultado
+            ' stored_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+        self._prefetched = {}   # clave → (record, stored_at) cargadas con prefetch()
+        self._pending = []      # escrituras aún sin confirmar
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'stored': 0, 'prefetched': 0}
+
+    @classmethod
+    def from_env(cls):
+        """
+        Crea la caché a partir de variables de entorno (.env):
+        LOOKUP_CACHE_PATH, LOOKUP_CACHE_TTL_DAYS, LOOKUP_CACHE_NEGATIVE_TTL_DAYS
+        """
+        from dotenv import load_dotenv
+        load_dotenv()
+
+        return cls(
+            db_path=os.getenv('LOOKUP_CACHE_PATH', 'cache/lookups.sqlite'),
+            ttl=float(os.getenv('LOOKUP_CACHE_TTL_DAYS', 30)) * 86400,
+            negative_ttl=float(os.getenv('LOOKUP_CACHE_NEGATIVE_TTL_DAYS', 7)) * 86400
+        )
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Lectura
+    #─────────────────────────────────────────────────────────────────────────
+
+    def prefetch(self, queries):
+        """Carga en memoria, en bloques, las entradas de todas las queries indicadas"""
+        keys = list({normalize_query(q) for q in queries} - self._prefetched.keys())
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT key, record, stored_at FROM lookups WHERE key IN ({placeholders})', chunk
+                ).fetchall()
+                for key, record, stored_at in rows:
+                    self._prefetched[key] = (record, stored_at)
+                self.stats['prefetched'] += len(rows)
+
+    def get(self, query):
+        """
+        Devuelve None si la query no está en caché (o ha caducado), o bien
+        (True, registro) si tenía resultado y (False, None) si no lo tenía
+        """
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._prefetched.get(key)
+            if entry is None:
+                entry = self._conn.execute(
+                    'SELECT record, stored_at FROM lookups WHERE key = ?', (key,)
+                ).fetchone()
+
+            if entry is None or not self._is_fresh(*entry):
+                self.stats['misses'] += 1
+                return None
+
+            record, _ = entry
+            if record is None:
+                self.stats['negative_hits'] += 1
+                return False, None
+            self.stats['hits'] += 1
+            return True, json.loads(record)
+
+    def _is_fresh(self, record, stored_at):
+        ttl = self.ttl if record is not None else self.negative_ttl
+        return time.time() - stored_at < ttl
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Escritura
+    #─────────────────────────────────────────────────────────────────────────
+
+    def put(self, query, record):
+        """Guarda el resultado de una query (record=None → sin resultado)"""
+        key = normalize_query(query)
+        entry = (json.dumps(record, ensure_ascii=False) if record is not None else None, time.time())
+        with self._lock:
+            self._prefetched[key] = entry
+            self._pending.append((key,) + entry)
+            self.stats['stored'] += 1
+            if len(self._pending) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        """Confirma en disco las escrituras pendientes"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO lookups (key, record, stored_at) VALUES (?, ?, ?)', self._pending
+        )
+        self._conn.commit()
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,298 @@
+"""
+Utilidades de catálogo: índice local ISBN → metadatos construido a partir de
+un volcado masivo (bulk dump), consultable sin red
+
+Formato del índice (un directorio):
+    records.jsonl  un registro por línea, en el formato de _extract_book_info
+    keys.u64       ISBN-13 de cada entrada como uint64, ordenados
+    offsets.u64    desplazamiento en records.jsonl de cada entrada
+    meta.json      número de registros/claves, origen y fecha de construcción
+
+La construcción es en streaming: el volcado se lee registro a registro, las
+claves se ordenan por bloques (runs en disco) y se mezclan con heapq.merge,
+así que la memoria no depende del tamaño del volcado. Las consultas usan
+numpy.memmap + searchsorted sobre las claves y mmap sobre los registros.
+
+Uso:
+    python src/utils_catalog.py build volcado.jsonl.gz cache/catalog
+    python src/utils_catalog.py lookup cache/catalog 9781449361327
+"""
+
+import argparse
+import csv
+import gzip
+import heapq
+import json
+import mmap
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from utils_isbn import ISBN_KEY_MISSING, encode_isbn, encode_isbn_array
+
+
+# Campos de cada registro (mismo formato que GoogleBooksEnricher._extract_book_info)
+RECORD_FIELDS = (
+    'gb_id', 'title', 'subtitle', 'authors', 'publisher',
+    'pub_date', 'language', 'categories', 'isbn13', 'isbn10',
+    'price_amount', 'price_currency'
+)
+
+_RUN_DTYPE = np.dtype([('key', '<u8'), ('offset', '<u8')])
+
+
+# Clave numérica de un ISBN: el ISBN-13 como entero (ver utils_isbn.encode_isbn)
+isbn_key = encode_isbn
+
+
+def _open_text(path):
+    path = Path(path)
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def iter_dump(path):
+    """
+    Itera los registros de un volcado (JSONL o CSV, opcionalmente .gz)
+    con las columnas de RECORD_FIELDS
+    """
+    name = Path(path).name.lower()
+    with _open_text(path) as f:
+        if '.csv' in name:
+            for row in csv.DictReader(f):
+                record = {field: (row.get(field) or None) for field in RECORD_FIELDS}
+                if record['price_amount'] is not None:
+                    record['price_amount'] = float(record['price_amount'])
+                yield record
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+#─────────────────────────────────────────────────────────────────────────────
+# Construcción
+#─────────────────────────────────────────────────────────────────────────────
+
+def _write_run(entries, run_dir, run_number):
+    """Ordena un bloque de (clave, offset) y lo guarda como run en disco"""
+    run = np.array(entries, dtype=_RUN_DTYPE)
+    run = run[np.argsort(run['key'], kind='stable')]  # estable: gana el primero del volcado
+    path = Path(run_dir) / f"run_{run_number:05d}.npy"
+    np.save(path, run)
+    return path
+
+
+def _iter_run(path, block_size=65536):
+    """Itera un run como tuplas (clave, offset) leyendo por bloques"""
+    run = np.load(path, mmap_mode='r')
+    for start in range(0, len(run), block_size):
+        block = np.asarray(run[start:start + block_size])
+        yield from zip(block['key'].tolist(), block['offset'].tolist())
+
+
+def build_catalog_index(dump_path, index_dir, chunk_records=1_000_000):
+    """
+    Construye el índice a partir de un volcado sin cargarlo en memoria
+
+    1. Lee el volcado registro a registro, escribe cada registro en
+       records.jsonl y acumula (ISBN-13, offset) en bloques de chunk_records
+    2. Cada bloque se ordena y se guarda como run en disco
+    3. Los runs se mezclan con heapq.merge en keys.u64 / offsets.u64,
+       descartando ISBNs repetidos (gana el primer registro del volcado)
+    Returns: dict con los contadores de la construcción
+    """
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    stats = {'records': 0, 'skipped_without_isbn': 0, 'keys': 0, 'duplicate_keys': 0, 'runs': 0}
+
+    run_dir = Path(tempfile.mkdtemp(prefix='runs_', dir=index_dir))
+    try:
+        runs = []
+        entries = []
+        with open(index_dir / 'records.jsonl', 'wb') as records:
+            for record in iter_dump(dump_path):
+                keys = {isbn_key(record.get('isbn13')), isbn_key(record.get('isbn10'))} - {None}
+                if not keys:
+                    stats['skipped_without_isbn'] += 1
+                    continue
+
+                offset = records.tell()
+                records.write(json.dumps({field: record.get(field) for field in RECORD_FIELDS},
+                                         ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                records.write(b'\n')
+                stats['records'] += 1
+
+                entries.extend((key, offset) for key in sorted(keys))
+                if len(entries) >= chunk_records:
+                    runs.append(_write_run(entries, run_dir, len(runs)))
+                    entries = []
+            if entries:
+                runs.append(_write_run(entries, run_dir, len(runs)))
+        stats['runs'] = len(runs)
+
+        # Mezcla k-way de los runs (heapq.merge es estable entre iterables)
+        with open(index_dir / 'keys.u64', 'wb') as keys_file, \
+                open(index_dir / 'offsets.u64', 'wb') as offsets_file:
+            key_buffer, offset_buffer = [], []
+            last_key = None
+            for key, offset in heapq.merge(*(_iter_run(path) for path in runs), key=lambda e: e[0]):
+                if key == last_key:
+                    stats['duplicate_keys'] += 1
+                    continue
+                last_key = key
+                key_buffer.append(key)
+                offset_buffer.append(offset)
+                if len(key_buffer) >= 65536:
+                    np.array(key_buffer, dtype='<u8').tofile(keys_file)
+                    np.array(offset_buffer, dtype='<u8').tofile(offsets_file)
+                    stats['keys'] += len(key_buffer)
+                    key_buffer, offset_buffer = [], []
+            np.array(key_buffer, dtype='<u8').tofile(keys_file)
+            np.array(offset_buffer, dtype='<u8').tofile(offsets_file)
+            stats['keys'] += len(key_buffer)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    with open(index_dir / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump(dict(stats, source=str(dump_path), built_at=datetime.now().isoformat(),
+                       fields=list(RECORD_FIELDS)), f, ensure_ascii=False, indent=2)
+    return stats
+
+
+#─────────────────────────────────────────────────────────────────────────────
+# Consulta
+#─────────────────────────────────────────────────────────────────────────────
+
+class CatalogIndex:
+    """
+    Índice de catálogo de solo lectura sobre ficheros mapeados en memoria
+
+    get(isbn) hace una búsqueda binaria (searchsorted) sobre keys.u64 y lee
+    el registro de records.jsonl; no carga el índice en RAM, así que abrirlo
+    es inmediato y varias búsquedas concurrentes comparten las páginas del
+    sistema operativo.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / 'meta.json', 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        self.keys = self._memmap('keys.u64')
+        self.offsets = self._memmap('offsets.u64')
+
+        self._records_file = open(self.index_dir / 'records.jsonl', 'rb')
+        size = os.fstat(self._records_file.fileno()).st_size
+        self._records = mmap.mmap(self._records_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Abre el índice indicado en CATALOG_INDEX_DIR (.env)
+        Returns: CatalogIndex o None si no está configurado o no se ha construido
+        """
+        from dotenv import load_dotenv
+        load_dotenv()
+
+        index_dir = os.getenv('CATALOG_INDEX_DIR')
+        if not index_dir or not (Path(index_dir) / 'meta.json').exists():
+            return None
+        return cls(index_dir)
+
+    def _memmap(self, name):
+        path = self.index_dir / name
+        if path.stat().st_size == 0:
+            return np.empty(0, dtype='<u8')
+        return np.memmap(path, dtype='<u8', mode='r')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _position(self, key):
+        if key is None or not len(self.keys):
+            return None
+        pos = int(np.searchsorted(self.keys, key))
+        if pos < len(self.keys) and int(self.keys[pos]) == key:
+            return pos
+        return None
+
+    def _read_record(self, offset):
+        end = self._records.find(b'\n', offset)
+        return json.loads(self._records[offset:end if end != -1 else None])
+
+    def get(self, isbn):
+        """Registro del ISBN (ISBN-13 o ISBN-10) o None si no está en el catálogo"""
+        pos = self._position(isbn_key(isbn))
+        if pos is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._read_record(int(self.offsets[pos]))
+
+    def get_many(self, isbns):
+        """Búsqueda vectorizada: lista de registros (o None) en el orden de entrada"""
+        keys = np.asarray(encode_isbn_array(list(isbns)), dtype='<u8')
+        valid = np.flatnonzero(keys != ISBN_KEY_MISSING)
+        results = [None] * len(keys)
+        if not len(valid) or not len(self.keys):
+            self.misses += len(keys)
+            return results
+
+        wanted = keys[valid]
+        positions = np.minimum(np.searchsorted(self.keys, wanted), len(self.keys) - 1)
+        found = self.keys[positions] == wanted
+        for i, pos, ok in zip(valid.tolist(), positions.tolist(), found.tolist()):
+            if ok:
+                results[i] = self._read_record(int(self.offsets[pos]))
+        hits = int(found.sum())
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return results
+
+    def close(self):
+        if isinstance(self._records, mmap.mmap):
+            self._records.close()
+        self._records_file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Índice local de catálogo ISBN → metadatos")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Construye el índice a partir de un volcado")
+    build.add_argument('dump', help="Volcado JSONL o CSV (opcionalmente .gz)")
+    build.add_argument('index_dir')
+    build.add_argument('--chunk-records', type=int, default=1_000_000,
+                       help="Claves por bloque ordenado en memoria")
+
+    lookup = subparsers.add_parser('lookup', help="Consulta ISBNs en un índice")
+    lookup.add_argument('index_dir')
+    lookup.add_argument('isbns', nargs='+')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        print(f"Construyendo índice de catálogo desde {args.dump}...")
+        stats = build_catalog_index(args.dump, args.index_dir, chunk_records=args.chunk_records)
+        print(f"✓ Índice guardado en {args.index_dir}")
+        print(f"  - Registros: {stats['records']} ({stats['skipped_without_isbn']} sin ISBN descartados)")
+        print(f"  - Claves ISBN: {stats['keys']} ({stats['duplicate_keys']} repetidas descartadas)")
+        print(f"  - Bloques ordenados: {stats['runs']}")
+    else:
+        index = CatalogIndex(args.index_dir)
+        for isbn, record in zip(args.isbns, index.get_many(args.isbns)):
+            print(f"{isbn}: {json.dumps(record, ensure_ascii=False) if record else 'no encontrado'}")
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
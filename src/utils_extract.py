@@ -0,0 +1,284 @@
+"""
+Utilidades de extracción para páginas de libro de Goodreads
+
+Orden de extracción (de más barato a más caro):
+    1. json_ld:   bloque <script type="application/ld+json"> (schema.org/Book)
+    2. next_data: payload __NEXT_DATA__ (apolloState de Next.js)
+    3. lxml:      XPath precompilado sobre el árbol de lxml
+    4. bs4:       BeautifulSoup con los selectores originales (último recurso)
+"""
+
+import html
+import json
+import re
+
+from bs4 import BeautifulSoup
+from lxml import etree
+from lxml import html as lxml_html
+
+from utils_isbn import IsbnScanner
+
+
+# Rutas de extracción, en orden de preferencia
+EXTRACTION_PATHS = ('json_ld', 'next_data', 'lxml', 'bs4')
+
+#─────────────────────────────────────────────────────────────────────────────
+# Patrones precompilados sobre el HTML en bruto
+#─────────────────────────────────────────────────────────────────────────────
+JSON_LD_RE = re.compile(
+    r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.S | re.I
+)
+NEXT_DATA_RE = re.compile(
+    r'<script[^>]+id=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>', re.S | re.I
+)
+META_ISBN_RE = re.compile(
+    r'<meta[^>]+property=["\']books:isbn["\'][^>]+content=["\']\s*([0-9Xx]+)\s*["\']', re.I
+)
+EMBEDDED_ISBN13_RE = re.compile(r'"isbn13"\s*:\s*"(\d{13})"')
+EMBEDDED_ISBN_RE = re.compile(r'"isbn"\s*:\s*"(\d{9}[\dXx]|\d{13})"')
+# ISBN en el texto visible: solo candidatos etiquetados ('ISBN', 'ISBN-13: '...),
+# validados, y el primero que aparezca
+TEXT_ISBN_SCANNER = IsbnScanner(require_label=True, prefer_isbn13=False)
+RATINGS_COUNT_RE = re.compile(r'[\d,]+')
+BOOK_ID_RE = re.compile(r'/book/show/(\d+)')
+
+
+def _xpath_class(tag, class_name):
+    """XPath equivalente a soup.find(tag, {'class': class_name})"""
+    return (f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]")
+
+
+#─────────────────────────────────────────────────────────────────────────────
+# XPath precompilados (mismos selectores que el fallback de BeautifulSoup)
+#─────────────────────────────────────────────────────────────────────────────
+XPATH_TITLE = etree.XPath(f"{_xpath_class('h1', 'Text__title1')} | //h1[@data-testid='bookTitle']")
+XPATH_AUTHOR = etree.XPath(f"{_xpath_class('span', 'ContributorLink__name')} | {_xpath_class('a', 'authorName')}")
+XPATH_RATING = etree.XPath(_xpath_class('div', 'RatingStatistics__rating'))
+XPATH_RATINGS_COUNT = etree.XPath("//span[@data-testid='ratingsCount']")
+XPATH_META_ISBN = etree.XPath("//meta[@property='books:isbn']/@content")
+XPATH_VISIBLE_TEXT = etree.XPath("//text()[not(ancestor::script) and not(ancestor::style)]")
+
+
+def _empty_fields():
+    return {
+        'title': None,
+        'author': None,
+        'rating': None,
+        'ratings_count': None,
+        'isbn10': None,
+        'isbn13': None
+    }
+
+
+def _set_isbn(fields, isbn):
+    """Asigna un ISBN a isbn13 o isbn10 según su longitud"""
+    if not isbn:
+        return
+    isbn = str(isbn).strip()
+    if len(isbn) == 13:
+        fields['isbn13'] = isbn
+    elif len(isbn) == 10:
+        fields['isbn10'] = isbn
+
+
+def _set_text_isbn(fields, text):
+    """Asigna el primer ISBN etiquetado y válido del texto visible (tal como aparece)"""
+    isbn13, isbn10 = TEXT_ISBN_SCANNER.scan(text)
+    _set_isbn(fields, isbn10 or isbn13)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value):
+    if isinstance(value, int):
+        return value
+    numbers = RATINGS_COUNT_RE.findall(str(value)) if value is not None else []
+    return int(numbers[0].replace(',', '')) if numbers and numbers[0].replace(',', '') else None
+
+
+def _stripped_text(elem):
+    """Equivalente a get_text(strip=True) de BeautifulSoup"""
+    return ''.join(t.strip() for t in elem.itertext())
+
+
+class GoodreadsPageExtractor:
+    """
+    Extrae título, autor, rating, número de ratings e ISBN de una página de libro
+
+    extract() devuelve (campos, ruta) donde ruta es una de EXTRACTION_PATHS
+    """
+
+    def extract(self, content, url=None):
+        if isinstance(content, bytes):
+            text = content.decode('utf-8', errors='replace')
+        else:
+            text = content
+
+        for path, extractor in (('json_ld', self._from_json_ld),
+                                ('next_data', self._from_next_data),
+                                ('lxml', self._from_lxml)):
+            try:
+                fields = extractor(text, url)
+            except (ValueError, TypeError, KeyError, AttributeError, etree.ParserError):
+                fields = None
+            if fields and fields['title']:
+                return fields, path
+
+        return self._from_bs4(content), 'bs4'
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Ruta 1: JSON-LD
+    #─────────────────────────────────────────────────────────────────────────
+
+    def _from_json_ld(self, text, url):
+        for match in JSON_LD_RE.finditer(text):
+            data = json.loads(match.group(1))
+            candidates = data if isinstance(data, list) else data.get('@graph', [data])
+            for node in candidates:
+                if isinstance(node, dict) and node.get('@type') == 'Book':
+                    return self._fields_from_schema_book(node, text)
+        return None
+
+    def _fields_from_schema_book(self, node, text):
+        fields = _empty_fields()
+        fields['title'] = html.unescape(node.get('name') or '').strip() or None
+
+        authors = node.get('author') or []
+        if isinstance(authors, dict):
+            authors = [authors]
+        if authors and authors[0].get('name'):
+            fields['author'] = html.unescape(authors[0]['name']).strip()
+
+        rating = node.get('aggregateRating') or {}
+        fields['rating'] = _to_float(rating.get('ratingValue'))
+        fields['ratings_count'] = _to_int(rating.get('ratingCount'))
+
+        _set_isbn(fields, node.get('isbn'))
+        if not fields['isbn13'] and not fields['isbn10']:
+            self._isbn_from_raw(fields, text)
+        return fields
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Ruta 2: __NEXT_DATA__ (apolloState)
+    #─────────────────────────────────────────────────────────────────────────
+
+    def _from_next_data(self, text, url):
+        match = NEXT_DATA_RE.search(text)
+        if not match:
+            return None
+
+        state = json.loads(match.group(1))['props']['pageProps']['apolloState']
+        books = [v for k, v in state.items() if k.startswith('Book:') and v.get('details')]
+        if not books:
+            return None
+
+        # Si hay varios libros (recomendaciones), elegir el de la URL
+        book = books[0]
+        url_id = BOOK_ID_RE.search(url or '')
+        if url_id:
+            book = next((b for b in books if str(b.get('legacyId')) == url_id.group(1)), book)
+
+        fields = _empty_fields()
+        fields['title'] = book.get('titleComplete') or book.get('title')
+
+        contributor_ref = ((book.get('primaryContributorEdge') or {}).get('node') or {}).get('__ref')
+        if contributor_ref in state:
+            fields['author'] = state[contributor_ref].get('name')
+
+        work_ref = (book.get('work') or {}).get('__ref')
+        stats = state.get(work_ref, {}).get('stats') or {}
+        fields['rating'] = _to_float(stats.get('averageRating'))
+        fields['ratings_count'] = _to_int(stats.get('ratingsCount'))
+
+        details = book['details']
+        _set_isbn(fields, details.get('isbn13'))
+        if not fields['isbn13']:
+            _set_isbn(fields, details.get('isbn'))
+        return fields
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Ruta 3: lxml + XPath precompilado
+    #─────────────────────────────────────────────────────────────────────────
+
+    def _from_lxml(self, text, url):
+        tree = lxml_html.fromstring(text)
+        fields = _empty_fields()
+
+        title = XPATH_TITLE(tree)
+        if title:
+            fields['title'] = _stripped_text(title[0])
+
+        author = XPATH_AUTHOR(tree)
+        if author:
+            fields['author'] = _stripped_text(author[0])
+
+        rating = XPATH_RATING(tree)
+        if rating:
+            fields['rating'] = _to_float(_stripped_text(rating[0]))
+
+        ratings_count = XPATH_RATINGS_COUNT(tree)
+        if ratings_count:
+            fields['ratings_count'] = _to_int(_stripped_text(ratings_count[0]))
+
+        meta_isbn = XPATH_META_ISBN(tree)
+        if meta_isbn:
+            _set_isbn(fields, meta_isbn[0])
+
+        if not fields['isbn13'] and not fields['isbn10']:
+            _set_text_isbn(fields, ''.join(XPATH_VISIBLE_TEXT(tree)))
+        return fields
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Ruta 4: BeautifulSoup (selectores originales)
+    #─────────────────────────────────────────────────────────────────────────
+
+    def _from_bs4(self, content):
+        soup = BeautifulSoup(content, 'lxml')
+        fields = _empty_fields()
+
+        title_elem = soup.find('h1', {'class': 'Text__title1'})
+        if not title_elem:
+            title_elem = soup.find('h1', {'data-testid': 'bookTitle'})
+        if title_elem:
+            fields['title'] = title_elem.get_text(strip=True)
+
+        author_elem = soup.find('span', {'class': 'ContributorLink__name'})
+        if not author_elem:
+            author_elem = soup.find('a', {'class': 'authorName'})
+        if author_elem:
+            fields['author'] = author_elem.get_text(strip=True)
+
+        rating_elem = soup.find('div', {'class': 'RatingStatistics__rating'})
+        if rating_elem:
+            fields['rating'] = _to_float(rating_elem.get_text(strip=True))
+
+        ratings_elem = soup.find('span', {'data-testid': 'ratingsCount'})
+        if ratings_elem:
+            fields['ratings_count'] = _to_int(ratings_elem.get_text(strip=True))
+
+        isbn_meta = soup.find('meta', {'property': 'books:isbn'})
+        if isbn_meta:
+            _set_isbn(fields, isbn_meta.get('content', ''))
+
+        if not fields['isbn13'] and not fields['isbn10']:
+            _set_text_isbn(fields, soup.get_text())
+        return fields
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Auxiliares
+    #─────────────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _isbn_from_raw(fields, text):
+        """Busca el ISBN en el HTML en bruto (meta tag o JSON embebido) sin parsear"""
+        for pattern in (META_ISBN_RE, EMBEDDED_ISBN13_RE, EMBEDDED_ISBN_RE):
+            match = pattern.search(text)
+            if match:
+                _set_isbn(fields, match.group(1))
+                if fields['isbn13'] or fields['isbn10']:
+                    return
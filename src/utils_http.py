@@ -0,0 +1,362 @@
+"""
+Utilidades HTTP compartidas: cliente con pool de conexiones y limitación de tasa por host
+"""
+
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils_cache import CacheMiss
+
+
+class TokenBucket:
+    """
+    Cubeta de tokens thread-safe
+    Repone `rate` tokens por segundo hasta un máximo de `capacity` (ráfaga)
+    """
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError("rate debe ser mayor que 0")
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._last
+        self._last = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def set_rate(self, rate):
+        """Cambia la tasa conservando los tokens acumulados hasta ahora"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    def acquire(self):
+        """
+        Consume un token, esperando solo lo necesario si la cubeta está vacía
+        Returns: segundos esperados
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            # Reservar el token aunque quede en negativo: cada hilo calcula
+            # su propio turno y no hay espera activa ni competencia por el lock
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def parse_retry_after(value):
+    """Segundos indicados por una cabecera Retry-After (número o fecha HTTP)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class _HostState:
+    """Estado de control de un host: cubeta, semáforo y pausa por Retry-After"""
+
+    def __init__(self, rate, burst, max_in_flight):
+        self.bucket = TokenBucket(rate, burst)
+        self.semaphore = threading.BoundedSemaphore(max_in_flight)
+        self.paused_until = 0.0
+        self.throttle_events = 0
+        self.min_rate_seen = rate
+        self.max_rate_seen = rate
+
+
+class HostRateLimiter:
+    """
+    Limita peticiones por host: tasa máxima (token bucket) y
+    número máximo de peticiones simultáneas en vuelo
+
+    Con adaptive=True la tasa de cada host se ajusta por AIMD: sube
+    `increase` peticiones/s con cada respuesta sana (hasta max_rps) y se
+    multiplica por `decrease` con cada 429/5xx (hasta min_rps). Un
+    Retry-After pausa el host durante el tiempo indicado.
+    """
+
+    def __init__(self, requests_per_second=1.0, max_in_flight=1, burst=1,
+                 adaptive=False, min_rps=0.1, max_rps=None, increase=0.1, decrease=0.5):
+        self.requests_per_second = requests_per_second
+        self.max_in_flight = max_in_flight
+        self.burst = burst
+        self.adaptive = adaptive
+        self.min_rps = min(min_rps, requests_per_second)
+        self.max_rps = max_rps or requests_per_second
+        self.increase = increase
+        self.decrease = decrease
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self.total_wait = 0.0
+        self.requeued = 0
+        self.throttle_log = []  # Últimos eventos de throttling (para métricas)
+
+    def _host_state(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = _HostState(self.requests_per_second, self.burst, self.max_in_flight)
+            return self._hosts[host]
+
+    def slot(self, url):
+        """Context manager que reserva un hueco para hacer una petición a `url`"""
+        return _HostSlot(self, urlsplit(url).netloc)
+
+    #─────────────────────────────────────────────────────────────────────────
+    # Control adaptativo (AIMD)
+    #─────────────────────────────────────────────────────────────────────────
+
+    def on_success(self, url):
+        """Respuesta sana: incremento aditivo de la tasa"""
+        if not self.adaptive:
+            return
+        state = self._host_state(urlsplit(url).netloc)
+        new_rate = min(self.max_rps, state.bucket.rate + self.increase)
+        if new_rate != state.bucket.rate:
+            state.bucket.set_rate(new_rate)
+            state.max_rate_seen = max(state.max_rate_seen, new_rate)
+
+    def on_throttle(self, url, status, retry_after=None):
+        """429/5xx: reducción multiplicativa de la tasa y pausa si hay Retry-After"""
+        host = urlsplit(url).netloc
+        state = self._host_state(host)
+
+        if self.adaptive:
+            new_rate = max(self.min_rps, state.bucket.rate * self.decrease)
+            state.bucket.set_rate(new_rate)
+            state.min_rate_seen = min(state.min_rate_seen, new_rate)
+
+        with self._lock:
+            state.throttle_events += 1
+            if retry_after:
+                state.paused_until = max(state.paused_until, time.monotonic() + retry_after)
+            self.throttle_log.append({
+                'host': host,
+                'status': status,
+                'retry_after': retry_after,
+                'rate_after': round(state.bucket.rate, 3),
+                'at': datetime.now().isoformat()
+            })
+            del self.throttle_log[:-100]
+
+    def record_requeue(self):
+        with self._lock:
+            self.requeued += 1
+
+    def stats(self):
+        """Tasa actual y eventos de throttling por host (para las métricas del run)"""
+        with self._lock:
+            return {
+                'adaptive': self.adaptive,
+                'hosts': {
+                    host: {
+                        'current_rps': round(state.bucket.rate, 3),
+                        'min_rps_seen': round(state.min_rate_seen, 3),
+                        'max_rps_seen': round(state.max_rate_seen, 3),
+                        'throttle_events': state.throttle_events
+                    }
+                    for host, state in self._hosts.items()
+                },
+                'throttle_events': sum(state.throttle_events for state in self._hosts.values()),
+                'requeued_requests': self.requeued,
+                'total_wait_seconds': round(self.total_wait, 2),
+                'recent_throttles': list(self.throttle_log[-10:])
+            }
+
+
+class _HostSlot:
+    """Hueco de petición: semáforo de concurrencia + pausa Retry-After + token de tasa"""
+
+    def __init__(self, limiter, host):
+        self.limiter = limiter
+        self.host = host
+        self._semaphore = None
+
+    def __enter__(self):
+        state = self.limiter._host_state(self.host)
+        self._semaphore = state.semaphore
+        self._semaphore.acquire()
+        try:
+            waited = 0.0
+            pause = state.paused_until - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+                waited += pause
+            waited += state.bucket.acquire()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        with self.limiter._lock:
+            self.limiter.total_wait += waited
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+        return False
+
+
+class HttpClient:
+    """
+    Cliente HTTP compartido por el scraper y el enriquecedor
+
+    - Sesión keep-alive con pool de conexiones (pool_size conexiones por host)
+    - Negociación gzip/deflate
+    - Reintentos con backoff exponencial ante errores de red y 5xx
+    - Límite de tasa y de concurrencia por host (HostRateLimiter opcional);
+      las respuestas 429/503 se notifican al limitador (AIMD + Retry-After)
+      y la petición se reencola hasta max_requeues veces en vez de perderse.
+      Con limitador, los 500/502/504 también se reintentan en _send (pasando
+      por el limitador, que los ve) y no dentro del adaptador
+    - Caché de respuestas en disco con revalidación condicional (ResponseCache opcional)
+    """
+
+    RETRY_STATUS = (500, 502, 504)
+    THROTTLE_STATUS = (429, 503)
+
+    def __init__(self, pool_size=10, max_retries=3, backoff_factor=0.5,
+                 timeout=10, headers=None, rate_limiter=None, cache=None, max_requeues=5):
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.max_requeues = max_requeues
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+
+        # Con limitador el adaptador solo reintenta errores de conexión/lectura:
+        # sus reintentos por status no pasarían por la cubeta ni por el AIMD
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUS if rate_limiter is None else (),
+            allowed_methods=('GET', 'HEAD'),
+            respect_retry_after_header=False,  # Retry-After lo gestiona el limitador
+            raise_on_status=False
+        )
+        # 429/503 no se reintentan aquí: los gestiona el control de tasa en _send
+        # pool_block=True: nunca se abren más de pool_size conexiones por host
+        self.adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=pool_size,
+            pool_block=True,
+            max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+        if headers:
+            self.session.headers.update(headers)
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        """
+        GET sobre la sesión compartida (no lanza error por status code)
+        
+        Con caché: las entradas vigentes se sirven sin tocar la red (ni el
+        rate limiter); las caducadas se revalidan con If-None-Match /
+        If-Modified-Since. En modo replay-only nunca se accede a la red y
+        un fallo de caché lanza CacheMiss.
+        """
+        if self.cache is None:
+            return self._send(url, params, headers, timeout)
+
+        key = self.cache.key_for(url, params)
+        entry = self.cache.get(key)
+
+        if entry and (self.cache.replay_only or self.cache.is_fresh(entry[0])):
+            self.cache.record('hits')
+            return self.cache.to_response(*entry)
+
+        if self.cache.replay_only:
+            self.cache.record('misses')
+            raise CacheMiss(f"Sin respuesta en caché para {url} (modo replay-only)")
+
+        request_headers = dict(headers or {})
+        if entry:
+            request_headers.update(self.cache.conditional_headers(entry[0]))
+
+        response = self._send(url, params, request_headers, timeout)
+
+        if response.status_code == 304 and entry:
+            self.cache.refresh(key, entry[0])
+            return self.cache.to_response(*entry)
+
+        self.cache.record('misses')
+        if response.status_code == 200:
+            self.cache.store(key, response)
+        return response
+
+    def _send(self, url, params, headers, timeout):
+        timeout = timeout or self.timeout
+        if self.rate_limiter is None:
+            return self.session.get(url, params=params, headers=headers, timeout=timeout)
+
+        requeues = retries = 0
+        while True:
+            with self.rate_limiter.slot(url):
+                response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+
+            status = response.status_code
+            if status in self.THROTTLE_STATUS or status >= 500:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                self.rate_limiter.on_throttle(url, status, retry_after)
+                # Reencolar: la siguiente vuelta espera a la nueva tasa / Retry-After
+                if status in self.THROTTLE_STATUS and requeues < self.max_requeues:
+                    requeues += 1
+                    self.rate_limiter.record_requeue()
+                    continue
+                # 500/502/504: reintento con backoff exponencial (fuera del hueco)
+                if status in self.RETRY_STATUS and retries < self.max_retries:
+                    time.sleep(self.backoff_factor * 2 ** retries)
+                    retries += 1
+                    self.rate_limiter.record_requeue()
+                    continue
+            else:
+                self.rate_limiter.on_success(url)
+            return response
+
+    def pool_stats(self):
+        """
+        Estadísticas del pool de conexiones
+        Returns: dict con requests, handshakes (conexiones nuevas) y reuse_ratio
+        """
+        pools = self.adapter.poolmanager.pools
+        total_requests = 0
+        total_connections = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            total_requests += pool.num_requests
+            total_connections += pool.num_connections
+
+        reuse_ratio = 1 - (total_connections / total_requests) if total_requests else 0.0
+        return {
+            'requests': total_requests,
+            'handshakes': total_connections,
+            'reuse_ratio': round(reuse_ratio, 3),
+            'hosts': len(pools)
+        }
+
+    def close(self):
+        self.session.close()
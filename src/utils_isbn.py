@@ -1,7 +1,18 @@
 """
 Utilidades para validación y manipulación de ISBN
+
+Las funciones *_array son las equivalentes vectorizadas: reciben una columna
+completa (pandas Series, array de Arrow, array de numpy o lista) y hacen los
+dígitos de control con aritmética de numpy sobre una matriz uint8 de ancho fijo
 """
 
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
 def clean_isbn(isbn_str):
     """Limpia un string de ISBN eliminando guiones y espacios"""
     if not isbn_str:
@@ -95,33 +106,387 @@ def isbn10_to_isbn13(isbn10):
     return isbn13_base + str(check_digit)
 
 
+#─────────────────────────────────────────────────────────────────────────────
+# Extracción de ISBNs en texto
+#─────────────────────────────────────────────────────────────────────────────
+
+# Candidatos que no forman parte de una secuencia de dígitos más larga:
+#   - ISBN-13: 978/979 + 10 dígitos, seguidos o en 5 grupos (978-1-4493-6132-7)
+#   - ISBN-10: 10 caracteres (el último puede ser X), seguidos o en 4 grupos
+# El patrón empieza por [0-9] y comprueba el carácter anterior después
+# (lookbehind de 2): así `re` salta directamente a los dígitos del texto
+_ISBN_CANDIDATE = (
+    r'[0-9](?<![0-9Xx].)'
+    r'(?:(?<=9)7[89](?:[-\s]?[0-9]{10}'
+    r'|(?P<sep13>[-\s])[0-9]{1,5}(?P=sep13)[0-9]{1,7}(?P=sep13)[0-9]{1,7}(?P=sep13)[0-9])'
+    r'|[0-9]{8}[0-9Xx]'
+    r'|[0-9]{0,4}(?P<sep10>[-\s])[0-9]{1,7}(?P=sep10)[0-9]{1,7}(?P=sep10)[0-9Xx])'
+    r'(?![0-9Xx])'
+)
+# Etiqueta opcional 'ISBN', 'ISBN-13', 'ISBN10:'...: sus dígitos no forman parte del candidato
+_ISBN_LABEL = r'(?i:ISBN)(?:[-\s]?1[03])?[:\s]*'
+
+
+class IsbnScanner:
+    """
+    Escáner de ISBNs sobre texto (str) o buffers de bytes (bytes, bytearray,
+    memoryview, mmap), con las expresiones regulares compiladas una sola vez
+
+    require_label: solo candidatos precedidos de 'ISBN' (texto visible de páginas)
+    prefer_isbn13: scan() devuelve el primer ISBN-13 válido y, si no hay
+    ninguno, el primer ISBN-10 válido (como extract_isbn). Con False devuelve
+    el primer ISBN válido de cualquier tipo y para en cuanto lo encuentra
+    """
+
+    def __init__(self, require_label=False, prefer_isbn13=True):
+        pattern = (_ISBN_LABEL if require_label else '') + f'(?P<isbn>{_ISBN_CANDIDATE})'
+        self._text_re = re.compile(pattern)
+        self._bytes_re = re.compile(pattern.encode('ascii'))
+        self.prefer_isbn13 = prefer_isbn13
+
+    def iter_isbns(self, text):
+        """
+        Genera los ISBNs válidos del texto en orden de aparición como
+        (isbn13, isbn10); para un ISBN-10 el isbn13 es su conversión
+        """
+        pattern = self._text_re if isinstance(text, str) else self._bytes_re
+        for match in pattern.finditer(text):
+            # Solo el número: los dígitos de una etiqueta 'ISBN-13' no cuentan
+            candidate = match.group('isbn')
+            if not isinstance(candidate, str):
+                candidate = candidate.decode('ascii')
+            candidate = clean_isbn(candidate)
+            if len(candidate) == 13:
+                if validate_isbn13(candidate):
+                    yield candidate, None
+            elif validate_isbn10(candidate):
+                yield isbn10_to_isbn13(candidate), candidate
+
+    def scan(self, text):
+        """
+        Primer ISBN del texto según prefer_isbn13
+        Returns: tuple (isbn13, isbn10) o (None, None)
+        """
+        if not text:
+            return None, None
+
+        first_isbn10 = None
+        for isbn13, isbn10 in self.iter_isbns(text):
+            if isbn10 is None or not self.prefer_isbn13:
+                return isbn13, isbn10
+            if first_isbn10 is None:
+                first_isbn10 = (isbn13, isbn10)
+        return first_isbn10 or (None, None)
+
+    def scan_many(self, documents):
+        """scan() sobre varios documentos: lista de (isbn13, isbn10) en el mismo orden"""
+        return [self.scan(document) for document in documents]
+
+
+_DEFAULT_SCANNER = IsbnScanner()
+
+
 def extract_isbn(text):
     """
-    Intenta extraer ISBN-10 o ISBN-13 de un texto
+    Intenta extraer ISBN-10 o ISBN-13 de un texto (str o bytes)
     Returns: tuple (isbn13, isbn10) o (None, None)
     """
     if not text:
         return None, None
-    
-    import re
-    
-    # Buscar patrones de ISBN-13
-    isbn13_pattern = r'(?:ISBN[-:]?\s*(?:13)?:?\s*)?(?:978|979)[-\s]?\d{1,5}[-\s]?\d{1,7}[-\s]?\d{1,7}[-\s]?\d{1}'
-    isbn13_matches = re.findall(isbn13_pattern, str(text))
-    
-    for match in isbn13_matches:
-        cleaned = clean_isbn(match)
-        if validate_isbn13(cleaned):
-            return cleaned, None
-    
-    # Buscar patrones de ISBN-10
-    isbn10_pattern = r'(?:ISBN[-:]?\s*(?:10)?:?\s*)?\d{1,5}[-\s]?\d{1,7}[-\s]?\d{1,7}[-\s]?[\dX]'
-    isbn10_matches = re.findall(isbn10_pattern, str(text))
-    
-    for match in isbn10_matches:
-        cleaned = clean_isbn(match)
-        if len(cleaned) == 10 and validate_isbn10(cleaned):
-            isbn13 = isbn10_to_isbn13(cleaned)
-            return isbn13, cleaned
-    
-    return None, None
+    if not isinstance(text, (str, bytes, bytearray, memoryview)):
+        text = str(text)
+    return _DEFAULT_SCANNER.scan(text)
+
+
+def extract_isbn_many(texts):
+    """extract_isbn sobre varios textos, reutilizando el mismo escáner"""
+    return _DEFAULT_SCANNER.scan_many(texts)
+
+
+#─────────────────────────────────────────────────────────────────────────────
+# Versiones vectorizadas (columnas completas)
+#─────────────────────────────────────────────────────────────────────────────
+
+_ISBN13_WEIGHTS = np.array([1, 3] * 6 + [1], dtype=np.int32)
+_ISBN10_WEIGHTS = np.arange(10, 0, -1, dtype=np.int32)
+_ASCII_ZERO, _ASCII_X = ord('0'), ord('X')
+
+# Tabla de búsqueda por byte: True para los caracteres que conserva clean_isbn
+_ISBN_CHARS = np.zeros(256, dtype=bool)
+_ISBN_CHARS[np.frombuffer(b'0123456789Xx', dtype=np.uint8)] = True
+
+
+def _to_arrow_strings(values):
+    """Columna de entrada → StringArray de Arrow (nulos para None/NaN)"""
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    elif not isinstance(values, pa.Array):
+        values = pd.Series(values, dtype=object)
+        try:
+            values = pa.array(values, type=pa.string(), from_pandas=True)
+        except (pa.ArrowTypeError, pa.ArrowInvalid):
+            # Columna mixta (texto y números): str() de cada valor, como clean_isbn
+            values = pa.array(values.map(str, na_action='ignore'), type=pa.string(), from_pandas=True)
+    if not pa.types.is_string(values.type):
+        values = pc.cast(values, pa.string())
+    return values
+
+
+def _wrap_result(values, result):
+    """Devuelve una Series con el índice de entrada si la entrada era una Series"""
+    if isinstance(values, pd.Series):
+        return pd.Series(result, index=values.index, name=values.name)
+    return result
+
+
+def _clean_arrow(values):
+    """clean_isbn sobre una columna: deja solo dígitos y X"""
+    return pc.replace_substring_regex(_to_arrow_strings(values), pattern=r'[^0-9Xx]', replacement='')
+
+
+def _fixed_width_rows(strings, width):
+    """
+    Matriz uint8 (filas × width) con los bytes de las filas de `strings` que
+    tienen exactamente `width` bytes, y los índices de esas filas
+    """
+    n = len(strings)
+    _, offsets_buffer, data_buffer = strings.buffers()
+    if data_buffer is None or not n:
+        return np.empty((0, width), dtype=np.uint8), np.empty(0, dtype=np.intp)
+
+    offsets = np.frombuffer(offsets_buffer, dtype=np.int32)[strings.offset:strings.offset + n + 1]
+    data = np.frombuffer(data_buffer, dtype=np.uint8)
+    fits = np.diff(offsets) == width
+    if strings.null_count:
+        fits &= pc.is_valid(strings).to_numpy(zero_copy_only=False)
+    rows = np.flatnonzero(fits)
+
+    # Caso habitual (columna ya normalizada): los bytes son contiguos y
+    # basta con ver el buffer como matriz, sin copiar
+    if len(rows) == n and offsets[-1] - offsets[0] == n * width:
+        return data[offsets[0]:offsets[-1]].reshape(n, width), rows
+    return data[offsets[rows][:, None] + np.arange(width, dtype=np.int32)], rows
+
+
+def _char_matrix(values, width):
+    """
+    Equivalente a clean_isbn + comprobación de longitud sobre una columna:
+    matriz uint8 (filas × width) con los caracteres (solo dígitos y X) de las
+    filas que limpias tienen `width` caracteres, y los índices de esas filas
+    Returns: (matriz, filas, número total de valores)
+    """
+    strings = _to_arrow_strings(values)
+    matrix, rows = _fixed_width_rows(strings, width)
+
+    # Filas que ya están limpias: no pasan por la expresión regular
+    clean = _ISBN_CHARS[matrix].all(axis=1)
+    matrix, rows = matrix[clean], rows[clean]
+
+    # El resto (separadores, prefijos 'ISBN:', otras longitudes) se limpia
+    # con una sola pasada de regex sobre esas filas
+    done = np.zeros(len(strings), dtype=bool)
+    done[rows] = True
+    if strings.null_count:
+        done |= pc.is_null(strings).to_numpy(zero_copy_only=False)
+    pending = np.flatnonzero(~done)
+    if len(pending):
+        cleaned = _clean_arrow(strings.take(pa.array(pending)))
+        cleaned_matrix, cleaned_rows = _fixed_width_rows(cleaned, width)
+        matrix = np.concatenate([matrix, cleaned_matrix])
+        rows = np.concatenate([rows, pending[cleaned_rows]])
+    return matrix, rows, len(strings)
+
+
+def clean_isbn_array(values):
+    """Versión vectorizada de clean_isbn (None para valores vacíos)"""
+    cleaned = _clean_arrow(values)
+    cleaned = pc.if_else(pc.equal(cleaned, ''), pa.scalar(None, pa.string()), cleaned)
+    return _wrap_result(values, np.asarray(cleaned.to_pandas(), dtype=object))
+
+
+def validate_isbn13_array(values):
+    """Versión vectorizada de validate_isbn13: máscara booleana"""
+    matrix, rows, n = _char_matrix(values, 13)
+    digits = matrix - np.uint8(_ASCII_ZERO)  # uint8: la X (y lo que no es dígito) queda > 9
+
+    valid = np.zeros(n, dtype=bool)
+    all_digits = (digits <= 9).all(axis=1)
+    checksum_ok = (digits @ _ISBN13_WEIGHTS) % 10 == 0
+    valid[rows] = all_digits & checksum_ok
+    return _wrap_result(values, valid)
+
+
+def validate_isbn10_array(values):
+    """Versión vectorizada de validate_isbn10: máscara booleana"""
+    matrix, rows, n = _char_matrix(values, 10)
+    digits = matrix - np.uint8(_ASCII_ZERO)
+
+    # La X solo es válida como dígito de control (vale 10)
+    is_x = (matrix[:, -1] & 0xDF) == _ASCII_X
+    digits[:, -1] = np.where(is_x, 10, digits[:, -1])
+
+    valid = np.zeros(n, dtype=bool)
+    all_digits = (digits[:, :-1] <= 9).all(axis=1)
+    checksum_ok = (digits @ _ISBN10_WEIGHTS) % 11 == 0
+    valid[rows] = all_digits & checksum_ok
+    return _wrap_result(values, valid)
+
+
+def isbn10_to_isbn13_array(values):
+    """
+    Versión vectorizada de isbn10_to_isbn13 (como ella, no comprueba el
+    dígito de control del ISBN-10); None donde no hay un ISBN-10 convertible
+    """
+    matrix, rows, n = _char_matrix(values, 10)
+    convertible = (matrix[:, :9] - np.uint8(_ASCII_ZERO) <= 9).all(axis=1)
+    matrix, rows = matrix[convertible], rows[convertible]
+
+    isbn13 = np.empty((len(rows), 13), dtype=np.uint8)
+    isbn13[:, :3] = np.frombuffer(b'978', dtype=np.uint8)
+    isbn13[:, 3:12] = matrix[:, :9]
+    total = (isbn13[:, :12].astype(np.int32) - _ASCII_ZERO) @ _ISBN13_WEIGHTS[:12]
+    isbn13[:, 12] = (10 - total % 10) % 10 + _ASCII_ZERO
+
+    result = np.full(n, None, dtype=object)
+    result[rows] = isbn13.view('S13').ravel().astype('U13')
+    return _wrap_result(values, result)
+
+
+#─────────────────────────────────────────────────────────────────────────────
+# Clave numérica (uint64)
+#─────────────────────────────────────────────────────────────────────────────
+# Un ISBN-13 cabe en 64 bits: la clave es el ISBN-13 como entero (los ISBN-10
+# se convierten antes con isbn10_to_isbn13). Ocupa 8 bytes en lugar de un
+# objeto str y se compara, ordena y agrupa con numpy sin hashear cadenas.
+# En los arrays, 0 significa "sin ISBN".
+
+ISBN_KEY_MISSING = 0
+
+_POWERS_OF_10 = 10 ** np.arange(12, -1, -1, dtype=np.uint64)
+_ISBN13_PREFIX_978 = np.uint64(978 * 10 ** 9)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+
+def encode_isbn(isbn):
+    """
+    Clave entera de un ISBN-13 o ISBN-10 (también numérico, como llega de un
+    CSV leído con float): el ISBN-13 como int; None si no es un ISBN
+    """
+    if _is_number(isbn):
+        key = encode_isbn_array(np.array([isbn], dtype=np.float64))[0]
+        return int(key) if key != ISBN_KEY_MISSING else None
+
+    isbn = clean_isbn(isbn)
+    if not isbn:
+        return None
+    if len(isbn) == 10 and isbn[:9].isdigit():
+        isbn = isbn10_to_isbn13(isbn)
+    if len(isbn) != 13 or not isbn.isdigit() or int(isbn) == ISBN_KEY_MISSING:
+        return None
+    return int(isbn)
+
+
+def decode_isbn(key):
+    """ISBN-13 (str de 13 dígitos) de una clave de encode_isbn; None si no hay ISBN"""
+    if key is None or pd.isna(key) or int(key) == ISBN_KEY_MISSING:
+        return None
+    return f"{int(key):013d}"
+
+
+def _keys_from_isbn13_base(base):
+    """Claves a partir de los 12 primeros dígitos (uint64): añade el dígito de control"""
+    digits = (base[:, None] // _POWERS_OF_10[1:]) % np.uint64(10)
+    total = digits.astype(np.int64) @ _ISBN13_WEIGHTS[:12].astype(np.int64)
+    return base * np.uint64(10) + ((10 - total % 10) % 10).astype(np.uint64)
+
+
+def _encode_numeric(values):
+    """encode_isbn_array para columnas numéricas (ISBN-13 o ISBN-10 sin ceros a la izquierda)"""
+    values = np.asarray(values, dtype=np.float64)
+    keys = np.zeros(len(values), dtype=np.uint64)
+    with np.errstate(invalid='ignore'):
+        integral = np.isfinite(values) & (values == np.floor(values))
+        is_isbn13 = integral & (values >= 1e12) & (values < 1e13)
+        is_isbn10 = integral & (values > 0) & (values < 1e10)
+    keys[is_isbn13] = values[is_isbn13].astype(np.uint64)
+    keys[is_isbn10] = _keys_from_isbn13_base(_ISBN13_PREFIX_978 + values[is_isbn10].astype(np.uint64) // np.uint64(10))
+    return keys
+
+
+def _numeric_column(values):
+    """Los valores como array numpy si la columna es numérica; None si es de texto"""
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        if pa.types.is_integer(values.type) or pa.types.is_floating(values.type):
+            return values.to_numpy(zero_copy_only=False)
+        return None
+    if isinstance(values, (pd.Series, np.ndarray)):
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            return pd.Series(values).to_numpy(dtype=np.float64, na_value=np.nan)
+    return None
+
+
+def _numeric_elements(values):
+    """
+    Posiciones y valores (float64) de los elementos numéricos de una columna de
+    objetos mixta (ISBNs de texto junto a ISBNs leídos como números); None si
+    la columna es solo de texto
+    """
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        return None
+    objects = pd.Series(values, dtype=object)
+    if pd.api.types.infer_dtype(objects, skipna=True) in ('string', 'empty'):
+        return None
+    positions = np.flatnonzero(objects.map(_is_number).to_numpy(dtype=bool))
+    return positions, objects.iloc[positions].to_numpy(dtype=np.float64)
+
+
+def encode_isbn_array(values):
+    """
+    Versión vectorizada de encode_isbn: array uint64 con la clave de cada
+    valor y ISBN_KEY_MISSING (0) donde no hay ISBN
+    """
+    numeric = _numeric_column(values)
+    if numeric is not None:
+        return _wrap_result(values, _encode_numeric(numeric))
+
+    strings = _to_arrow_strings(values)
+    matrix, rows, n = _char_matrix(strings, 13)
+    keys = np.zeros(n, dtype=np.uint64)
+    digits = matrix - np.uint8(_ASCII_ZERO)
+    ok = (digits <= 9).all(axis=1)
+    keys[rows[ok]] = digits[ok].astype(np.uint64) @ _POWERS_OF_10
+
+    # ISBN-10 solo entre las filas que no son ISBN-13 (como isbn10_to_isbn13:
+    # 978 + 9 primeros dígitos + nuevo dígito de control)
+    pending = np.ones(n, dtype=bool)
+    pending[rows] = False
+    if strings.null_count:
+        pending &= pc.is_valid(strings).to_numpy(zero_copy_only=False)
+    pending = np.flatnonzero(pending)
+    if len(pending):
+        matrix, rows, _ = _char_matrix(strings.take(pa.array(pending)), 10)
+        digits = matrix - np.uint8(_ASCII_ZERO)
+        ok = (digits[:, :9] <= 9).all(axis=1)
+        body = digits[ok, :9].astype(np.uint64) @ _POWERS_OF_10[4:]
+        keys[pending[rows[ok]]] = _keys_from_isbn13_base(_ISBN13_PREFIX_978 + body)
+
+    # Los números de una columna mixta se codifican como en encode_isbn
+    mixed = _numeric_elements(values)
+    if mixed is not None:
+        positions, numbers = mixed
+        keys[positions] = _encode_numeric(numbers)
+    return _wrap_result(values, keys)
+
+
+def decode_isbn_array(keys):
+    """Versión vectorizada de decode_isbn: ISBN-13 como str (None donde la clave es 0)"""
+    array = np.asarray(keys, dtype=np.uint64)
+    present = array != ISBN_KEY_MISSING
+
+    digits = ((array[present, None] // _POWERS_OF_10) % np.uint64(10)).astype(np.uint8) + np.uint8(_ASCII_ZERO)
+    result = np.full(len(array), None, dtype=object)
+    result[present] = np.ascontiguousarray(digits).view('S13').ravel().astype('U13')
+    return _wrap_result(keys, result)
@@ -0,0 +1,342 @@
+"""
+Utilidades de salida incremental: escritura JSONL con checkpoints, lectura
+de la landing de Goodreads en formato JSON o JSONL y decodificación rápida
+de respuestas JSON
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import orjson  # Opcional: decodifica varias veces más rápido que json
+except ImportError:
+    orjson = None
+
+
+def get_json_decoder(decoder=None):
+    """
+    Decodificador de JSON (bytes o str → objeto) para respuestas de APIs
+
+    decoder: 'orjson', 'json', una función loads propia o None
+    (JSON_DECODER en .env; por defecto orjson si está instalado)
+    Returns: (nombre, función loads)
+    """
+    if callable(decoder):
+        return getattr(decoder, '__module__', None) or 'custom', decoder
+
+    decoder = (decoder or os.getenv('JSON_DECODER') or 'auto').lower()
+    if decoder == 'orjson' and orjson is None:
+        print("⚠ orjson no está instalado - se usa json")
+        decoder = 'json'
+    if decoder in ('orjson', 'auto') and orjson is not None:
+        return 'orjson', orjson.loads
+    return 'json', json.loads
+
+
+def _fsync_dir(path):
+    """Sincroniza el directorio para que el rename sea durable"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_json_atomic(path, data):
+    """Escribe un JSON de forma atómica (tmp + fsync + rename)"""
+    path = Path(path)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path.parent)
+
+
+def load_checkpoint(path):
+    """Carga un checkpoint; devuelve None si no existe"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def checkpoint_path_for(jsonl_path):
+    """Ruta del checkpoint asociado a un JSONL (libros.jsonl → libros.checkpoint.json)"""
+    jsonl_path = Path(jsonl_path)
+    return jsonl_path.with_name(jsonl_path.stem + '.checkpoint.json')
+
+
+def manifest_path_for(csv_path):
+    """Ruta del manifiesto de un CSV enriquecido (libros.csv → libros.manifest.json)"""
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.stem + '.manifest.json')
+
+
+def book_fingerprint(book):
+    """
+    Huella de un libro de Goodreads para el enriquecimiento incremental:
+    cambia si cambia alguno de los campos que se usan para buscarlo
+    """
+    key = '\x1f'.join(str(book.get(field) or '').strip()
+                      for field in ('isbn13', 'isbn10', 'title', 'author'))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def manifest_log_path_for(manifest_path):
+    """Registro append-only de un manifiesto (libros.manifest.json → libros.manifest.jsonl)"""
+    return Path(manifest_path).with_suffix('.jsonl')
+
+
+def load_manifest(path):
+    """
+    Entradas {huella: registro} de un manifiesto; {} si no existe
+    Incluye las añadidas a su registro append-only después de la última
+    escritura completa (runs en streaming o interrumpidos)
+    """
+    manifest = load_checkpoint(path)
+    entries = manifest['entries'] if manifest else {}
+    log_path = manifest_log_path_for(path)
+    if log_path.exists():
+        entries.update((entry['fingerprint'], entry['record']) for entry in iter_jsonl(log_path))
+    return entries
+
+
+def append_manifest_entries(path, entries):
+    """Añade entradas {huella: registro} al registro append-only del manifiesto (con fsync)"""
+    if not entries:
+        return
+    with open(manifest_log_path_for(path), 'a', encoding='utf-8') as f:
+        for fingerprint, record in entries.items():
+            f.write(json.dumps({'fingerprint': fingerprint, 'record': record}, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_manifest(path, entries):
+    """Escribe el manifiesto completo de forma atómica y vacía su registro append-only"""
+    write_json_atomic(path, {
+        'updated_at': datetime.now().isoformat(),
+        'entries': entries
+    })
+    manifest_log_path_for(path).unlink(missing_ok=True)
+
+
+class JsonlWriter:
+    """
+    Escritor JSONL incremental: un registro por línea, escrito en cuanto se produce
+
+    Cada `checkpoint_every` registros hace fsync del JSONL y guarda de forma
+    atómica el estado devuelto por `state_fn` en el fichero de checkpoint.
+    Al abrir en modo append se descarta una última línea incompleta (escritura
+    interrumpida por un fallo).
+    """
+
+    TAIL_BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, path, checkpoint_path=None, checkpoint_every=25, state_fn=None,
+                 append=False):
+        self.path = Path(path)
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else checkpoint_path_for(path)
+        self.checkpoint_every = checkpoint_every
+        self.state_fn = state_fn
+        self.records_written = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if append:
+            self._repair_tail()
+        self._file = open(self.path, 'a' if append else 'w', encoding='utf-8')
+
+    def _repair_tail(self):
+        """Trunca tras el último salto de línea, leyendo hacia atrás desde el final por bloques"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - self.TAIL_BLOCK_SIZE)
+                f.seek(start)
+                block = f.read(position - start)
+                newline = block.rfind(b'\n')
+                if newline != -1:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position != end:
+                f.truncate(position)
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self.records_written += 1
+        if self.checkpoint_every and self.records_written % self.checkpoint_every == 0:
+            self.checkpoint()
+
+    def checkpoint(self, **extra):
+        """fsync del JSONL + checkpoint atómico del estado actual"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        state = self.state_fn() if self.state_fn else {}
+        state.update(extra)
+        state['records_written'] = self.records_written
+        state['updated_at'] = datetime.now().isoformat()
+        write_json_atomic(self.checkpoint_path, state)
+
+    def close(self, **extra):
+        if self._file.closed:
+            return
+        self.checkpoint(**extra)
+        self._file.close()
+
+
+def iter_jsonl(path):
+    """Itera los registros de un JSONL ignorando líneas vacías o incompletas"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Última línea truncada por una escritura interrumpida
+                continue
+
+
+class _JsonStream:
+    """Lector incremental de un fichero JSON: buffer + raw_decode por bloques"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _read_more(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Siguiente carácter que no es espacio (None al final del fichero)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._read_more():
+                return None
+
+    def expect(self, chars):
+        char = self.peek()
+        if char is None or char not in chars:
+            raise ValueError(f"JSON inesperado: se esperaba {chars!r} y se encontró {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decodifica el siguiente valor completo, leyendo más si hace falta"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._read_more():
+                    raise
+                continue
+            # Un número al final del buffer puede estar cortado: confirmar
+            if end == len(self.buf) and not self.eof and self._read_more():
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        """Itera los elementos del array que empieza en la posición actual"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def iter_books(path, chunk_size=1 << 16):
+    """
+    Itera los libros de la landing de Goodreads sin cargar el fichero entero
+    - JSONL: línea a línea
+    - JSON:  elemento a elemento del array "books" (o del array raíz)
+    """
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        yield from iter_jsonl(path)
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f, chunk_size)
+        if stream.peek() == '[':
+            yield from stream.iter_array()
+            return
+
+        # Objeto raíz: saltar las claves hasta llegar a "books"
+        stream.expect('{')
+        while stream.peek() != '}':
+            key = stream.value()
+            stream.expect(':')
+            if key == 'books':
+                yield from stream.iter_array()
+                return
+            stream.value()
+            if stream.expect(',}') == '}':
+                break
+
+
+def read_books(path):
+    """
+    Lee la landing de Goodreads en cualquiera de sus dos formatos
+    - JSON:  {"metadata": {...}, "books": [...]}
+    - JSONL: un libro por línea; la metadata se toma del checkpoint asociado
+    Returns: (books, metadata)
+    """
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        books = list(iter_jsonl(path))
+        checkpoint = load_checkpoint(checkpoint_path_for(path)) or {}
+        return books, checkpoint.get('metadata', {})
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return data, {}
+    return data.get('books', []), data.get('metadata', {})
+
+
+def resolve_goodreads_landing(landing_dir):
+    """
+    Devuelve la landing de Goodreads más reciente (goodreads_books.json o .jsonl)
+    """
+    landing_dir = Path(landing_dir)
+    candidates = [p for p in (landing_dir / 'goodreads_books.json',
+                              landing_dir / 'goodreads_books.jsonl') if p.exists()]
+    if not candidates:
+        return landing_dir / 'goodreads_books.json'
+    return max(candidates, key=lambda p: p.stat().st_mtime)
@@ -132,30 +132,22 @@ class QualityChecker:
     
     def check_isbn_validity(self, df):
         """
-        Verifica validez de ISBN-13 e ISBN-10
+        Verifica validez de ISBN-13 e ISBN-10 (vectorizado sobre la columna completa)
         """
-        from utils_isbn import validate_isbn13, validate_isbn10
+        from utils_isbn import validate_isbn13_array, validate_isbn10_array
         
         metrics = {}
         
         if 'isbn13' in df.columns:
-            valid_count = 0
             total_count = df['isbn13'].notna().sum()
-            
-            for val in df['isbn13'].dropna():
-                if validate_isbn13(val):
-                    valid_count += 1
+            valid_count = int(validate_isbn13_array(df['isbn13'].dropna()).sum())
             
             pct_valid = (valid_count / total_count) * 100 if total_count > 0 else 0
             metrics['isbn13_valid_pct'] = round(pct_valid, 2)
         
         if 'isbn10' in df.columns:
-            valid_count = 0
             total_count = df['isbn10'].notna().sum()
-            
-            for val in df['isbn10'].dropna():
-                if validate_isbn10(val):
-                    valid_count += 1
+            valid_count = int(validate_isbn10_array(df['isbn10'].dropna()).sum())
             
             pct_valid = (valid_count / total_count) * 100 if total_count > 0 else 0
             metrics['isbn10_valid_pct'] = round(pct_valid, 2)
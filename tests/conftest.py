@@ -0,0 +1,8 @@
+"""
+Configuración común de los tests: los módulos del pipeline se importan desde src/
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
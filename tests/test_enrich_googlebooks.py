@@ -0,0 +1,122 @@
+"""
+Tests de GoogleBooksEnricher con un cliente HTTP falso (sin red)
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from enrich_googlebooks import GoogleBooksEnricher
+from utils_cache import LookupCache
+from utils_jsonl import book_fingerprint, load_manifest, manifest_log_path_for
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.content = json.dumps(payload).encode()
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeGoogleBooks:
+    """Cliente HTTP que responde siempre con los mismos volúmenes y guarda las queries"""
+
+    rate_limiter = None
+
+    def __init__(self, items):
+        self.items = items
+        self.queries = []
+
+    def get(self, url, params=None, **kwargs):
+        self.queries.append(params['q'])
+        return FakeResponse({'totalItems': len(self.items), 'items': self.items})
+
+
+def _volume(gb_id, **identifiers):
+    return {'id': gb_id, 'volumeInfo': {
+        'title': f"Libro {gb_id}",
+        'industryIdentifiers': [{'type': kind, 'identifier': value} for kind, value in identifiers.items()]
+    }}
+
+
+def _enricher(http, tmp_path):
+    return GoogleBooksEnricher(http_client=http, lookup_cache=LookupCache(tmp_path / 'lookups.sqlite'),
+                               json_decoder='json', concurrency=1)
+
+
+def test_lote_y_busqueda_individual_usan_la_misma_clave(tmp_path):
+    http = FakeGoogleBooks([_volume('a', ISBN_13='9781449361327', ISBN_10='1449361323')])
+    enricher = _enricher(http, tmp_path)
+    book = {'title': 'Data Science for Business', 'author': 'Foster Provost',
+            'isbn13': '978-1-4493-6132-7', 'isbn10': '1449361323'}
+
+    results = enricher._batch_isbn_lookup([book])
+    assert results[0]['gb_id'] == 'a'
+    assert http.queries == ['isbn:9781449361327']
+
+    # La cascada individual se resuelve desde la caché, sin más peticiones
+    assert enricher._cached_result(book) == (True, results[0])
+    assert enricher._search_google_books(book) == results[0]
+    assert len(http.queries) == 1
+
+
+def test_lote_guarda_el_resultado_en_todos_los_niveles_de_isbn(tmp_path):
+    # El volumen solo trae el ISBN-10: el resultado se guarda también en el nivel isbn13
+    http = FakeGoogleBooks([_volume('b', ISBN_10='1449361323')])
+    enricher = _enricher(http, tmp_path)
+    book = {'title': 'Data Science for Business', 'isbn13': '9781449361327', 'isbn10': '1449361323'}
+
+    enricher._batch_isbn_lookup([book])
+    assert enricher.lookup_cache.get('isbn:1449361323')[1]['gb_id'] == 'b'
+    assert enricher.lookup_cache.get('isbn:9781449361327')[1]['gb_id'] == 'b'
+    assert enricher._search_google_books(book)['gb_id'] == 'b'
+    assert len(http.queries) == 1
+
+
+def test_close_apaga_el_pool_especulativo(tmp_path):
+    http = FakeGoogleBooks([])
+    with GoogleBooksEnricher(http_client=http, json_decoder='json', concurrency=1, hedge_delay=0) as enricher:
+        executor = enricher._hedge_executor
+        assert enricher._search_google_books({'title': 'Sin Resultados', 'isbn13': '9781449361327'}) is None
+    assert enricher._hedge_executor is None
+    assert executor._shutdown
+
+
+def test_streaming_guarda_el_manifiesto_bloque_a_bloque(tmp_path):
+    books = [{'title': f"Libro {n}", 'isbn13': isbn} for n, isbn in enumerate(['9781449361327', '9781492041108'])]
+    input_path = tmp_path / 'goodreads_books.jsonl'
+    input_path.write_text(''.join(json.dumps(book) + '\n' for book in books), encoding='utf-8')
+    manifest_path = tmp_path / 'googlebooks_books.manifest.json'
+    http = FakeGoogleBooks([_volume('a', ISBN_13='9781449361327')])
+    enricher = GoogleBooksEnricher(http_client=http, json_decoder='json', concurrency=1, batch_size=1,
+                                   manifest_path=manifest_path)
+
+    # El segundo bloque falla: el primero ya está en el registro del manifiesto
+    enrich_books = enricher._enrich_books
+    calls = []
+    def failing_enrich_books(chunk):
+        calls.append(chunk)
+        if len(calls) == 2:
+            raise RuntimeError("fallo simulado")
+        return enrich_books(chunk)
+    enricher._enrich_books = failing_enrich_books
+
+    with pytest.raises(RuntimeError):
+        enricher.enrich_streaming(input_path, tmp_path / 'googlebooks_books.csv', chunk_size=1)
+
+    assert enricher.manifest_updates == {}
+    assert manifest_log_path_for(manifest_path).exists()
+    assert list(load_manifest(manifest_path)) == [book_fingerprint(books[0])]
+
+
+def test_busquedas_en_paralelo_dentro_de_un_bucle_de_eventos(tmp_path):
+    # Como en un notebook: se llama desde código que ya corre en un bucle asyncio
+    enricher = GoogleBooksEnricher(http_client=FakeGoogleBooks([]), json_decoder='json', concurrency=4)
+
+    async def notebook_cell():
+        return enricher._run_concurrently(lambda n: n * n, list(range(20)))
+
+    assert asyncio.run(notebook_cell()) == [n * n for n in range(20)]
@@ -0,0 +1,123 @@
+"""
+Tests de DataIntegrator sobre landings pequeñas escritas en un directorio temporal
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from integrate_pipeline import DataIntegrator
+
+
+GOOGLEBOOKS_FIELDS = ['gb_id', 'title', 'subtitle', 'authors', 'publisher', 'pub_date', 'language',
+                      'categories', 'isbn13', 'isbn10', 'price_amount', 'price_currency']
+
+
+def _goodreads_book(title, author, isbn13=None, isbn10=None, rating=4.0):
+    return {'book_url': f"https://www.goodreads.com/book/show/{title.replace(' ', '-')}",
+            'title': title, 'author': author, 'rating': rating, 'ratings_count': 10,
+            'isbn10': isbn10, 'isbn13': isbn13}
+
+
+def _googlebooks_book(**fields):
+    return {field: fields.get(field) for field in GOOGLEBOOKS_FIELDS}
+
+
+def integrate(tmp_path, goodreads_books, googlebooks_books, googlebooks_format='csv'):
+    """Ejecuta la integración paso a paso (sin el try/except de run) y devuelve el integrador"""
+    landing = tmp_path / 'landing'
+    landing.mkdir()
+    with open(landing / 'goodreads_books.json', 'w', encoding='utf-8') as f:
+        json.dump({'metadata': {}, 'books': goodreads_books}, f)
+    googlebooks_df = pd.DataFrame(googlebooks_books, columns=GOOGLEBOOKS_FIELDS)
+    if googlebooks_format == 'parquet':
+        googlebooks_df.astype({'price_amount': float}).to_parquet(landing / 'googlebooks_books.parquet', index=False)
+    else:
+        googlebooks_df.to_csv(landing / 'googlebooks_books.csv', index=False)
+
+    integrator = DataIntegrator(landing_dir=landing, standard_dir=tmp_path / 'standard', docs_dir=tmp_path / 'docs')
+    integrator.load_goodreads_data()
+    integrator.load_googlebooks_data()
+    matches_df = integrator.deduplicate_matches(integrator.match_books())
+    integrator.create_dim_book(integrator.create_unified_books(matches_df))
+    integrator.create_book_source_detail(matches_df)
+    return integrator
+
+
+def test_goodreads_con_el_mismo_isbn_se_deduplican_en_ambas_tablas(tmp_path):
+    integrator = integrate(tmp_path, [
+        _goodreads_book('Python Data Science Handbook', 'Jake VanderPlas', isbn13='9781491912058'),
+        _goodreads_book('Python Data Science Handbook: Essential Tools', 'Jake VanderPlas', isbn10='1491912057'),
+        _goodreads_book('Storytelling with Data', 'Cole Nussbaumer Knaflic'),
+    ], [])
+
+    dim_book = integrator.dim_book
+    assert dim_book['book_id'].tolist()[:1] == ['ISBN13:9781491912058']
+    assert len(dim_book) == 2
+
+    goodreads_detail = integrator.book_source_detail
+    goodreads_detail = goodreads_detail[goodreads_detail['source_name'] == 'goodreads']
+    assert goodreads_detail['source_index'].tolist() == [0, 2]
+    assert len(goodreads_detail) == len(dim_book)
+
+    dedup = integrator.metrics['deduplication']['dim_book']
+    assert dedup['isbn_duplicates_removed'] == 1
+    assert dedup['duplicates'] == [{'goodreads_index': 1, 'kept_goodreads_index': 0, 'isbn13': '9781491912058'}]
+
+
+def test_source_file_es_la_landing_cargada(tmp_path):
+    integrator = integrate(tmp_path, [
+        _goodreads_book('Data Science for Business', 'Foster Provost', isbn13='9781449361327'),
+        _goodreads_book('Storytelling with Data', 'Cole Nussbaumer Knaflic'),
+    ], [
+        _googlebooks_book(gb_id='4ZctAAAAQBAJ', title='Data Science for Business', authors='Foster Provost, Tom Fawcett',
+                          isbn13='9781449361327', price_amount=28.08, price_currency='EUR'),
+        _googlebooks_book(gb_id='YBKSDwAAQBAJ', title='Data Science from Scratch', authors='Joel Grus'),
+    ], googlebooks_format='parquet')
+
+    detail = integrator.book_source_detail
+    assert detail['source_file'].tolist() == ['goodreads_books.json'] * 2 + ['googlebooks_books.parquet'] * 2
+    assert detail['book_id'].tolist()[0] == detail['book_id'].tolist()[2] == 'ISBN13:9781449361327'
+    assert detail['book_id'].tolist()[3].startswith('HASH:')
+
+
+@pytest.mark.parametrize('googlebooks_format', ['csv', 'parquet'])
+def test_fuente_ganadora_no_cuenta_campos_vacios(tmp_path, googlebooks_format):
+    # Goodreads suma rating y autor; Google Books suma ISBN-13, editorial y
+    # precio. Solo cuentan si tienen valor: NaN/None, '' y 0.0 no suman. Empate → goodreads
+    cases = [
+        ('Sin Precio', 4.0, dict(publisher='Editorial A', price_amount=None), 'goodreads'),
+        ('Precio Cero', 4.0, dict(publisher='Editorial A', price_amount=0.0), 'goodreads'),
+        ('Con Precio', 4.0, dict(publisher='Editorial A', price_amount=12.5), 'googlebooks'),
+        ('Sin Editorial', 4.0, dict(publisher=None, price_amount=12.5), 'goodreads'),
+        # Sin rating en una columna con ratings (NaN tras la carga): Goodreads suma 1
+        ('Sin Rating', None, dict(publisher='Editorial A', price_amount=None), 'googlebooks'),
+    ]
+    isbns = ['9781449361327', '9781492041108', '9781492097402', '9781449363901', '9780596517748']
+    integrator = integrate(
+        tmp_path,
+        [_goodreads_book(title, 'Ana Autora', rating=rating) for title, rating, _, _ in cases],
+        [_googlebooks_book(gb_id=f"gb{i}", title=title, authors='Ana Autora', isbn13=isbn, **fields)
+         for i, ((title, _, fields, _), isbn) in enumerate(zip(cases, isbns))],
+        googlebooks_format=googlebooks_format,
+    )
+
+    assert integrator.dim_book['fuente_ganadora'].tolist() == [winner for _, _, _, winner in cases]
+
+
+def test_match_books_by_title_conserva_la_interfaz_anterior(tmp_path):
+    integrator = integrate(tmp_path, [
+        _goodreads_book('Storytelling with Data', 'Cole Nussbaumer Knaflic', isbn13='9781119002253'),
+        _goodreads_book('Libro Sin Pareja', 'Ana Autora'),
+    ], [
+        _googlebooks_book(gb_id='gb0', title='Otro Libro', authors='Otra Autora', isbn13='9781119002253'),
+        _googlebooks_book(gb_id='gb1', title='Storytelling with Data', authors='Cole Nussbaumer Knaflic'),
+    ])
+
+    matches_df = integrator.match_books_by_title()
+
+    assert matches_df['googlebooks_index'].tolist()[0] == 1
+    assert pd.isna(matches_df['googlebooks_index'].tolist()[1])
+    assert matches_df['matched_by'].tolist() == ['title', None]
+    assert matches_df['confidence'].tolist() == ['high', None]
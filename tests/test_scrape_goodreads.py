@@ -0,0 +1,88 @@
+"""
+Tests del crawl multi-búsqueda de scrape_goodreads (sin red)
+"""
+
+import threading
+
+import pytest
+import requests
+
+import scrape_goodreads
+from scrape_goodreads import GoodreadsScraper, _crawl_shard
+from utils_cache import ResponseCache
+
+
+def test_crawl_shard_reutiliza_un_cliente_http_por_worker(tmp_path, monkeypatch):
+    monkeypatch.setenv('HTTP_CACHE_DIR', str(tmp_path / 'cache'))
+    scrapers = []
+    monkeypatch.setattr(GoodreadsScraper, 'search_books',
+                        lambda self, query, max_books=15: scrapers.append(self))
+    closed = []
+    monkeypatch.setattr(scrape_goodreads.HttpClient, 'close', lambda self: closed.append(self))
+
+    outputs = _crawl_shard(0, [(0, 'data science'), (1, 'statistics'), (2, 'python')], 5,
+                           tmp_path / 'shards', {}, threading.Lock(), {'requests_per_second': 2.0})
+
+    assert len(outputs) == 3
+    assert len({id(scraper.http) for scraper in scrapers}) == 1
+    assert all(scraper.rate_limiter is scrapers[0].http.rate_limiter for scraper in scrapers)
+    assert closed == [scrapers[0].http]
+
+
+def _offline(tmp_path, monkeypatch, landing=None):
+    """Directorio de trabajo con la caché HTTP vacía en modo replay-only y, opcionalmente, una landing"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('HTTP_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setenv('HTTP_CACHE_REPLAY_ONLY', '1')
+    if landing is not None:
+        (tmp_path / 'landing').mkdir()
+        (tmp_path / 'landing' / 'goodreads_books.json').write_text(landing, encoding='utf-8')
+
+
+def _search_page(*hrefs):
+    links = ''.join(f'<a class="bookTitle" href="{href}">Libro</a>' for href in hrefs)
+    return f"<html><body>{links}</body></html>".encode()
+
+
+def _store(cache, url, content):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = content
+    cache.store(cache.key_for(url), response)
+
+
+@pytest.mark.parametrize('jsonl', [False, True])
+def test_offline_sin_cache_conserva_la_landing(tmp_path, monkeypatch, jsonl):
+    landing = '{"metadata": {}, "books": [{"title": "Libro previo"}]}'
+    _offline(tmp_path, monkeypatch, landing)
+
+    scrape_goodreads.main(['--jsonl'] if jsonl else [])
+
+    assert (tmp_path / 'landing' / 'goodreads_books.json').read_text(encoding='utf-8') == landing
+    assert not (tmp_path / 'landing' / 'goodreads_books.jsonl').exists()
+
+
+@pytest.mark.parametrize('jsonl', [False, True])
+def test_offline_sin_paginas_de_libro_en_cache_conserva_la_landing(tmp_path, monkeypatch, capsys, jsonl):
+    landing = '{"metadata": {}, "books": [{"title": "Libro previo"}]}'
+    _offline(tmp_path, monkeypatch, landing)
+    previous_jsonl = tmp_path / 'landing' / 'goodreads_books.jsonl'
+    if jsonl:
+        previous_jsonl.write_text('{"title": "Libro previo"}\n', encoding='utf-8')
+    cache = ResponseCache(tmp_path / 'cache')
+    _store(cache, 'https://www.goodreads.com/search?q=data+science&page=1', _search_page('/book/show/1-a'))
+
+    scrape_goodreads.main(['--max-books', '1'] + (['--jsonl'] if jsonl else []))
+
+    assert (tmp_path / 'landing' / 'goodreads_books.json').read_text(encoding='utf-8') == landing
+    if jsonl:
+        assert previous_jsonl.read_text(encoding='utf-8') == '{"title": "Libro previo"}\n'
+    assert 'https://www.goodreads.com/book/show/1-a' in capsys.readouterr().out
+
+
+def test_offline_sin_cache_ni_landing_falla(tmp_path, monkeypatch):
+    _offline(tmp_path, monkeypatch)
+
+    with pytest.raises(RuntimeError):
+        scrape_goodreads.main([])
@@ -0,0 +1,61 @@
+"""
+Tests de HttpClient contra un servidor HTTP local
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils_http import HostRateLimiter, HttpClient
+
+
+@pytest.fixture
+def server():
+    """Servidor que responde con los status de `statuses` en orden y después 200"""
+    statuses = []
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            self.send_response(statuses.pop(0) if statuses else 200)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'ok')
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}/", statuses, hits
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_5xx_se_reintentan_a_traves_del_limitador(server):
+    url, statuses, hits = server
+    statuses.extend([500, 502])
+    limiter = HostRateLimiter(requests_per_second=100, adaptive=True, max_rps=100)
+    client = HttpClient(rate_limiter=limiter, backoff_factor=0)
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert len(hits) == 3
+    stats = limiter.stats()
+    assert stats['throttle_events'] == 2
+    assert stats['requeued_requests'] == 2
+    assert [event['status'] for event in stats['recent_throttles']] == [500, 502]
+
+
+def test_5xx_persistente_devuelve_la_respuesta(server):
+    url, statuses, hits = server
+    statuses.extend([500] * 10)
+    limiter = HostRateLimiter(requests_per_second=100, adaptive=True, max_rps=100)
+    client = HttpClient(rate_limiter=limiter, backoff_factor=0, max_retries=2)
+
+    assert client.get(url).status_code == 500
+    assert len(hits) == 3
+    assert limiter.stats()['throttle_events'] == 3
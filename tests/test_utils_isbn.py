@@ -0,0 +1,34 @@
+"""
+Tests de las versiones vectorizadas de utils_isbn frente a las escalares
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils_isbn import (
+    ISBN_KEY_MISSING,
+    encode_isbn,
+    encode_isbn_array,
+    validate_isbn10,
+    validate_isbn10_array,
+    validate_isbn13,
+    validate_isbn13_array,
+)
+
+
+MIXED = ['9781449361327', 9780134685991, None, 9780134685991.0, np.nan, '0-13-468599-7', 134685997, '']
+
+
+def test_encode_isbn_array_columna_mixta_str_int_none():
+    keys = encode_isbn_array(['9781449361327', 9780134685991, None])
+    assert keys.tolist() == [9781449361327, 9780134685991, ISBN_KEY_MISSING]
+
+
+def test_encode_isbn_array_igual_que_escalar_en_columna_mixta():
+    keys = encode_isbn_array(pd.Series(MIXED, dtype=object))
+    assert keys.tolist() == [encode_isbn(v) or ISBN_KEY_MISSING for v in MIXED]
+
+
+def test_validate_arrays_columna_mixta():
+    assert validate_isbn13_array(MIXED).tolist() == [validate_isbn13(v) for v in MIXED]
+    assert validate_isbn10_array(MIXED).tolist() == [validate_isbn10(v) for v in MIXED]
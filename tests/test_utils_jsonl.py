@@ -0,0 +1,28 @@
+"""
+Tests de JsonlWriter e iter_jsonl
+"""
+
+import pytest
+
+from utils_jsonl import JsonlWriter, iter_jsonl
+
+
+@pytest.mark.parametrize('content, expected', [
+    (b'', b''),
+    (b'{"a": 1}\n', b'{"a": 1}\n'),
+    (b'{"a": 1}\n{"b": 2', b'{"a": 1}\n'),
+    (b'{"b": 2', b''),
+    (b'{"a": 1}\n' * 3 + b'x' * 50, b'{"a": 1}\n' * 3),
+])
+def test_append_descarta_la_ultima_linea_incompleta(tmp_path, monkeypatch, content, expected):
+    # Bloques pequeños para que la búsqueda hacia atrás cruce varios bloques
+    monkeypatch.setattr(JsonlWriter, 'TAIL_BLOCK_SIZE', 4)
+    path = tmp_path / 'books.jsonl'
+    path.write_bytes(content)
+
+    writer = JsonlWriter(path, append=True)
+    writer.write({'c': 3})
+    writer.close()
+
+    assert path.read_bytes() == expected + b'{"c": 3}\n'
+    assert list(iter_jsonl(path))[-1] == {'c': 3}
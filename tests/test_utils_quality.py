@@ -0,0 +1,31 @@
+"""
+Tests de QualityChecker
+"""
+
+import pandas as pd
+
+from utils_isbn import validate_isbn10, validate_isbn13
+from utils_quality import QualityChecker
+
+
+def _pct_valid(values, validate):
+    """Porcentaje de válidos calculado valor a valor, como antes de vectorizar"""
+    values = values.dropna()
+    return round(sum(bool(validate(v)) for v in values) / len(values) * 100, 2)
+
+
+def test_check_isbn_validity_con_isbn_numerico():
+    df = pd.DataFrame({
+        'isbn13': ['9781449361327', 9780134685991, None, '9780000000000'],
+        'isbn10': ['0134685997', 134685997, None, '013468599X'],
+    })
+    metrics = QualityChecker().check_isbn_validity(df)
+    assert metrics['isbn13_valid_pct'] == _pct_valid(df['isbn13'], validate_isbn13) == 66.67
+    assert metrics['isbn10_valid_pct'] == _pct_valid(df['isbn10'], validate_isbn10)
+
+
+def test_check_isbn_validity_columna_float():
+    # Un CSV leído sin dtype convierte la columna a float64
+    df = pd.DataFrame({'isbn13': [9781449361327.0, None, 9780134685991.0]})
+    metrics = QualityChecker().check_isbn_validity(df)
+    assert metrics['isbn13_valid_pct'] == _pct_valid(df['isbn13'], validate_isbn13)